@@ -0,0 +1,101 @@
+"""Format time per mkfs profile against a loop-device-backed image.
+
+Creates a sparse image of `--size`, attaches it with `losetup` and formats it once per profile and run,
+reporting the median mkfs time, the inode count and the capacity left for data. Needs root for
+`losetup`; with `--no-loop` the image file is formatted directly, which works unprivileged but skips
+the block device layer.
+
+    sudo python3 benchmarks/format_profiles.py [--size 2T] [--runs 3] [--profiles archive general]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from deepnexus.utils import load_config
+from deepnexus.vars import APP_CONFIG_PATH
+from diskmanagement.formatting import get_format_profiles, mkfs_argv
+
+UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+def parse_size(text):
+    match = re.match(r'^(\d+)([KMGT]?)$', text.strip().upper())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}', use e.g. 500G or 2T")
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+def attach_loop(image):
+    return subprocess.check_output(["losetup", "--find", "--show", image], text=True).strip()
+
+def detach_loop(device):
+    subprocess.run(["losetup", "-d", device], check=False)
+
+def format_once(target, options):
+    started = time.perf_counter()
+    subprocess.run(mkfs_argv(target, options) + ["-q"], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+def filesystem_stats(target):
+    output = subprocess.check_output(["dumpe2fs", "-h", target], text=True, stderr=subprocess.DEVNULL)
+    fields = dict(line.split(":", 1) for line in output.splitlines() if ":" in line)
+    value = lambda key: int(fields.get(key, "0").strip())
+    block_size = value("Block size")
+    return {
+        "inodes": value("Inode count"),
+        "usable": (value("Free blocks") - value("Reserved block count")) * block_size,
+    }
+
+def human(size):
+    for unit in ["B", "K", "M", "G", "T"]:
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}P"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=parse_size, default=parse_size("2T"), help="sparse image size (default 2T)")
+    parser.add_argument("--runs", type=int, default=3, help="formats per profile (default 3)")
+    parser.add_argument("--profiles", nargs="+", help="profiles to compare (default all)")
+    parser.add_argument("--dir", default=None, help="directory for the image (default the system temp dir)")
+    parser.add_argument("--no-loop", action="store_true", help="format the image file instead of a loop device")
+    args = parser.parse_args()
+
+    profiles = get_format_profiles(load_config(APP_CONFIG_PATH) or {})
+    names = args.profiles or list(profiles)
+    unknown = [name for name in names if name not in profiles]
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(unknown)} (available: {', '.join(profiles)})")
+
+    fd, image = tempfile.mkstemp(prefix="deepnexus-format-", suffix=".img", dir=args.dir)
+    os.close(fd)
+    device = None
+    try:
+        os.truncate(image, args.size)
+        target = image
+        if not args.no_loop:
+            try:
+                device = target = attach_loop(image)
+            except (OSError, subprocess.CalledProcessError) as e:
+                sys.exit(f"losetup failed ({e}), run as root or pass --no-loop")
+
+        print(f"Formatting {human(args.size)} {'loop device ' + device if device else 'image file'} {args.runs}x per profile")
+        print(f"{'Profile':<14}{'median':>10}{'min':>10}{'max':>10}{'inodes':>14}{'usable':>12}  options")
+        for name in names:
+            times = [format_once(target, profiles[name]) for _ in range(args.runs)]
+            stats = filesystem_stats(target)
+            print(f"{name:<14}{statistics.median(times):>9.2f}s{min(times):>9.2f}s{max(times):>9.2f}s"
+                  f"{stats['inodes']:>14,}{human(stats['usable']):>12}  {profiles[name] or '(defaults)'}")
+    finally:
+        if device:
+            detach_loop(device)
+        os.unlink(image)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Per-row rendering cost of a 1000 line status tree.
+
+Compares the old escape path (platform check and code rebuilt on every call) with the memoized
+`Ansi.escape`, and prompt building with the cached `get_prompt_text`.
+
+    python3 benchmarks/render.py [--rows 1000] [--repeat 20]
+"""
+import os
+import io
+import sys
+import time
+import argparse
+from contextlib import redirect_stdout
+from platform import system as get_os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from deepnexus.escape import Ansi
+from deepnexus.utils import get_prompt_text, build_prompt_text
+
+APP_CONFIG = {
+    "prompt": {
+        "use_app_name": False,
+        "username": {"name": "root", "color": "136,73,140"},
+        "hostname": {"name": "deepnexus", "color": "136,73,140"},
+    }
+}
+
+def uncached_escape(*args):
+    get_os()
+    return Ansi._build.__wrapped__(args)
+
+def render_tree(rows, font):
+    for i in range(rows):
+        is_last = i == rows - 1
+        branch = "└── " if is_last else "├── "
+        icon = f"{font('fg_green')}● {font('reset')}" if i % 3 else f"{font('fg_red')}● {font('reset')}"
+        print(f"│   {branch}{icon} Disk {i}: {30 + i % 20}°C {font('bold')}OK{font('reset')}")
+
+def per_row(rows, repeat, font):
+    best = None
+    for _ in range(repeat):
+        buffer = io.StringIO()
+        started = time.perf_counter()
+        with redirect_stdout(buffer):
+            render_tree(rows, font)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / rows
+
+def per_call(repeat, func):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure tree and prompt rendering cost")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    old_row = per_row(args.rows, args.repeat, uncached_escape)
+    new_row = per_row(args.rows, args.repeat, Ansi.escape)
+    print(f"tree ({args.rows} rows): uncached {old_row * 1e6:.2f} us/row, memoized {new_row * 1e6:.2f} us/row ({old_row / new_row:.1f}x)")
+
+    menu = ["disks", "sas"]
+    old_prompt = per_call(args.rows, lambda: build_prompt_text(APP_CONFIG, menu))
+    new_prompt = per_call(args.rows, lambda: get_prompt_text(APP_CONFIG, menu))
+    print(f"prompt: rebuilt {old_prompt * 1e6:.2f} us/call, cached {new_prompt * 1e6:.2f} us/call ({old_prompt / new_prompt:.1f}x)")
+
+if __name__ == "__main__":
+    main()
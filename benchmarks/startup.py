@@ -0,0 +1,61 @@
+"""Time-to-prompt benchmark for deepnexus-cli.py.
+
+Starts the CLI with `exit` already waiting on stdin, so the measured wall time is the time it takes
+to reach the first prompt (plus a negligible exit). Exits with status 1 when the median run is over
+the budget, so it can gate changes to the startup path.
+
+    python3 benchmarks/startup.py [--runs 10] [--budget 0.25] [--imports]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CLI_PATH = os.path.join(ROOT_DIR, "deepnexus-cli.py")
+DEFAULT_BUDGET = 0.25
+
+def time_to_prompt():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, CLI_PATH], input="exit\n", stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return time.perf_counter() - started
+
+def slowest_imports(count=10):
+    result = subprocess.run([sys.executable, "-X", "importtime", CLI_PATH], input="exit\n", stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure deepnexus-cli time-to-prompt")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("DEEPNEXUS_STARTUP_BUDGET", DEFAULT_BUDGET)),
+                        help="maximum median time-to-prompt in seconds")
+    parser.add_argument("--imports", action="store_true", help="also list the slowest imports")
+    args = parser.parse_args()
+
+    # The first run renders and caches the banner, it is not part of the measurement
+    time_to_prompt()
+    samples = [time_to_prompt() for _ in range(args.runs)]
+    median = statistics.median(samples)
+
+    print(f"time-to-prompt: median {median * 1000:.1f} ms, min {min(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms over {args.runs} runs")
+    if args.imports:
+        for cumulative, name in slowest_imports():
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if median > args.budget:
+        print(f"FAIL: over the {args.budget * 1000:.0f} ms budget")
+        return 1
+    print(f"OK: within the {args.budget * 1000:.0f} ms budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
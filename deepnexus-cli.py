@@ -1,20 +1,48 @@
-from deepnexus.menus import main_menu
-from deepnexus.utils import load_config
-from deepnexus.vars import APP_CONFIG_PATH
-import pyfiglet
 import os
 import sys
+import argparse
+from deepnexus.utils import load_config, clear_screen
+from deepnexus.vars import APP_CONFIG_PATH
 from deepnexus.escape import Ansi
+from deepnexus.tracing import tracer
 font = Ansi.escape
 
 def main():
+    parser = argparse.ArgumentParser(description="DeepNexus Server management tool, without a command it starts the interactive prompt")
+    parser.add_argument("command", nargs="*", help="run a single command and exit, e.g. 'temps' or 'disks show'")
+    parser.add_argument("--json", action="store_true", help="print the result of the command as JSON")
+    parser.add_argument("--agent", action="store_true", help="run as the background agent that keeps hardware state warm for other sessions")
+    parser.add_argument("--exporter", action="store_true", help="write Prometheus metrics for node_exporter's textfile collector on an interval")
+    parser.add_argument("--textfile", metavar="FILE", help="metrics file written by --exporter")
+    parser.add_argument("--interval", type=int, metavar="SECONDS", help="seconds between --exporter collections")
+    parser.add_argument("--port", type=int, help="also serve the metrics over HTTP on this port")
+    parser.add_argument("--once", action="store_true", help="collect and write the metrics once, e.g. from cron")
+    parser.add_argument("--trace", nargs="?", const="", metavar="FILE",
+                        help="record a Chrome trace of the session, written to FILE (default ~/.local/state/deepnexus-cli/traces) on exit")
+    args = parser.parse_intermixed_args()
+    if args.trace is not None:
+        tracer.start(os.path.abspath(os.path.expanduser(args.trace)) if args.trace else None)
 
     root_dir = os.path.abspath(os.path.dirname(__file__))
     os.chdir(root_dir)
 
+    if args.agent:
+        from deepnexus.agent import run_agent
+        sys.exit(run_agent(intervals=(load_config(APP_CONFIG_PATH) or {}).get("agent_refresh")))
+    if args.exporter:
+        from deepnexus.exporter import run_exporter
+        sys.exit(run_exporter(args.textfile, args.interval, args.port, args.once))
+    if args.command:
+        from deepnexus.oneshot import run_oneshot
+        sys.exit(run_oneshot(args.command, args.json))
+    if args.json:
+        parser.error("--json needs a command, e.g. 'temps --json'")
+
+    from deepnexus.menus import main_menu
+    from deepnexus.banner import render_banner
     config = load_config(APP_CONFIG_PATH)
-    ascii_art = pyfiglet.figlet_format(config["banner"]) # type: ignore
-    os.system('clear')
+    ascii_art = render_banner(config["banner"]) # type: ignore
+    clear_screen()
     print(ascii_art)    
     print(f"    {font('italic')}DeepNexus Server management tool.")
     print(f"    {font('italic')}Type 'help' for commands.{font('reset')}")
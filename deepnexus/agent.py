@@ -0,0 +1,269 @@
+import os
+import re
+import grp
+import pwd
+import json
+import struct
+import time
+import signal
+import socket
+import threading
+import socketserver
+from deepnexus.tracing import span
+from deepnexus.utils import load_cached_config
+from deepnexus.vars import AGENT_SOCKET, AGENT_REFRESH, AGENT_CLIENT_TIMEOUT, AGENT_STORCLI_WARM, APP_CONFIG_PATH
+
+# `deepnexus-cli --agent` keeps temperatures, the block inventory and storcli dumps warm and hands them to every
+# session over a Unix socket, one JSON request and one JSON response per line. Sessions fall back to collecting
+# everything themselves when no agent answers.
+
+class AgentError(RuntimeError):
+    pass
+
+# storcli commands a session may have the agent run besides read-only shows: switching locate LEDs
+LOCATE_REQUEST = re.compile(r'^/c(\d+|all)(/e(\d+|all))?/s(\d+|all) (start|stop) locate J$')
+PEER_CREDENTIALS = struct.Struct("3i")
+
+# Set in the agent process so its own lookups never loop back to itself
+_serving = [False]
+
+def agent_socket():
+    settings = load_cached_config(APP_CONFIG_PATH)
+    configured = settings.get("agent_socket") if isinstance(settings, dict) else None
+    return os.environ.get("DEEPNEXUS_AGENT_SOCKET") or configured or AGENT_SOCKET
+
+def agent_request(request, timeout=AGENT_CLIENT_TIMEOUT, path=None):
+    """The agent's answer to `request`, None when no agent is running. Raises AgentError when the agent failed."""
+    if _serving[0] or os.environ.get("DEEPNEXUS_NO_AGENT"):
+        return None
+    path = path or agent_socket()
+    if not os.path.exists(path):
+        return None
+    try:
+        with span(request.get("get", ""), "agent"), socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(path)
+            client.sendall(json.dumps(request).encode() + b"\n")
+            with client.makefile("rb") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if not response.get("ok"):
+        raise AgentError(f"agent: {response.get('error', 'unknown error')}")
+    return response.get("data")
+
+class AgentState(object):
+    """ Latest value of every refreshed kind of state, refreshed by one thread per kind. """
+
+    def __init__(self, refreshers, intervals):
+        self.refreshers = refreshers
+        self.intervals = intervals
+        self.values = {}
+        self.errors = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._wake = {name: threading.Event() for name in refreshers}
+        self._stop = threading.Event()
+
+    def refresh(self, name):
+        try:
+            value = self.refreshers[name]()
+        except Exception as e:
+            print(f"{time.strftime('%H:%M:%S')} {name} refresh failed: {e}")
+            with self._lock:
+                self.errors[name] = str(e)
+            return None
+        with self._lock:
+            self.values[name] = (time.time(), value)
+            self.errors.pop(name, None)
+        return value
+
+    def get(self, name):
+        with self._lock:
+            entry = self.values.get(name)
+        return entry[1] if entry else self.refresh(name)
+
+    def wake(self, name=None):
+        for event_name, event in self._wake.items():
+            if name is None or event_name == name:
+                event.set()
+
+    def _loop(self, name):
+        while not self._stop.is_set():
+            self.refresh(name)
+            self._wake[name].wait(self.intervals.get(name, 60))
+            self._wake[name].clear()
+
+    def start(self):
+        for name in self.refreshers:
+            threading.Thread(target=self._loop, args=(name,), name=f"agent-{name}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "uptime": now - self.started,
+                "state": {name: {"age": now - self.values[name][0] if name in self.values else None, "error": self.errors.get(name)}
+                          for name in self.refreshers},
+            }
+
+def refresh_temperatures():
+    from deepnexus.temperature import build_temperature_tree
+    tree = build_temperature_tree()
+    if load_cached_config(APP_CONFIG_PATH).get("temperature_history", True):
+        from deepnexus.temperature_history import record_temperature_tree
+        record_temperature_tree(tree)
+    return tree
+
+def refresh_inventory():
+    from diskmanagement.inventory import get_block_inventory
+    return get_block_inventory(refresh=True).tree
+
+def refresh_sas():
+    from diskmanagement.sas import storcli, storcli_cache
+    if not load_cached_config(APP_CONFIG_PATH).get("enable_sas"):
+        return None
+    for args in AGENT_STORCLI_WARM:
+        storcli_cache.invalidate(args)
+        storcli(args)
+    return True
+
+def allowed_storcli(args):
+    """Whether a session may have the agent (usually root) run `storcli64 <args>`."""
+    from diskmanagement.sas import storcli_ttl
+    args = str(args)
+    # Some shows write files (`show events file=...`), nothing with an option value is let through
+    if "=" in args:
+        return False
+    return storcli_ttl(args) is not None or LOCATE_REQUEST.match(args) is not None
+
+def agent_group_id(settings):
+    name = settings.get("agent_group") if isinstance(settings, dict) else None
+    return grp.getgrnam(name).gr_gid if name else os.getegid()
+
+def peer_allowed(connection, group_id):
+    """Root, the agent's own user and members of the agent's group may talk to it."""
+    _, uid, gid = PEER_CREDENTIALS.unpack(connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size))
+    if uid in (0, os.geteuid()) or gid == group_id:
+        return True
+    try:
+        return group_id in os.getgrouplist(pwd.getpwuid(uid).pw_name, gid)
+    except KeyError:
+        return False
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, state, group_id):
+        self.state = state
+        self.group_id = group_id
+        super().__init__(path, AgentRequestHandler)
+
+    def answer(self, request):
+        kind = request.get("get")
+        if kind == "temps":
+            return self.state.get("temps")
+        if kind == "inventory":
+            if request.get("fresh"):
+                self.state.refresh("inventory")
+            return self.state.get("inventory")
+        if kind == "storcli":
+            from diskmanagement.sas import storcli
+            if not allowed_storcli(request["args"]):
+                raise ValueError(f"storcli '{request['args']}' is not allowed through the agent")
+            return storcli(request["args"], request.get("timeout"))
+        if kind == "refresh":
+            from deepnexus.cache import clear_all_caches
+            clear_all_caches()
+            self.state.wake()
+            return True
+        if kind == "status":
+            return self.state.status()
+        raise ValueError(f"unknown request '{kind}'")
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if not peer_allowed(self.connection, self.server.group_id):
+            # Read the request first so the client gets the answer instead of a broken pipe
+            self.rfile.readline()
+            self.wfile.write(json.dumps({"ok": False, "error": "permission denied"}).encode() + b"\n")
+            return
+        for line in self.rfile:
+            try:
+                response = {"ok": True, "data": self.server.answer(json.loads(line))}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+
+def agent_running(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(1)
+            client.connect(path)
+        return True
+    except OSError:
+        return False
+
+def run_agent(path=None, intervals=None):
+    _serving[0] = True
+    path = path or agent_socket()
+    if agent_running(path):
+        print(f"An agent is already answering on {path}")
+        return 1
+    try:
+        group_id = agent_group_id(load_cached_config(APP_CONFIG_PATH))
+    except KeyError as e:
+        print(f"Unknown agent_group {e}")
+        return 1
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.unlink(path)
+
+    state = AgentState({"temps": refresh_temperatures, "inventory": refresh_inventory, "sas": refresh_sas}, {**AGENT_REFRESH, **(intervals or {})})
+    # Created owner-only, the socket must not be reachable by anyone else before its group is set
+    umask = os.umask(0o177)
+    try:
+        server = AgentServer(path, state, group_id)
+    finally:
+        os.umask(umask)
+    # Readable by the group so several admins can share one agent
+    os.chown(path, -1, group_id)
+    os.chmod(path, 0o660)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+    state.start()
+    print(f"{time.strftime('%H:%M:%S')} Agent listening on {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        state.stop()
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        print(f"{time.strftime('%H:%M:%S')} Agent stopped")
+    return 0
+
+def show_agent_status():
+    path = agent_socket()
+    try:
+        status = agent_request({"get": "status"}, path=path)
+    except AgentError as e:
+        status = None
+        print(e)
+    if status is None:
+        print(f"No agent running on {path}, start one with 'deepnexus-cli --agent'")
+        print()
+        return
+    print(f"Agent pid {status['pid']} on {path}, up {status['uptime']:.0f}s")
+    for name, entry in status["state"].items():
+        age = "never" if entry["age"] is None else f"{entry['age']:.1f}s ago"
+        print(f"  {name:<10} refreshed {age}" + (f" (last refresh failed: {entry['error']})" if entry["error"] else ""))
+    print()
@@ -0,0 +1,28 @@
+import os
+import hashlib
+from deepnexus.vars import BANNER_CACHE_DIR
+
+def banner_cache_path(text):
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(BANNER_CACHE_DIR, f"banner-{digest}.txt")
+
+def render_banner(text):
+    path = banner_cache_path(text)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass
+
+    # pyfiglet loads its font files on import, only pay for it when the banner text changed
+    import pyfiglet
+    ascii_art = pyfiglet.figlet_format(text)
+    try:
+        os.makedirs(BANNER_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(ascii_art)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return ascii_art
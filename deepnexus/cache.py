@@ -0,0 +1,249 @@
+import os
+import time
+import select
+import struct
+import ctypes
+import threading
+
+_caches = []
+
+class TTLCache(object):
+    """ Small keyed cache where every entry expires after its own time-to-live (seconds).
+
+    Every instance registers itself so `clear_all_caches` can drop everything on `refresh`.
+    """
+
+    def __init__(self, name, default_ttl=60):
+        self.name = name
+        self.default_ttl = default_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key, loader, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        value = loader()
+        if ttl > 0:
+            with self._lock:
+                self._entries[key] = (time.monotonic() + ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        now = time.monotonic()
+        with self._lock:
+            return sum(1 for expires, _ in self._entries.values() if expires > now)
+
+# inotify(7) constants, the parent directory is watched so atomic replaces (rename over the file) are seen too
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+class Inotify(object):
+    """ Minimal inotify binding (ctypes), collects the paths changed since they were last marked clean. """
+
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        self.watches = {}
+        self.files = set()
+        self.dirty = set()
+
+    def watch(self, path):
+        directory = os.path.dirname(path)
+        if directory not in self.watches:
+            wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                return False
+            self.watches[directory] = wd
+            self.directories[wd] = directory
+        self.files.add(path)
+        return True
+
+    def drain(self):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                directory = self.directories.get(wd)
+                if mask & IN_Q_OVERFLOW:
+                    self.dirty.update(self.files)
+                elif mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    # The directory itself went away, everything below it is stale and must be watched again
+                    if directory is not None:
+                        self.dirty.update(f for f in self.files if os.path.dirname(f) == directory)
+                        self.watches.pop(directory, None)
+                        self.directories.pop(wd, None)
+                elif directory is not None and name:
+                    self.dirty.add(os.path.join(directory, os.fsdecode(name)))
+
+    def changed(self, path):
+        self.drain()
+        return path in self.dirty or os.path.dirname(path) not in self.watches
+
+    def mark(self, path):
+        self.drain()
+        self.dirty.discard(path)
+        if os.path.dirname(path) not in self.watches:
+            self.watch(path)
+
+_inotify = []
+
+def get_inotify():
+    if not _inotify:
+        try:
+            _inotify.append(Inotify())
+        except (OSError, AttributeError):
+            _inotify.append(None)
+    return _inotify[0]
+
+class InotifyWatch(object):
+    def __init__(self, inotify, path):
+        self.inotify = inotify
+        self.path = path
+
+    def changed(self):
+        return self.inotify.changed(self.path)
+
+    def mark(self):
+        self.inotify.mark(self.path)
+
+class MountTableWatch(object):
+    """ /proc/*/mounts can't be watched with inotify, the kernel flags every mount table change with POLLPRI instead. """
+
+    def __init__(self, path):
+        self.file = open(path)
+        self.poller = select.poll()
+        self.poller.register(self.file, select.POLLPRI | select.POLLERR)
+        self.pending = False
+
+    def changed(self):
+        # Each change is only reported once, so remember it until the view is rebuilt
+        self.pending = self.pending or bool(self.poller.poll(0))
+        return self.pending
+
+    def mark(self):
+        self.poller.poll(0)
+        self.pending = False
+
+class StatWatch(object):
+    """ Fallback when inotify is unavailable, a file changed when its mtime, size or inode did. """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def changed(self):
+        return self.signature is None or self._stat() != self.signature
+
+    def mark(self):
+        self.signature = self._stat()
+
+def watch_file(path):
+    path = os.path.abspath(path)
+    if path.startswith("/proc/") and path.endswith("/mounts"):
+        try:
+            return MountTableWatch(path)
+        except OSError:
+            return StatWatch(path)
+    inotify = get_inotify()
+    # inotify watches the link, not its target, so symlinked files are compared by stat
+    if inotify is not None and not os.path.islink(path) and inotify.watch(path):
+        return InotifyWatch(inotify, path)
+    return StatWatch(path)
+
+class FileCache(object):
+    """ Keeps the parsed view of a file until the file changes on disk.
+
+    Changes are detected with inotify, POLLPRI for mount tables and mtime/size/inode otherwise.
+    The watch is marked before the loader runs, so a write racing the parse only causes one extra reload.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._entries = {}
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, path, loader):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and not entry[0].changed():
+                return entry[1]
+            watch = entry[0] if entry is not None else watch_file(path)
+            watch.mark()
+            value = loader()
+            self._entries[path] = (watch, value)
+            return value
+
+    def put(self, path, value):
+        """Stores the view of a file the caller just wrote itself, so its own write doesn't trigger a reload."""
+        with self._lock:
+            entry = self._entries.get(path)
+            watch = entry[0] if entry is not None else watch_file(path)
+            watch.mark()
+            self._entries[path] = (watch, value)
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def clear(self):
+        self.invalidate()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+def clear_all_caches():
+    for cache in _caches:
+        cache.clear()
+    return len(_caches)
@@ -7,8 +7,12 @@ Igor Nunes, 2023
 * Contribute in https://github.com/ibnunes/Escape
 """
 
+from functools import lru_cache
 from platform import system as get_os
 
+# The platform cannot change while running, checking it on every escape call was the hot spot
+SUPPORTED_OS = get_os() in ["Linux", "Darwin"]
+
 class Ansi(object):
     """ Class to build ANSI Escape Codes (AEC)
 
@@ -123,15 +127,30 @@ class Ansi(object):
     @staticmethod
     def escape(*args) -> str:
         """Builds an ANSI Escape Code from the given arguments.
+        Codes are memoized, repeated calls with the same arguments return the precomputed string.
 
         ### Parameters
             * `args` (any): should be a string as defined in `ESCAPE_CODES` and, in case of personalized colors (`fg`, `bg`), unsigned int values in the range [0, 255].
 
+        ### Return
+            (str) A ready-to-use ANSI Escape Code.
+        """
+        return Ansi._build(args)
+
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _build(args : tuple) -> str:
+        """Internal function! Builds the ANSI Escape Code for `escape`, the result is cached per argument tuple.
+
+        ### Parameters
+            * `args` (tuple): the arguments given to `escape`.
+
         ### Return
             (str) A ready-to-use ANSI Escape Code.
         """
 
-        if get_os() not in ["Linux", "Darwin"]:
+        if not SUPPORTED_OS:
             return ""
 
         ESCAPE_FORMAT = "\033[§m"
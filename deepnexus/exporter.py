@@ -0,0 +1,126 @@
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from deepnexus.utils import atomic_write, load_cached_config, parse_mount_targets, is_disk_mounted, get_fstab_uuids
+from deepnexus.vars import APP_CONFIG_PATH, EXPORTER_TEXTFILE, EXPORTER_INTERVAL, EXPORTER_ADDRESS
+
+# `deepnexus-cli --exporter` collects on its own interval and writes the result for node_exporter's textfile
+# collector, the optional HTTP endpoint only ever serves the last written text so a scrape never queries hardware.
+
+METRICS = {
+    "deepnexus_controller_temperature_celsius": ("gauge", "ROC temperature of a SAS controller."),
+    "deepnexus_disk_temperature_celsius": ("gauge", "Disk temperature read with smartctl."),
+    "deepnexus_sensor_temperature_celsius": ("gauge", "lm-sensors temperature."),
+    "deepnexus_temperature_source_up": ("gauge", "Whether a temperature source answered in time (1) or timed out or failed (0)."),
+    "deepnexus_disk_mounted": ("gauge", "Whether a disk from disks.json is mounted at its mount point."),
+    "deepnexus_disk_in_fstab": ("gauge", "Whether a disk from disks.json has an active fstab entry."),
+    "deepnexus_exporter_collect_duration_seconds": ("gauge", "Seconds the last collection took."),
+    "deepnexus_exporter_last_success_timestamp_seconds": ("gauge", "Unix time of the last collection."),
+}
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_metrics(samples):
+    """Prometheus text exposition of (metric, labels, value) samples, grouped per metric in METRICS order."""
+    lines = []
+    for metric, (kind, help_text) in METRICS.items():
+        metric_samples = [(labels, value) for name, labels, value in samples if name == metric]
+        if not metric_samples:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in metric_samples:
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+def temperature_samples(tree):
+    samples = []
+    for source, branch in tree.items():
+        samples.append(("deepnexus_temperature_source_up", {"source": source}, int(isinstance(branch, dict))))
+        if not isinstance(branch, dict):
+            continue
+        for key, value in branch.items():
+            if source == "SAS" and isinstance(value, (int, float)):
+                samples.append(("deepnexus_controller_temperature_celsius", {"controller": key.replace("Controller ", "")}, value))
+            elif source == "Disks" and isinstance(value, (int, float)):
+                samples.append(("deepnexus_disk_temperature_celsius", {"label": key}, value))
+            elif isinstance(value, dict):
+                for sensor, reading in value.items():
+                    if isinstance(reading, (int, float)):
+                        samples.append(("deepnexus_sensor_temperature_celsius", {"chip": key, "sensor": sensor}, reading))
+    return samples
+
+def disk_samples():
+    from diskmanagement.registry import get_disk_registry
+    samples = []
+    mounted_paths = parse_mount_targets()
+    fstab_uuids = get_fstab_uuids()
+    for disk in get_disk_registry():
+        labels = {"label": disk["label"], "mount": f"/mnt/{disk['mnt']}", "uuid": disk["uuid"]}
+        samples.append(("deepnexus_disk_mounted", labels, int(is_disk_mounted(mounted_paths, labels["mount"]))))
+        samples.append(("deepnexus_disk_in_fstab", labels, int(disk["uuid"] in fstab_uuids)))
+    return samples
+
+def collect_samples():
+    """Every sample, temperatures come from the agent when one is running and are never added to the history."""
+    from deepnexus.temperature import show_temperatures
+    started = time.monotonic()
+    samples = temperature_samples(show_temperatures(record_history=False, printed=False))
+    samples += disk_samples()
+    samples.append(("deepnexus_exporter_collect_duration_seconds", {}, round(time.monotonic() - started, 3)))
+    samples.append(("deepnexus_exporter_last_success_timestamp_seconds", {}, int(time.time())))
+    return samples
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics[0].encode()
+        self.send_response(200 if body else 503)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_metrics(metrics, port, address=EXPORTER_ADDRESS):
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name="exporter-http", daemon=True).start()
+    return server
+
+def run_exporter(textfile=None, interval=None, port=None, once=False):
+    settings = (load_cached_config(APP_CONFIG_PATH) or {}).get("exporter", {})
+    textfile = textfile or settings.get("textfile", EXPORTER_TEXTFILE)
+    interval = interval or settings.get("interval", EXPORTER_INTERVAL)
+    port = port if port is not None else settings.get("port")
+    metrics = [""]
+    if port and not once:
+        serve_metrics(metrics, port, settings.get("address", EXPORTER_ADDRESS))
+        print(f"{time.strftime('%H:%M:%S')} Serving metrics on http://{settings.get('address', EXPORTER_ADDRESS)}:{port}/metrics")
+    if not once:
+        print(f"{time.strftime('%H:%M:%S')} Writing {textfile} every {interval}s")
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                metrics[0] = render_metrics(collect_samples())
+                os.makedirs(os.path.dirname(os.path.abspath(textfile)), exist_ok=True)
+                # The temporary file doesn't end in .prom and is renamed over the old one, node_exporter never reads half a file
+                atomic_write(textfile, metrics[0])
+            except Exception as e:
+                print(f"{time.strftime('%H:%M:%S')} Collection failed: {e}")
+                if once:
+                    return 1
+            if once:
+                return 0
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        return 0
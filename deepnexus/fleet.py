@@ -0,0 +1,169 @@
+import os
+import re
+import sys
+import json
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from deepnexus.runner import get_runner, CommandRunner, SubprocessBackend
+from deepnexus.tracing import span
+from deepnexus.utils import load_cached_config, status_message, Status
+from deepnexus.vars import APP_CONFIG_PATH, FLEET_TIMEOUT, FLEET_CONCURRENCY, FLEET_REMOTE_COMMAND, FLEET_CONTROL_PERSIST, FLEET_CONTROL_DIR
+
+# `fleet temps` and `fleet disks` run the one-shot JSON commands (see deepnexus/oneshot.py) on every host through
+# a transport and merge the answers. Hosts come from settings.json "fleet": {"hosts": [...], "transport": "ssh"}.
+
+TIMED_OUT = "timed out"
+# host, user@host, an ssh_config alias or an IP address, never anything ssh could read as an option (`-oProxyCommand=...`)
+HOST_PATTERN = re.compile(r'^(?:[A-Za-z0-9_.][A-Za-z0-9_.-]*@)?[A-Za-z0-9_:\[][A-Za-z0-9_.:%\[\]-]*$')
+
+class FleetError(RuntimeError):
+    pass
+
+def check_hosts(hosts):
+    invalid = [host for host in hosts if not HOST_PATTERN.match(str(host))]
+    if invalid:
+        raise FleetError(f"invalid fleet host {', '.join(repr(host) for host in invalid)}, expected 'host' or 'user@host'")
+
+class SshTransport(object):
+    """ Runs commands over OpenSSH. Connections are pooled per host with a ControlMaster socket that stays open
+    for `FLEET_CONTROL_PERSIST` seconds after the last command, so later commands skip the handshake. """
+
+    def __init__(self, remote_command=FLEET_REMOTE_COMMAND, control_dir=FLEET_CONTROL_DIR, persist=FLEET_CONTROL_PERSIST):
+        self.remote_command = remote_command
+        self.control_dir = control_dir
+        self.persist = persist
+
+    def argv(self, host, args, timeout):
+        check_hosts([host])
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        options = [
+            "-o", "BatchMode=yes",
+            "-o", f"ConnectTimeout={max(1, int(timeout))}",
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={os.path.join(self.control_dir, '%C')}",
+            "-o", f"ControlPersist={self.persist}",
+        ]
+        # ssh hands the remote shell one string, the command is left unquoted so ~ still expands
+        return ["ssh"] + options + [host, "--", self.remote_command + " " + shlex.join(args)]
+
+    def run(self, host, args, timeout):
+        return get_runner().run(self.argv(host, args, timeout), timeout)
+
+class LocalTransport(object):
+    """ Runs the one-shot command of this checkout as a subprocess for every host, to test the whole fleet path on one machine. """
+
+    def __init__(self, remote_command=None):
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "deepnexus-cli.py")
+        self.command = shlex.split(remote_command) if remote_command else [sys.executable, script]
+        # The children always run for real, with DEEPNEXUS_COMMAND_FIXTURES set they inherit it and answer from
+        # the fixtures themselves instead of being answered by them
+        self.runner = CommandRunner(SubprocessBackend())
+
+    def argv(self, host, args, timeout):
+        return self.command + list(args)
+
+    def run(self, host, args, timeout):
+        # Every host gets its own process even though the command lines are identical
+        return self.runner.run(self.argv(host, args, timeout), timeout, coalesce=False)
+
+TRANSPORTS = {
+    "ssh": SshTransport,
+    "local": LocalTransport,
+}
+
+def fleet_settings(app_config=None):
+    app_config = app_config or load_cached_config(APP_CONFIG_PATH)
+    return app_config.get("fleet", {})
+
+def get_transport(settings):
+    name = settings.get("transport", "ssh")
+    if name not in TRANSPORTS:
+        raise FleetError(f"unknown fleet transport '{name}' (available: {', '.join(TRANSPORTS)})")
+    remote_command = settings.get("remote_command")
+    return TRANSPORTS[name](remote_command) if remote_command else TRANSPORTS[name]()
+
+def query_host(transport, host, args, timeout):
+    with span(host, "fleet", command=" ".join(args)):
+        result = transport.run(host, list(args) + ["--json"], timeout)
+    if result.timed_out:
+        return None, TIMED_OUT
+    try:
+        data = json.loads(result.stdout)
+    except ValueError:
+        detail = (result.stderr.strip().splitlines() or [result.error or f"exit status {result.returncode}"])[-1]
+        return None, f"failed: {detail}"
+    if isinstance(data, dict) and set(data) == {"error"}:
+        return None, f"failed: {data['error']}"
+    return data, None
+
+def query_fleet(args, hosts=None, app_config=None):
+    """Runs the one-shot command `args` on every host at the same time.
+
+    Returns {host: (data, error)} in host order, `error` is None or a short message when the host timed out or failed.
+    """
+    settings = fleet_settings(app_config)
+    hosts = hosts or settings.get("hosts", [])
+    if not hosts:
+        raise FleetError("no fleet hosts configured, add them to \"fleet\": {\"hosts\": [...]} in settings.json")
+    check_hosts(hosts)
+    transport = get_transport(settings)
+    timeout = settings.get("timeout", FLEET_TIMEOUT)
+    workers = max(1, min(len(hosts), settings.get("concurrency", FLEET_CONCURRENCY)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet") as executor:
+        futures = {host: executor.submit(query_host, transport, host, args, timeout) for host in hosts}
+    return {host: future.result() for host, future in futures.items()}
+
+def fleet_temperature_tree(hosts=None):
+    return {host: error if data is None else data for host, (data, error) in query_fleet(["temps"], hosts).items()}
+
+def fleet_disks(hosts=None):
+    disks = []
+    errors = {}
+    for host, (data, error) in query_fleet(["disks", "show"], hosts).items():
+        if data is None:
+            errors[host] = error
+            continue
+        disks.extend({"host": host, **disk} for disk in data)
+    return disks, errors
+
+def show_fleet_temperatures(hosts=None):
+    from deepnexus.temperature import print_tree
+    tree = fleet_temperature_tree(hosts)
+    print("Fleet")
+    print_tree(tree)
+    print()
+
+def show_fleet_disks(hosts=None):
+    from tabulate import tabulate
+    disks, errors = fleet_disks(hosts)
+    if disks:
+        data = [[d["host"], "yes" if d.get("mounted") else "no", d["label"], d.get("mount_point", f"/mnt/{d['mnt']}"), d["uuid"], d.get("phy", ""),
+                 d["card"] if d.get("card", -1) != -1 else "N/A", d["slt"] if d.get("slt", -1) != -1 else "N/A"] for d in disks]
+        print(tabulate(data, headers=["Host", "Mounted", "Label", "Mount Point", "Partition UUID", "Physical Location", "SAS Card", "SAS Slot"]))
+    else:
+        print("No disks reported")
+    for host, error in errors.items():
+        print(f"{status_message(Status.ERROR)} {host}: {error}")
+    print()
+
+def fleet_command(cmd):
+    """`fleet temps [host ...]`, `fleet disks [host ...]` and `fleet hosts`."""
+    parts = cmd.split()
+    try:
+        if len(parts) >= 2 and parts[1] in ("temps", "temperatures"):
+            print()
+            show_fleet_temperatures(parts[2:])
+        elif len(parts) >= 2 and parts[1] == "disks":
+            print()
+            show_fleet_disks(parts[2:])
+        elif parts[1:] == ["hosts"]:
+            settings = fleet_settings()
+            print(f"Transport: {settings.get('transport', 'ssh')}")
+            print("Hosts: " + (", ".join(settings.get("hosts", [])) or "none"))
+            print()
+        else:
+            print("Invalid syntax. Use 'fleet temps [host ...]', 'fleet disks [host ...]' or 'fleet hosts'")
+            print()
+    except FleetError as e:
+        print(f"{status_message(Status.ERROR)} {e}")
+        print()
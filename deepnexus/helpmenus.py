@@ -1,6 +1,10 @@
 def common_commands():
     help_text = """
   clear               - Clear the terminal screen
+  refresh             - Discard cached hardware information
+  stats               - Show p50/p95 latency of the commands, tools and files used this session
+  trace on [file]     - Record a Chrome trace of the commands, written on 'trace off' or exit
+  trace off           - Stop recording and write the trace file
   help                - Show this help menu
   exit                - Exit the DeepNexus CLI
 """
@@ -9,6 +13,10 @@ def common_commands():
 def common_commands_with_back():
     help_text = """
   clear               - Clear the terminal screen
+  refresh             - Discard cached hardware information
+  stats               - Show p50/p95 latency of the commands, tools and files used this session
+  trace on [file]     - Record a Chrome trace of the commands, written on 'trace off' or exit
+  trace off           - Stop recording and write the trace file
   help                - Show this help menu
   back, ..            - Exit the DeepNexus Disk Utility
   exit                - Exit the current tool
@@ -20,6 +28,13 @@ def deepnexus_help():
 Available commands:
   disks               - Enter SAS submenu
   temperatures, temps - Shows system temperatures
+  temps watch [secs]  - Live temperatures with min/max/trend, refreshed every [secs] (default 5)
+  temps history [label] [range]
+                      - Recorded temperatures of a sensor over a range (e.g. 6h, 7d), lists sensors without label
+  fleet temps [hosts] - Temperatures of every fleet host in one tree
+  fleet disks [hosts] - Configured disks of every fleet host in one table
+  fleet hosts         - Shows the configured fleet hosts and transport
+  agent               - Shows whether an agent is running and how fresh its state is
   shell               - Open shell
   update              - Updates to the latest version
   settings            - Open settings menu
@@ -1,44 +1,85 @@
 from deepnexus.helpmenus import deepnexus_help, command_not_found
 from deepnexus.vars import APP_CONFIG_PATH
-from deepnexus.utils import clear_screen, load_config, get_prompt_text
-from deepnexus.updater import update_tool
-from deepnexus.settings import settings_menu
-from diskmanagement.menu import disks_menu
-from deepnexus.shell_launcher import open_shell
-from deepnexus.temperature import print_tree, build_temperature_tree
+from deepnexus.utils import clear_screen, load_config, get_prompt_text, status_message, Status, refresh_caches
+from deepnexus.tracing import span, print_stats, trace_command
+
+# Submenus and collectors are imported by the command that needs them so the first prompt shows up
+# without loading prompt_toolkit, tabulate and every hardware module
 
 def main_menu():
     app_config = load_config(APP_CONFIG_PATH)
     while True:
         try:
             cmd = input(get_prompt_text(app_config)).strip()
-            if cmd == "exit":
-                break
-            elif cmd == "shell":
-                open_shell(app_config)
-            elif cmd == "disks":
-                disks_menu(app_config)
-            elif cmd == "help":
-                deepnexus_help()
-            elif cmd == "clear":
-                clear_screen()
-            elif cmd == "update":
-                print()
-                update_tool()
-            elif cmd == "settings":
-                settings_menu()
-                print()
-                app_config = load_config(APP_CONFIG_PATH)
-            elif cmd == "temperatures" or cmd == "temps":
-                print()
-                print(app_config["prompt"]["hostname"]["name"])
-                tree = build_temperature_tree()
-                print_tree(tree)
-                print()
-            elif cmd == "":
+            if not cmd:
                 continue
-            else:
-                command_not_found(cmd)
+            with span(cmd, "command"):
+                if cmd == "exit":
+                    break
+                elif cmd == "shell":
+                    from deepnexus.shell_launcher import open_shell
+                    open_shell(app_config)
+                elif cmd == "disks":
+                    from diskmanagement.menu import disks_menu
+                    disks_menu(app_config)
+                elif cmd == "fleet" or cmd.startswith("fleet "):
+                    from deepnexus.fleet import fleet_command
+                    fleet_command(cmd)
+                elif cmd == "agent":
+                    from deepnexus.agent import show_agent_status
+                    print()
+                    show_agent_status()
+                elif cmd == "stats":
+                    print()
+                    print_stats()
+                elif cmd == "trace" or cmd.startswith("trace "):
+                    trace_command(cmd)
+                elif cmd == "refresh":
+                    refresh_caches()
+                elif cmd == "help":
+                    deepnexus_help()
+                elif cmd == "clear":
+                    clear_screen()
+                elif cmd == "update":
+                    from deepnexus.updater import update_tool
+                    print()
+                    update_tool()
+                elif cmd == "settings":
+                    from deepnexus.settings import settings_menu
+                    settings_menu()
+                    print()
+                    app_config = load_config(APP_CONFIG_PATH)
+                elif cmd.split()[:2] in (["temperatures", "watch"], ["temps", "watch"]):
+                    from deepnexus.temperature_watch import watch_temperatures, parse_interval
+                    parts = cmd.split()
+                    interval = parse_interval(parts[2] if len(parts) > 2 else None)
+                    if interval is None or len(parts) > 3:
+                        print("Invalid syntax. Use 'temps watch' or 'temps watch <seconds>'")
+                        print()
+                    else:
+                        watch_temperatures(interval, app_config["prompt"]["hostname"]["name"], record_history=app_config.get("temperature_history", True))
+                elif cmd.split()[:2] in (["temperatures", "history"], ["temps", "history"]):
+                    from deepnexus.temperature_history import show_temperature_history, show_history_labels, parse_range
+                    parts = cmd.split()[2:]
+                    print()
+                    if not parts:
+                        show_history_labels()
+                    elif len(parts) > 1 and parse_range(parts[-1]) is not None:
+                        show_temperature_history(" ".join(parts[:-1]), parts[-1])
+                    else:
+                        show_temperature_history(" ".join(parts))
+                elif cmd == "temperatures" or cmd == "temps":
+                    from deepnexus.temperature import show_temperatures
+                    from diskmanagement.disks import smart_poll_summary
+                    print()
+                    print(app_config["prompt"]["hostname"]["name"])
+                    show_temperatures(app_config.get("temperature_history", True))
+                    summary = smart_poll_summary()
+                    if summary:
+                        print(f"{status_message(Status.INFO)} {summary}")
+                    print()
+                else:
+                    command_not_found(cmd)
         except KeyboardInterrupt:
             print("Interrupted Detected! Exiting...")
             exit()
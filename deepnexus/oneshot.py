@@ -0,0 +1,150 @@
+import sys
+import json
+import contextlib
+from dataclasses import asdict
+from deepnexus.utils import load_cached_config
+from deepnexus.vars import APP_CONFIG_PATH
+
+# `deepnexus-cli <command> [--json]` runs a single command and exits. Only the modules of that command are
+# imported, never prompt_toolkit, so cron jobs and probes can call it cheaply.
+
+def temperatures(args, as_json):
+    from deepnexus.temperature import show_temperatures
+    app_config = load_cached_config(APP_CONFIG_PATH)
+    if not as_json:
+        print(app_config["prompt"]["hostname"]["name"])
+    return show_temperatures(app_config.get("temperature_history", True), printed=not as_json)
+
+def temperature_history(args, as_json):
+    from deepnexus.temperature_history import show_temperature_history, show_history_labels, list_history_labels, find_history_labels, parse_range, query_history
+    from deepnexus.vars import DEFAULT_HISTORY_RANGE
+    range_text = args[-1] if len(args) > 1 and parse_range(args[-1]) is not None else None
+    query = " ".join(args[:-1] if range_text else args)
+    if not as_json:
+        if query:
+            show_temperature_history(query, range_text)
+        else:
+            show_history_labels()
+        return None
+    if not query:
+        return list_history_labels()
+    seconds = parse_range(range_text or DEFAULT_HISTORY_RANGE)
+    labels = find_history_labels(query)
+    if len(labels) != 1:
+        raise ValueError(f"'{query}' matches {len(labels) or 'no'} sensors" + (f": {', '.join(labels)}" if labels else ""))
+    tier, records = query_history(labels[0], seconds)
+    return {
+        "label": labels[0],
+        "range": range_text or DEFAULT_HISTORY_RANGE,
+        "resolution": tier,
+        "records": [{"timestamp": r[0], "avg": r[1], "min": r[2] if len(r) > 2 else r[1], "max": r[3] if len(r) > 3 else r[1]} for r in records],
+    }
+
+def disks(args, as_json, sas_tree=True):
+    from deepnexus.utils import parse_mount_targets, is_disk_mounted
+    from diskmanagement.registry import get_disk_registry
+    from diskmanagement.disks import show_all_disks, show_disks_tree
+    from diskmanagement.correlation import get_disk_correlation, disk_slot
+    registry = get_disk_registry()
+    if not as_json:
+        if sas_tree and load_cached_config(APP_CONFIG_PATH)["enable_sas"]:
+            show_disks_tree(registry)
+        else:
+            show_all_disks(registry)
+        return None
+    mounted_paths = parse_mount_targets()
+    correlation = get_disk_correlation()
+    disks = []
+    for disk in registry:
+        # Where the disk is now, the recorded dev/card/slot may be out of date; dev is null when it isn't attached
+        location = correlation.resolve(disk)
+        card, slot = disk_slot(disk, correlation)
+        disks.append({**disk, "dev": location.dev if location else None, "card": card, "slt": slot,
+                      "mount_point": f"/mnt/{disk['mnt']}", "mounted": is_disk_mounted(mounted_paths, f"/mnt/{disk['mnt']}")})
+    return disks
+
+def all_disks(args, as_json):
+    return disks(args, as_json, sas_tree=False)
+
+def sas_slots(args, as_json):
+    if not load_cached_config(APP_CONFIG_PATH)["enable_sas"]:
+        raise ValueError("SAS functionality disabled")
+    if args and not args[0].isdigit():
+        raise ValueError("use 'disks sas slots [controller id]'")
+    from diskmanagement.sas import get_sas_drives, show_sas_slots
+    controller = args[0] if args else None
+    if not as_json:
+        show_sas_slots(controller)
+        return None
+    return [asdict(drive) for drive in get_sas_drives(controller)]
+
+def fstab(args, as_json):
+    from diskmanagement.fstab import FstabDocument
+    document = FstabDocument.load()
+    entries = [{"uuid": line.uuid, "mount": line.mount, "fields": line.fields, "active": not line.commented}
+               for line in document.entries(include_commented=True)]
+    if not as_json:
+        for entry in entries:
+            print(f"{'●' if entry['active'] else '○'} {entry['uuid'] or entry['fields'][0]} {entry['mount']}")
+        return None
+    return entries
+
+def fleet_temperatures(args, as_json):
+    from deepnexus.fleet import fleet_temperature_tree, show_fleet_temperatures
+    if not as_json:
+        show_fleet_temperatures(args)
+        return None
+    return fleet_temperature_tree(args)
+
+def fleet_disks(args, as_json):
+    from deepnexus.fleet import fleet_disks as collect_fleet_disks, show_fleet_disks
+    if not as_json:
+        show_fleet_disks(args)
+        return None
+    disks, errors = collect_fleet_disks(args)
+    return {"disks": disks, "errors": errors}
+
+# Words of a command -> handler(remaining words, as_json), the longest match wins
+COMMANDS = {
+    ("temps",): temperatures,
+    ("temperatures",): temperatures,
+    ("temps", "history"): temperature_history,
+    ("temperatures", "history"): temperature_history,
+    ("disks", "show"): disks,
+    ("disks", "show", "all"): all_disks,
+    ("disks", "sas", "slots"): sas_slots,
+    ("disks", "fstab"): fstab,
+    ("fleet", "temps"): fleet_temperatures,
+    ("fleet", "temperatures"): fleet_temperatures,
+    ("fleet", "disks"): fleet_disks,
+}
+
+def find_command(words):
+    for length in range(len(words), 0, -1):
+        handler = COMMANDS.get(tuple(words[:length]))
+        if handler:
+            return handler, words[length:]
+    return None, words
+
+def run_oneshot(words, as_json=False):
+    """Runs one command and returns the process exit status."""
+    handler, args = find_command(words)
+    if handler is None:
+        print(f"Unknown command: {' '.join(words)}", file=sys.stderr)
+        print("Available: " + ", ".join(" ".join(command) for command in COMMANDS), file=sys.stderr)
+        return 2
+    try:
+        if not as_json:
+            handler(args, False)
+            return 0
+        # Warnings printed while collecting must not end up in the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = handler(args, True)
+    except (ValueError, OSError, RuntimeError) as e:
+        if as_json:
+            print(json.dumps({"error": str(e)}))
+        else:
+            print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(result, indent=2, default=str))
+    return 0
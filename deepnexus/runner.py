@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import codecs
+import shlex
+import signal
+import asyncio
+import fnmatch
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional
+from deepnexus.tracing import span
+from deepnexus.vars import COMMAND_TIMEOUTS, COMMAND_CONCURRENCY, DEFAULT_COMMAND_TIMEOUT, COMMAND_HISTORY
+
+# Every external tool goes through one CommandRunner (see `get_runner`), which applies the per-tool timeout
+# and concurrency cap, runs identical commands already in flight only once and records every call.
+
+class CommandError(RuntimeError):
+    pass
+
+@dataclass
+class CommandResult:
+    argv: List[str]
+    returncode: Optional[int]
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    timed_out: bool = False
+    error: Optional[str] = None
+    coalesced: bool = False
+
+    @property
+    def command(self):
+        return shlex.join(self.argv)
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and self.error is None
+
+    def check(self, allow_status=False):
+        """Raises CommandError when the command timed out, didn't start or, unless `allow_status`, exited non-zero."""
+        if self.timed_out:
+            raise CommandError(f"'{self.command}' timed out after {self.duration:.1f}s")
+        if self.error is not None:
+            raise CommandError(f"'{self.command}' could not run: {self.error}")
+        if not allow_status and self.returncode != 0:
+            detail = self.stderr.strip().splitlines()[-1] if self.stderr.strip() else ""
+            raise CommandError(f"'{self.command}' failed with exit status {self.returncode}" + (f": {detail}" if detail else ""))
+        return self
+
+def tool_name(argv):
+    return os.path.basename(argv[0]) if argv else ""
+
+class SubprocessBackend(object):
+    """ Runs commands for real. Each command gets its own process group so a timeout or cancel stops its children too. """
+
+    def run(self, argv, timeout=None):
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                                       text=True, errors="replace", start_new_session=True)
+        except OSError as e:
+            return CommandResult(argv, 127, duration=time.monotonic() - started, error=e.strerror or str(e))
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            return CommandResult(argv, process.returncode, stdout, stderr, time.monotonic() - started)
+        except subprocess.TimeoutExpired:
+            _signal_group(process.pid, signal.SIGKILL)
+            stdout, stderr = process.communicate()
+            return CommandResult(argv, None, stdout, stderr, time.monotonic() - started, timed_out=True)
+
+    async def stream(self, argv, on_line, on_partial=None, timeout=None):
+        started = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(*argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                           stdin=subprocess.DEVNULL, start_new_session=True)
+        except OSError as e:
+            return CommandResult(argv, 127, duration=time.monotonic() - started, error=e.strerror or str(e))
+        output = []
+
+        def emit(line):
+            output.append(line)
+            on_line(line)
+
+        try:
+            await asyncio.wait_for(_read_lines(process.stdout, emit, on_partial), timeout)
+            returncode = await process.wait()
+            return CommandResult(argv, returncode, "\n".join(output), duration=time.monotonic() - started)
+        except asyncio.TimeoutError:
+            await _stop(process)
+            return CommandResult(argv, None, "\n".join(output), duration=time.monotonic() - started, timed_out=True)
+        except asyncio.CancelledError:
+            await _stop(process)
+            raise
+
+async def _read_lines(stream, on_line, on_partial=None):
+    # Tools like mke2fs redraw their progress with backspaces and carriage returns, the line being
+    # redrawn goes to `on_partial` after every read
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    line = []
+    while True:
+        chunk = await stream.read(4096)
+        for char in decoder.decode(chunk, final=not chunk):
+            if char == "\n":
+                on_line("".join(line).rstrip())
+                line = []
+            elif char == "\r":
+                line = []
+            elif char == "\b":
+                if line:
+                    line.pop()
+            else:
+                line.append(char)
+        if on_partial and line:
+            on_partial("".join(line))
+        if not chunk:
+            break
+    if line:
+        on_line("".join(line).rstrip())
+
+async def _stop(process):
+    if process.returncode is not None:
+        return
+    _signal_group(process.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), 5)
+    except asyncio.TimeoutError:
+        _signal_group(process.pid, signal.SIGKILL)
+        await process.wait()
+
+def _signal_group(pid, sig):
+    try:
+        os.killpg(pid, sig)
+    except ProcessLookupError:
+        pass
+
+class FixtureBackend(object):
+    """ Answers commands from recorded output instead of running them, for tests and machines without the hardware.
+
+    `fixtures` maps a command line (`shlex.join(argv)`, fnmatch patterns allowed) to its stdout, to a dict
+    with stdout, stderr, returncode and delay (seconds), or to a callable taking argv and returning either.
+    Commands without a fixture fail with exit status 127. Every command asked for is kept in `calls`.
+    """
+
+    def __init__(self, fixtures=None):
+        self.fixtures = dict(fixtures or {})
+        self.calls = []
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _lookup(self, command):
+        if command in self.fixtures:
+            return self.fixtures[command]
+        for pattern, fixture in self.fixtures.items():
+            if fnmatch.fnmatchcase(command, pattern):
+                return fixture
+        return None
+
+    def run(self, argv, timeout=None):
+        command = shlex.join(argv)
+        self.calls.append(command)
+        fixture = self._lookup(command)
+        if callable(fixture):
+            fixture = fixture(argv)
+        if fixture is None:
+            return CommandResult(argv, 127, error=f"no fixture for '{command}'")
+        if isinstance(fixture, str):
+            fixture = {"stdout": fixture}
+        delay = fixture.get("delay", 0)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            return CommandResult(argv, None, duration=timeout, timed_out=True)
+        if delay:
+            time.sleep(delay)
+        return CommandResult(argv, fixture.get("returncode", 0), fixture.get("stdout", ""), fixture.get("stderr", ""), delay)
+
+    async def stream(self, argv, on_line, on_partial=None, timeout=None):
+        result = await asyncio.to_thread(self.run, argv, timeout)
+        for line in result.stdout.splitlines():
+            on_line(line)
+        return result
+
+class _InFlight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class ToolStats(object):
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.coalesced = 0
+        self.durations = deque(maxlen=COMMAND_HISTORY)
+
+class CommandRunner(object):
+    """ Runs argv lists through a backend with per-tool timeouts and concurrency caps.
+
+    `run` blocks, `run_async` and `stream` are coroutines for prompt_toolkit applications. Identical commands
+    requested while one is already running wait for it and share its result instead of starting another process.
+    """
+
+    def __init__(self, backend=None, timeouts=None, limits=None, default_timeout=DEFAULT_COMMAND_TIMEOUT):
+        self.backend = backend or SubprocessBackend()
+        self.timeouts = {**COMMAND_TIMEOUTS, **(timeouts or {})}
+        self.limits = {**COMMAND_CONCURRENCY, **(limits or {})}
+        self.default_timeout = default_timeout
+        self.history = deque(maxlen=COMMAND_HISTORY)
+        self.tools = {}
+        self._semaphores = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, argv, timeout=None):
+        if timeout is not None:
+            return timeout
+        return self.timeouts.get(tool_name(argv), self.default_timeout)
+
+    def _semaphore(self, tool):
+        limit = self.limits.get(tool)
+        if not limit:
+            return None
+        with self._lock:
+            if tool not in self._semaphores:
+                self._semaphores[tool] = threading.BoundedSemaphore(limit)
+            return self._semaphores[tool]
+
+    def _record(self, result):
+        with self._lock:
+            stats = self.tools.setdefault(tool_name(result.argv), ToolStats())
+            stats.calls += 1
+            if result.coalesced:
+                stats.coalesced += 1
+            else:
+                stats.durations.append(result.duration)
+            if result.timed_out:
+                stats.timeouts += 1
+            elif not result.ok:
+                stats.failures += 1
+            self.history.append(result)
+        return result
+
+    def run(self, argv, timeout=None, coalesce=True):
+        argv = [str(arg) for arg in argv]
+        key = tuple(argv)
+        owner = True
+        if coalesce:
+            with self._lock:
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    in_flight = self._in_flight[key] = _InFlight()
+                else:
+                    owner = False
+            if not owner:
+                in_flight.done.wait()
+                if in_flight.result is not None:
+                    shared = in_flight.result
+                    return self._record(CommandResult(argv, shared.returncode, shared.stdout, shared.stderr, shared.duration,
+                                                      shared.timed_out, shared.error, coalesced=True))
+                return self.run(argv, timeout, coalesce=False)
+
+        result = None
+        try:
+            semaphore = self._semaphore(tool_name(argv))
+            if semaphore:
+                semaphore.acquire()
+            try:
+                with span(tool_name(argv), "exec", command=shlex.join(argv)):
+                    result = self.backend.run(argv, self.timeout_for(argv, timeout))
+            finally:
+                if semaphore:
+                    semaphore.release()
+            return self._record(result)
+        finally:
+            if coalesce:
+                in_flight.result = result
+                with self._lock:
+                    self._in_flight.pop(key, None)
+                in_flight.done.set()
+
+    async def run_async(self, argv, timeout=None, coalesce=True):
+        return await asyncio.to_thread(self.run, argv, timeout, coalesce)
+
+    async def stream(self, argv, on_line, on_partial=None, timeout=None):
+        """Runs `argv` in the current event loop, passing its output (stdout and stderr) to `on_line` line by line."""
+        argv = [str(arg) for arg in argv]
+        semaphore = self._semaphore(tool_name(argv))
+        if semaphore:
+            # A blocking acquire would hold a worker thread even after the task is cancelled
+            while not semaphore.acquire(blocking=False):
+                await asyncio.sleep(0.05)
+        try:
+            with span(tool_name(argv), "exec", command=shlex.join(argv)):
+                result = await self.backend.stream(argv, on_line, on_partial, self.timeout_for(argv, timeout))
+        finally:
+            if semaphore:
+                semaphore.release()
+        return self._record(result)
+
+    def stats(self):
+        with self._lock:
+            return {tool: {
+                "calls": stats.calls,
+                "failures": stats.failures,
+                "timeouts": stats.timeouts,
+                "coalesced": stats.coalesced,
+                "durations": list(stats.durations),
+            } for tool, stats in self.tools.items()}
+
+_runner = []
+_runner_lock = threading.Lock()
+
+def get_runner():
+    """The runner shared by the whole application, DEEPNEXUS_COMMAND_FIXTURES points it at a fixture file."""
+    with _runner_lock:
+        if not _runner:
+            from deepnexus.utils import load_cached_config
+            from deepnexus.vars import APP_CONFIG_PATH
+            app_config = load_cached_config(APP_CONFIG_PATH) or {}
+            fixtures = os.environ.get("DEEPNEXUS_COMMAND_FIXTURES")
+            backend = FixtureBackend.load(fixtures) if fixtures else SubprocessBackend()
+            _runner.append(CommandRunner(backend, app_config.get("command_timeouts"), app_config.get("command_concurrency")))
+        return _runner[0]
+
+def set_runner(runner):
+    """Replaces the shared runner, e.g. with `CommandRunner(FixtureBackend(...))` in tests."""
+    with _runner_lock:
+        _runner[:] = [runner]
+    return runner
+
+def run(argv, timeout=None, coalesce=True):
+    return get_runner().run(argv, timeout, coalesce)
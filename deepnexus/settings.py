@@ -1,6 +1,6 @@
 import json
 from deepnexus.utils import Status, status_message, load_config
-from deepnexus.vars import APP_CONFIG_PATH
+from deepnexus.vars import APP_CONFIG_PATH, FORMAT_PROFILES
 
 def save_settings(settings):
     with open(APP_CONFIG_PATH, 'w') as f:
@@ -51,6 +51,9 @@ def settings_menu():
         print("3. Enable/disable SAS submenu")        
         print("4. Change banner text")
         print("5. Prompt configuration")
+        print("6. SMART polling concurrency")
+        print("7. Batch disk initialization concurrency")
+        print("8. Default format profile")
         print("0. Back")
         choice = input("Select an option: ")
 
@@ -80,6 +83,34 @@ def settings_menu():
         elif choice == '5':
             prompt_menu(settings)
 
+        elif choice == '6':
+            value = input("Max parallel smartctl processes: ").strip()
+            if value.isdigit() and int(value) > 0:
+                settings["smart_concurrency"] = int(value) # type: ignore
+                save_settings(settings)
+                print(f"{status_message(Status.SUCCESS)} SMART polling concurrency saved.")
+            else:
+                print(f"{status_message(Status.ERROR)} Invalid value.")
+
+        elif choice == '7':
+            value = input("Disks initialized at the same time: ").strip()
+            if value.isdigit() and int(value) > 0:
+                settings["init_concurrency"] = int(value) # type: ignore
+                save_settings(settings)
+                print(f"{status_message(Status.SUCCESS)} Batch initialization concurrency saved.")
+            else:
+                print(f"{status_message(Status.ERROR)} Invalid value.")
+
+        elif choice == '8':
+            profiles = {**FORMAT_PROFILES, **settings.get("format_profiles", {})} # type: ignore
+            value = input(f"Format profile ({', '.join(profiles)}): ").strip()
+            if value in profiles:
+                settings["format_profile"] = value # type: ignore
+                save_settings(settings)
+                print(f"{status_message(Status.SUCCESS)} Default format profile saved.")
+            else:
+                print(f"{status_message(Status.ERROR)} Unknown profile.")
+
         elif choice == '0':
             break
 
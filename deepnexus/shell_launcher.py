@@ -1,24 +1,55 @@
 import os
 import sys
+import shlex
+import signal
+import subprocess
+from deepnexus.utils import status_message, Status
+
+def save_terminal_state():
+    if not sys.stdin.isatty():
+        return None
+    import termios
+    try:
+        return termios.tcgetattr(sys.stdin.fileno())
+    except termios.error:
+        return None
+
+def restore_terminal_state(state):
+    if state is None:
+        return
+    import termios
+    try:
+        termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, state)
+    except termios.error:
+        pass
+
+def _reset_child_signals():
+    # The CLI ignores ctrl+c while the shell runs, the shell and its jobs must still receive it
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGQUIT, signal.SIG_DFL)
 
 def open_shell(app_config):
     home_dir = os.path.expanduser("~")
-    os.chdir(home_dir)
+    previous_dir = os.getcwd()
 
     env = os.environ.copy()
     env["DEEPNEXUS_INTERNAL_CALL"] = "1"
 
     shell = os.environ.get("SHELL", app_config["shell"])
-    os.system(f'DEEPNEXUS_INTERNAL_CALL=1 {shell}')
-
-    os.system('clear')
-
-    python = sys.executable
-    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    script_path = os.path.join(root_dir, "deepnexus-cli.py")
-    os.chdir(root_dir)
-    os.execv(python, [python, script_path])
+    terminal_state = save_terminal_state()
+    previous_sigint = signal.signal(signal.SIGINT, signal.SIG_IGN)
+    previous_sigquit = signal.signal(signal.SIGQUIT, signal.SIG_IGN)
+    try:
+        subprocess.run(shlex.split(shell), cwd=home_dir, env=env, preexec_fn=_reset_child_signals)
+    except OSError as e:
+        print(f"{status_message(Status.ERROR)} Could not start {shell}: {e}")
+    finally:
+        signal.signal(signal.SIGINT, previous_sigint)
+        signal.signal(signal.SIGQUIT, previous_sigquit)
+        restore_terminal_state(terminal_state)
+        os.chdir(previous_dir)
+    print()
 
 if __name__ == "__main__":
     app_config = {"shell": os.environ.get("SHELL", "/bin/bash")}
-    open_shell()
\ No newline at end of file
+    open_shell(app_config)
@@ -1,39 +1,121 @@
 from diskmanagement.sas import get_storcli_temperatures
 import re
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from diskmanagement.disks import get_smart_temperatures
+from deepnexus.vars import TEMPERATURE_TIMEOUTS
+from deepnexus.runner import get_runner
+from deepnexus.tracing import span
 
-def build_temperature_tree():
+TIMED_OUT = "timed out"
+FAILED = "failed"
+
+def temperature_sources():
     return {
-        "SAS": get_storcli_temperatures(),
-        "Disks": get_smart_temperatures(),
-        "Sensors": get_sensor_temperatures()
+        "SAS": get_storcli_temperatures,
+        "Disks": get_smart_temperatures,
+        "Sensors": get_sensor_temperatures
     }
 
+def collect_temperatures(on_branch=None):
+    sources = temperature_sources()
+    tree = {}
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="temps")
+    started = time.monotonic()
+    pending = {}
+    deadlines = {}
+    for name, source in sources.items():
+        timeout = TEMPERATURE_TIMEOUTS.get(name, 10)
+        pending[executor.submit(timed_source, name, source, timeout)] = name
+        deadlines[name] = started + timeout
+
+    while pending:
+        next_deadline = min(deadlines[name] for name in pending.values())
+        done, _ = wait(pending, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+
+        finished = []
+        for future in done:
+            finished.append((pending.pop(future), _branch_value(future)))
+        now = time.monotonic()
+        for future, name in list(pending.items()):
+            if now >= deadlines[name]:
+                del pending[future]
+                future.cancel()
+                finished.append((name, TIMED_OUT))
+
+        for idx, (name, value) in enumerate(finished):
+            tree[name] = value
+            if on_branch:
+                on_branch(name, value, not pending and idx == len(finished) - 1)
+
+    # Hung sources are left to their own command timeouts, the prompt does not wait for them
+    executor.shutdown(wait=False)
+    return tree
+
+def timed_source(name, source, timeout):
+    with span(name, "collect"):
+        return source(timeout=timeout)
+
+def _branch_value(future):
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"temperature source error: {e}")
+        return FAILED
+
+def build_temperature_tree():
+    return collect_temperatures()
+
+def print_temperature_tree():
+    return collect_temperatures(on_branch=lambda key, value, is_last: print_branch(key, value, is_last))
+
+def show_temperatures(record_history=True, printed=True):
+    """The temperature tree, printed branch by branch unless `printed` is false.
+
+    A running agent answers straight away with its latest tree, which it already records to the history itself.
+    """
+    from deepnexus.agent import agent_request
+    tree = agent_request({"get": "temps"})
+    if tree is not None:
+        if printed:
+            print_tree(tree)
+        return tree
+    tree = print_temperature_tree() if printed else build_temperature_tree()
+    if record_history:
+        from deepnexus.temperature_history import record_temperature_tree
+        record_temperature_tree(tree)
+    return tree
+
+def flatten_tree(tree, path=()):
+    readings = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            readings.update(flatten_tree(value, path + (key,)))
+        else:
+            readings[path + (key,)] = value
+    return readings
+
 def print_tree(data, prefix=""):
     last_key = list(data.keys())[-1]
     for key in data:
-        is_last = (key == last_key)
-        branch = "└── " if is_last else "├── "
-        extension = "    " if is_last else "│   "
+        print_branch(key, data[key], key == last_key, prefix)
 
-        value = data[key]
-        if isinstance(value, dict):
-            print(f"{prefix}{branch}{key}")
+def print_branch(key, value, is_last, prefix=""):
+    branch = "└── " if is_last else "├── "
+    extension = "    " if is_last else "│   "
+
+    if isinstance(value, dict):
+        print(f"{prefix}{branch}{key}")
+        if value:
             print_tree(value, prefix + extension)
-        else:
-            print(f"{prefix}{branch}{key}: {value}°C")
+    elif isinstance(value, str):
+        print(f"{prefix}{branch}{key}: {value}")
+    else:
+        print(f"{prefix}{branch}{key}: {value}°C")
 
-def get_sensor_temperatures():
+def get_sensor_temperatures(timeout=None):
     try:
-        result = subprocess.run(
-            ["sensors"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
-        output = result.stdout
+        output = get_runner().run(["sensors"], timeout).check().stdout
         lines = output.splitlines()
 
         cpu_data = {}
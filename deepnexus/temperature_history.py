@@ -0,0 +1,341 @@
+import os
+import re
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import tempfile
+import threading
+from deepnexus.temperature import flatten_tree
+from deepnexus.vars import TEMPERATURE_HISTORY_DIR, TEMPERATURE_HISTORY_CAPACITY, DEFAULT_HISTORY_RANGE
+
+# One memory-mapped file per sensor holding three fixed-size rings:
+#   raw     (timestamp u32, celsius f32)                 every recorded sample
+#   minute  (timestamp u32, avg f32, min f32, max f32)   one aggregate per minute
+#   hour    (timestamp u32, avg f32, min f32, max f32)   one aggregate per hour
+# Older data is only kept at the coarser resolutions, so files never grow past their initial size.
+
+MAGIC = b"DNXT"
+VERSION = 1
+TIERS = ("raw", "minute", "hour")
+BUCKET_SECONDS = {"minute": 60, "hour": 3600}
+RECORDS = {
+    "raw": struct.Struct("<If"),
+    "minute": struct.Struct("<Ifff"),
+    "hour": struct.Struct("<Ifff"),
+}
+# magic, version, reserved, (capacity, head, count) per tier, (start, count, sum, min, max) per pending bucket
+HEADER = struct.Struct("<4sHH" + "III" * len(TIERS) + "IIdff" * len(BUCKET_SECONDS))
+HEADER_SIZE = 128
+LABEL_SIZE = 128
+DATA_OFFSET = HEADER_SIZE + LABEL_SIZE
+
+_open_files = {}
+_open_lock = threading.Lock()
+
+class HistoryFile(object):
+    """ Ring-buffered temperature history of a single sensor, backed by a memory-mapped file. """
+
+    def __init__(self, path, label=None, capacity=None):
+        self.path = path
+        if label is None:
+            self._file = open(path, "r+b")
+        else:
+            self._file = self._create(path, label, capacity or TEMPERATURE_HISTORY_CAPACITY)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._load_header()
+
+        self.offsets = {}
+        offset = DATA_OFFSET
+        for tier in TIERS:
+            self.offsets[tier] = offset
+            offset += self.rings[tier][0] * RECORDS[tier].size
+
+    def _create(self, path, label, capacity):
+        """Opens `path`, creating it first when it doesn't exist. An existing file is never truncated."""
+        try:
+            return open(path, "r+b")
+        except FileNotFoundError:
+            pass
+        # Written in full under a private name (O_EXCL) and published with link(), which fails when another
+        # process (the agent or a second session) created the file first, so nobody sees a half-written header
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(path) or ".")
+        try:
+            new_file = os.fdopen(fd, "r+b")
+            new_file.truncate(DATA_OFFSET + sum(capacity[t] * RECORDS[t].size for t in TIERS))
+            self.rings = {t: [capacity[t], 0, 0] for t in TIERS}
+            self.buckets = {t: [0, 0, 0.0, 0.0, 0.0] for t in BUCKET_SECONDS}
+            with mmap.mmap(new_file.fileno(), 0) as new_map:
+                new_map[HEADER_SIZE:DATA_OFFSET] = label.encode("utf-8")[:LABEL_SIZE].ljust(LABEL_SIZE, b"\0")
+                self._save_header(new_map)
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                new_file.close()
+                return open(path, "r+b")
+            return new_file
+        finally:
+            os.unlink(tmp_path)
+
+    def _load_header(self):
+        fields = HEADER.unpack_from(self._map, 0)
+        if fields[0] != MAGIC or fields[1] != VERSION:
+            raise ValueError(f"{self.path} is not a temperature history file")
+        values = list(fields[3:])
+        self.rings = {}
+        for tier in TIERS:
+            self.rings[tier], values = values[:3], values[3:]
+        self.buckets = {}
+        for tier in BUCKET_SECONDS:
+            self.buckets[tier], values = values[:5], values[5:]
+        self.label = self._map[HEADER_SIZE:DATA_OFFSET].rstrip(b"\0").decode("utf-8", "replace")
+
+    def _save_header(self, buffer=None):
+        values = [MAGIC, VERSION, 0]
+        for tier in TIERS:
+            values += self.rings[tier]
+        for tier in BUCKET_SECONDS:
+            values += self.buckets[tier]
+        HEADER.pack_into(self._map if buffer is None else buffer, 0, *values)
+
+    def _push(self, tier, *record):
+        capacity, head, count = self.rings[tier]
+        RECORDS[tier].pack_into(self._map, self.offsets[tier] + head * RECORDS[tier].size, *record)
+        self.rings[tier] = [capacity, (head + 1) % capacity, min(count + 1, capacity)]
+
+    def _record(self, tier, logical_index):
+        capacity, head, count = self.rings[tier]
+        physical = (head - count + logical_index) % capacity
+        return RECORDS[tier].unpack_from(self._map, self.offsets[tier] + physical * RECORDS[tier].size)
+
+    def last_timestamp(self):
+        count = self.rings["raw"][2]
+        return self._record("raw", count - 1)[0] if count else 0
+
+    def append(self, timestamp, value):
+        timestamp = int(timestamp)
+        with self._locked():
+            self._load_header()
+            # Rings are searched by timestamp, so they must stay in order
+            if timestamp <= self.last_timestamp():
+                return False
+            self._push("raw", timestamp, value)
+            for tier, seconds in BUCKET_SECONDS.items():
+                start, count, total, low, high = self.buckets[tier]
+                bucket = timestamp - timestamp % seconds
+                if count and bucket != start:
+                    self._push(tier, start, total / count, low, high)
+                    count = 0
+                if count == 0:
+                    self.buckets[tier] = [bucket, 1, value, value, value]
+                else:
+                    self.buckets[tier] = [start, count + 1, total + value, min(low, value), max(high, value)]
+            self._save_header()
+        return True
+
+    def reload(self):
+        with self._locked(shared=True):
+            self._load_header()
+
+    def oldest(self, tier):
+        return self._record(tier, 0)[0] if self.rings[tier][2] else None
+
+    def read(self, tier, since=0, until=None):
+        """Returns the records of `tier` between `since` and `until`, only that slice of the file is read."""
+        until = until or int(time.time())
+        with self._locked(shared=True):
+            self._load_header()
+            count = self.rings[tier][2]
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._record(tier, mid)[0] < since:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            records = []
+            for idx in range(lo, count):
+                record = self._record(tier, idx)
+                if record[0] > until:
+                    break
+                records.append(record)
+            # Include the bucket still being filled so recent minutes/hours are not missing
+            if tier in self.buckets:
+                start, pending, total, low, high = self.buckets[tier]
+                if pending and since <= start <= until:
+                    records.append((start, total / pending, low, high))
+        return records
+
+    def _locked(self, shared=False):
+        return _FileLock(self._file, shared)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+class _FileLock(object):
+    def __init__(self, file, shared):
+        self.file = file
+        self.mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+
+    def __enter__(self):
+        fcntl.flock(self.file.fileno(), self.mode)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+def history_path(label, directory=TEMPERATURE_HISTORY_DIR):
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', label).strip("_")
+    # Labels that sanitize to the same name (`sda:temp`, `sda_temp`) must not share a ring
+    digest = hashlib.sha256(label.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(directory, f"{name}-{digest}.ring")
+
+def legacy_history_path(label, directory=TEMPERATURE_HISTORY_DIR):
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', label).strip("_")
+    return os.path.join(directory, f"{name}.ring")
+
+def read_history_label(path):
+    try:
+        with open(path, "rb") as f:
+            header = f.read(DATA_OFFSET)
+    except OSError:
+        return None
+    if header[:4] != MAGIC or len(header) != DATA_OFFSET:
+        return None
+    return header[HEADER_SIZE:].rstrip(b"\0").decode("utf-8", "replace")
+
+def migrate_history(label, path, directory=TEMPERATURE_HISTORY_DIR):
+    # Rings written before the file name carried a hash keep their data, as long as they belong to this label
+    legacy = legacy_history_path(label, directory)
+    if not os.path.exists(path) and read_history_label(legacy) == label:
+        try:
+            os.rename(legacy, path)
+        except OSError:
+            pass
+
+def open_history(label, create=False, directory=TEMPERATURE_HISTORY_DIR):
+    path = history_path(label, directory)
+    with _open_lock:
+        history = _open_files.get(path)
+        if history is None:
+            if create:
+                os.makedirs(directory, exist_ok=True)
+            migrate_history(label, path, directory)
+            history = _open_files[path] = HistoryFile(path, label if create else None)
+        return history
+
+def sensor_label(key):
+    return "/".join(key)
+
+def record_temperature_tree(tree, timestamp=None, directory=TEMPERATURE_HISTORY_DIR):
+    timestamp = timestamp or time.time()
+    recorded = 0
+    for key, value in flatten_tree(tree).items():
+        if not isinstance(value, (int, float)):
+            continue
+        try:
+            if open_history(sensor_label(key), create=True, directory=directory).append(timestamp, float(value)):
+                recorded += 1
+        except (OSError, ValueError) as e:
+            print(f"temperature history error for {sensor_label(key)}: {e}")
+    return recorded
+
+def list_history_labels(directory=TEMPERATURE_HISTORY_DIR):
+    labels = []
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return labels
+    for name in names:
+        if not name.endswith(".ring"):
+            continue
+        label = read_history_label(os.path.join(directory, name))
+        if label is not None:
+            labels.append(label)
+    return labels
+
+def find_history_labels(query, directory=TEMPERATURE_HISTORY_DIR):
+    labels = list_history_labels(directory)
+    exact = [label for label in labels if label.lower() == query.lower()]
+    if exact:
+        return exact
+    return [label for label in labels if query.lower() in label.lower()]
+
+def parse_range(text):
+    match = re.match(r'^(\d+)\s*([smhdw]?)$', text.strip().lower()) if text else None
+    if not match:
+        return None
+    value, unit = match.groups()
+    return int(value) * {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}[unit]
+
+def query_history(label, seconds, directory=TEMPERATURE_HISTORY_DIR):
+    history = open_history(label, directory=directory)
+    history.reload()
+    since = int(time.time()) - seconds
+    # Use the finest resolution that still reaches back far enough, a ring that never wrapped holds everything
+    for tier in TIERS:
+        capacity, _, count = history.rings[tier]
+        if count and (count < capacity or history.oldest(tier) <= since):
+            return tier, history.read(tier, since)
+    return TIERS[-1], history.read(TIERS[-1], since)
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values, width=60):
+    if not values:
+        return ""
+    columns = []
+    step = max(1, -(-len(values) // width))
+    for idx in range(0, len(values), step):
+        chunk = values[idx:idx + step]
+        columns.append(sum(chunk) / len(chunk))
+    low, high = min(columns), max(columns)
+    spread = (high - low) or 1
+    return "".join(SPARK_CHARS[int((value - low) / spread * (len(SPARK_CHARS) - 1))] for value in columns)
+
+def show_temperature_history(query, range_text=None):
+    seconds = parse_range(range_text or DEFAULT_HISTORY_RANGE)
+    if seconds is None:
+        print(f"Invalid range '{range_text}'. Use e.g. 30m, 6h, 7d or 2w")
+        print()
+        return
+
+    labels = find_history_labels(query)
+    if not labels:
+        print(f"No temperature history for '{query}'. Type 'temps history' to list recorded sensors.")
+        print()
+        return
+    if len(labels) > 1:
+        print(f"'{query}' matches several sensors:")
+        for label in labels:
+            print(f"  {label}")
+        print()
+        return
+
+    tier, records = query_history(labels[0], seconds)
+    print(f"{labels[0]} - last {range_text or DEFAULT_HISTORY_RANGE} ({tier} resolution, {len(records)} points)")
+    if not records:
+        print("  No readings in this range")
+        print()
+        return
+
+    averages = [record[1] for record in records]
+    lows = [record[2] if len(record) > 2 else record[1] for record in records]
+    highs = [record[3] if len(record) > 3 else record[1] for record in records]
+    first = time.strftime("%Y-%m-%d %H:%M", time.localtime(records[0][0]))
+    last = time.strftime("%Y-%m-%d %H:%M", time.localtime(records[-1][0]))
+    print(f"  min {min(lows):.1f}°C  avg {sum(averages) / len(averages):.1f}°C  max {max(highs):.1f}°C  latest {averages[-1]:.1f}°C")
+    print(f"  {sparkline(averages)}")
+    print(f"  {first} -> {last}")
+    print()
+
+def show_history_labels():
+    labels = list_history_labels()
+    if not labels:
+        print("No temperature history recorded yet. Run 'temps' or 'temps watch' to record readings.")
+    else:
+        print("Recorded sensors:")
+        for label in labels:
+            print(f"  {label}")
+    print()
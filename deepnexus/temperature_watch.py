@@ -0,0 +1,145 @@
+import sys
+import time
+import threading
+from collections import deque
+from deepnexus.escape import Ansi
+from deepnexus.utils import clear_screen
+from deepnexus.temperature import collect_temperatures, flatten_tree
+from deepnexus.vars import TEMPERATURE_WATCH_INTERVAL, TEMPERATURE_WATCH_SAMPLES
+font = Ansi.escape
+
+def parse_interval(text, default=TEMPERATURE_WATCH_INTERVAL):
+    if not text:
+        return default
+    text = text.strip().lower()
+    multiplier = 60 if text.endswith("m") else 1
+    try:
+        value = float(text.rstrip("sm")) * multiplier
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+class TemperatureSampler(object):
+    """ Background thread that collects the temperature tree every `interval` seconds.
+
+    The last `samples` numeric readings of every sensor are kept in a fixed-size ring buffer (deque).
+    """
+
+    def __init__(self, interval, samples=TEMPERATURE_WATCH_SAMPLES, on_sample=None):
+        self.interval = interval
+        self.history = {}
+        self.latest = {}
+        self.sampled_at = None
+        self.on_sample = on_sample
+        self.updated = threading.Event()
+        self._samples = samples
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="temps-watch", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            tree = collect_temperatures()
+            readings = flatten_tree(tree)
+            with self._lock:
+                for key, value in readings.items():
+                    buffer = self.history.setdefault(key, deque(maxlen=self._samples))
+                    if isinstance(value, (int, float)):
+                        buffer.append(value)
+                self.latest = readings
+                self.sampled_at = time.time()
+            if self.on_sample:
+                self.on_sample(tree)
+            self.updated.set()
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.latest), {key: list(values) for key, values in self.history.items()}, self.sampled_at
+
+def trend(values):
+    if len(values) < 2:
+        return " "
+    # Compare the latest reading against the average of the older half of the window
+    older = values[:max(1, len(values) // 2)]
+    delta = values[-1] - sum(older) / len(older)
+    if delta >= 1:
+        return "↑"
+    if delta <= -1:
+        return "↓"
+    return "→"
+
+def format_temperature(value):
+    if isinstance(value, (int, float)):
+        return f"{value:g}°C"
+    return "N/A" if value is None else str(value)
+
+def build_rows(latest, history):
+    rows = []
+    section = None
+    for key, value in latest.items():
+        if key[0] != section:
+            section = key[0]
+            rows.append(f"{font('bold')}{section}{font('reset')}")
+        label = " / ".join(key[1:]) or key[0]
+        values = history.get(key, [])
+        low = format_temperature(min(values)) if values else "-"
+        high = format_temperature(max(values)) if values else "-"
+        rows.append(f"  {label:<36}{format_temperature(value):>10}{low:>10}{high:>10}   {trend(values)}")
+    return rows
+
+class IncrementalScreen(object):
+    """ Keeps the last drawn frame and only rewrites the lines that changed since. """
+
+    def __init__(self, top=1):
+        self.top = top
+        self.lines = []
+
+    def draw(self, lines):
+        out = []
+        if len(lines) != len(self.lines):
+            clear_screen()
+            self.lines = [None] * len(lines)
+        for idx, line in enumerate(lines):
+            if line != self.lines[idx]:
+                out.append(f"\033[{self.top + idx};1H{line}\033[K")
+        if out:
+            out.append(f"\033[{self.top + len(lines)};1H")
+            sys.stdout.write("".join(out))
+            sys.stdout.flush()
+        self.lines = list(lines)
+
+def watch_temperatures(interval=TEMPERATURE_WATCH_INTERVAL, title="", record_history=False):
+    on_sample = None
+    if record_history:
+        from deepnexus.temperature_history import record_temperature_tree
+        on_sample = record_temperature_tree
+    sampler = TemperatureSampler(interval, on_sample=on_sample)
+    screen = IncrementalScreen()
+    header = f"  {'Sensor':<36}{'Now':>10}{'Min':>10}{'Max':>10}   Trend"
+    sampler.start()
+    try:
+        while True:
+            if not sampler.updated.wait(0.5):
+                continue
+            sampler.updated.clear()
+            latest, history, sampled_at = sampler.snapshot()
+            status = time.strftime("%H:%M:%S", time.localtime(sampled_at))
+            lines = [
+                f"{font('bold')}{title}{font('reset')} temperatures every {interval:g}s, last sample {status}. Press ctrl+c to stop.",
+                "",
+                f"{font('underline')}{header}{font('reset')}",
+            ] + build_rows(latest, history)
+            screen.draw(lines)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sampler.stop()
+    print()
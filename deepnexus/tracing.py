@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from functools import wraps
+from deepnexus.vars import TRACE_DIR, TRACE_MAX_EVENTS, COMMAND_HISTORY
+
+# Spans always feed the per-name latencies shown by `stats`, trace events are only kept while tracing is on.
+# Categories: command (menu commands), fleet (hosts queried by `fleet`), agent (requests to the agent),
+# collect (temperature sources), exec (external tools), config (config files), parse and render
+
+CATEGORIES = ["command", "fleet", "agent", "collect", "exec", "config", "parse", "render"]
+
+class Tracer(object):
+    """ Collects spans of the session and writes them as a Chrome trace (chrome://tracing, ui.perfetto.dev). """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.events = deque(maxlen=TRACE_MAX_EVENTS)
+        self.durations = {}
+        self.threads = {}
+        self._lock = threading.Lock()
+        self._exit_hook = False
+
+    def start(self, path=None):
+        self.path = path or os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        self.events.clear()
+        self.threads.clear()
+        self.enabled = True
+        if not self._exit_hook:
+            atexit.register(self._flush_on_exit)
+            self._exit_hook = True
+        return self.path
+
+    def stop(self):
+        """Stops tracing and writes the trace, returns its path."""
+        if not self.enabled:
+            return None
+        self.enabled = False
+        return self.write(self.path)
+
+    def _flush_on_exit(self):
+        if self.enabled:
+            # stderr, so JSON printed by one-shot commands stays parseable
+            print(f"Trace written to {self.stop()}", file=sys.stderr)
+
+    def record(self, name, category, start_ns, end_ns, args=None):
+        duration = (end_ns - start_ns) / 1e6
+        with self._lock:
+            samples = self.durations.get((category, name))
+            if samples is None:
+                samples = self.durations[(category, name)] = deque(maxlen=COMMAND_HISTORY)
+            samples.append(duration)
+        if self.enabled:
+            thread = threading.current_thread()
+            tid = thread.native_id
+            if tid not in self.threads:
+                self.threads[tid] = thread.name
+            event = {"name": name, "cat": category, "ph": "X", "ts": start_ns / 1000, "dur": (end_ns - start_ns) / 1000,
+                     "pid": os.getpid(), "tid": tid}
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def to_json(self):
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "deepnexus-cli"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}} for tid, name in list(self.threads.items())]
+        return json.dumps({"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"})
+
+    def write(self, path):
+        from deepnexus.utils import atomic_write
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        atomic_write(path, self.to_json())
+        return path
+
+    def stats(self):
+        """(category, name) -> list of durations in milliseconds."""
+        with self._lock:
+            return {key: list(samples) for key, samples in self.durations.items()}
+
+tracer = Tracer()
+
+class span(object):
+    """ `with span("storcli64", "exec", command=...):` times the block, keyword arguments end up in the trace event. """
+    __slots__ = ("name", "category", "args", "started")
+
+    def __init__(self, name, category="", **args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and tracer.enabled:
+            self.args["error"] = exc_type.__name__
+        tracer.record(self.name, self.category, self.started, time.perf_counter_ns(), self.args)
+        return False
+
+def traced(category, name=None):
+    """Decorator that wraps every call of the function in a span named after it."""
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def percentile(values, fraction):
+    """Linearly interpolated percentile of `values`, `fraction` between 0 and 1."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def print_stats():
+    from tabulate import tabulate
+    stats = tracer.stats()
+    if not stats:
+        print("No commands timed yet")
+        print()
+        return
+    order = {category: i for i, category in enumerate(CATEGORIES)}
+    rows = []
+    for (category, name), samples in sorted(stats.items(), key=lambda item: (order.get(item[0][0], len(order)), item[0][1])):
+        rows.append([category, name, len(samples), f"{percentile(samples, 0.5):.1f}", f"{percentile(samples, 0.95):.1f}", f"{max(samples):.1f}"])
+    print(tabulate(rows, headers=["Category", "Name", "Calls", "p50 ms", "p95 ms", "Max ms"]))
+    print()
+
+def trace_command(cmd):
+    """`trace on [file]`, `trace off` and `trace` (status)."""
+    parts = cmd.split(maxsplit=2)
+    if len(parts) >= 2 and parts[1] == "on":
+        path = tracer.start(os.path.expanduser(parts[2]) if len(parts) > 2 else None)
+        print(f"Tracing on, the trace is written to {path} on 'trace off' or exit")
+    elif len(parts) == 2 and parts[1] == "off":
+        if not tracer.enabled:
+            print("Tracing is not on")
+        else:
+            try:
+                print(f"Trace written to {tracer.stop()} ({len(tracer.events)} spans)")
+            except OSError as e:
+                print(f"Could not write the trace: {e}")
+    elif len(parts) == 1:
+        print(f"Tracing is {'on, writing to ' + tracer.path if tracer.enabled else 'off'}")
+    else:
+        print("Invalid syntax. Use 'trace on [file]' or 'trace off'")
+    print()
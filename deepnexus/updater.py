@@ -1,11 +1,11 @@
 import os
 import json
-import subprocess
 import shutil
 import tempfile
 import sys
 from deepnexus.vars import APP_CONFIG_PATH
-from deepnexus.utils import load_config, Status, status_message
+from deepnexus.utils import load_config, Status, status_message, clear_screen
+from deepnexus.runner import get_runner, CommandError
 
 REPO_URL = 'https://github.com/PedroCavaleiro/deepnexus-cli.git'
 BACKUP_DIR = 'backups'
@@ -32,12 +32,13 @@ def create_backup():
 
 
 def get_latest_tag():
-    result = subprocess.run(["git", "ls-remote", "--tags", REPO_URL], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    if result.returncode != 0:
-        print(f"{status_message(Status.ERROR)} Failed to retrieve tags:", result.stderr.decode())
+    try:
+        result = get_runner().run(["git", "ls-remote", "--tags", REPO_URL]).check()
+    except CommandError as e:
+        print(f"{status_message(Status.ERROR)} Failed to retrieve tags:", e)
         return None
 
-    lines = result.stdout.decode().splitlines()
+    lines = result.stdout.splitlines()
     tags = [line.split("refs/tags/")[1] for line in lines if "refs/tags/" in line and not line.endswith("^")]  # ignore annotated tag refs
     if not tags:
         return None
@@ -60,10 +61,10 @@ def update_tool():
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         clone_cmd = ["git", "clone", REPO_URL, tmp_dir, "--branch", source, "--depth", "1"]
-        result = subprocess.run(clone_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-        if result.returncode != 0:
-            print(f"{status_message(Status.ERROR)} Update failed:", result.stderr.decode())
+        try:
+            get_runner().run(clone_cmd).check()
+        except CommandError as e:
+            print(f"{status_message(Status.ERROR)} Update failed:", e)
             return
 
         create_backup()
@@ -85,7 +86,7 @@ def update_tool():
 
         print(f"{status_message(Status.SUCCESS)} Update complete. Restarting the tool...\n")        
         python = sys.executable
-        os.system('clear')
+        clear_screen()
         os.execv(python, [python] + sys.argv)
 
 
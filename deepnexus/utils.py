@@ -1,10 +1,18 @@
 import os
+import sys
 import json
-import subprocess
+import tempfile
 from enum import Enum
 from deepnexus.escape import Ansi
+from deepnexus.cache import clear_all_caches, FileCache
+from deepnexus.tracing import span
+from deepnexus.vars import FSTAB_PATH, MOUNTS_PATH
 font = Ansi.escape
 
+config_cache = FileCache("config")
+mounts_cache = FileCache("mounts")
+fstab_cache = FileCache("fstab")
+
 def format_size(bytes_value):
     for unit in ['B', 'K', 'M', 'G', 'T']:
         if bytes_value < 1024.0:
@@ -12,31 +20,75 @@ def format_size(bytes_value):
         bytes_value /= 1024.0
     return f"{bytes_value:.1f}P"
 
+CLEAR_SEQUENCE = "\033[H\033[2J\033[3J"
+
 def clear_screen():
-    os.system('clear' if os.name == 'posix' else 'cls')
+    if os.name == 'posix':
+        # Home, clear screen and scrollback, the same as clear(1) without forking it
+        sys.stdout.write(CLEAR_SEQUENCE)
+        sys.stdout.flush()
+    else:
+        os.system('cls')
+
+def refresh_caches():
+    clear_all_caches()
+    from deepnexus.agent import agent_request
+    agent_request({"get": "refresh"})
+    print(f"{status_message(Status.SUCCESS)} Cached hardware information cleared.")
+    print()
 
 def load_config(path):
     try:
-        with open(path) as f:
+        with span(f"load {os.path.basename(path)}", "config", path=path), open(path) as f:
             return json.load(f)
     except Exception as e:
         print(f"Error loading config: {e}")
         return []
+
+def load_cached_config(path):
+    """Same as `load_config`, parsed again only when the file changes. The result is shared, don't modify it."""
+    return config_cache.get(path, lambda: load_config(path))
     
-def run_command(command):
+def atomic_write(path, data, mode=None):
+    """Replaces `path` with `data` so readers only ever see the old or the new file, never a partial one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
     try:
-        return subprocess.check_output(command, shell=True, text=True)
-    except subprocess.CalledProcessError as e:
-        return e.output
-    
-def parse_mount_targets():
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def read_mount_table():
+    mount_points = set()
     mount_targets = set()
-    with open("/proc/mounts") as f:
+    with open(MOUNTS_PATH) as f:
         for line in f:
-            parts = line.split()
-            mount_point = parts[1]
+            mount_point = line.split()[1]
+            mount_points.add(mount_point)
             mount_targets.add(os.path.normpath(os.path.realpath(mount_point)))
-    return mount_targets
+    return frozenset(mount_points), frozenset(mount_targets)
+
+def parse_mount_targets():
+    return mounts_cache.get(MOUNTS_PATH, read_mount_table)[1]
 
 def format_physical_slot(phy):
     try:
@@ -45,7 +97,25 @@ def format_physical_slot(phy):
     except Exception:
         return phy
     
+_prompt_cache = {}
+
 def get_prompt_text(app_config, menu = []):
+    prompt_config = app_config["prompt"]
+    # The prompt only changes with the prompt settings or the menu path, build it once per combination
+    key = (
+        prompt_config["use_app_name"],
+        prompt_config["username"]["name"],
+        prompt_config["username"]["color"],
+        prompt_config["hostname"]["name"],
+        prompt_config["hostname"]["color"],
+        tuple(menu)
+    )
+    prompt = _prompt_cache.get(key)
+    if prompt is None:
+        prompt = _prompt_cache[key] = build_prompt_text(app_config, menu)
+    return prompt
+
+def build_prompt_text(app_config, menu = []):
     if app_config["prompt"]["use_app_name"]:
         return f"{font('bold')}deepnexus-cli > {font('reset')}"
     else:
@@ -80,24 +150,22 @@ class Status(Enum):
     WARNING = 3,
     INFO = 4
 
+STATUS_MESSAGES = {
+    Status.SUCCESS: f"{font('bold')}[{font('fg_green')}SUCCESS{font('reset')}{font('bold')}]{font('reset')}",
+    Status.ERROR: f"{font('bold')}[{font('fg_red')} ERROR {font('reset')}{font('bold')}]{font('reset')}",
+    Status.WARNING: f"{font('bold')}[{font('fg_yellow')}WARNING{font('reset')}{font('bold')}]{font('reset')}",
+    Status.INFO: f"{font('bold')}[{font('fg_blue')} INFO  {font('reset')}{font('bold')}]{font('reset')}",
+}
+
 def status_message(message):
-    if message == Status.SUCCESS:
-        return f"{font('bold')}[{font('fg_green')}SUCCESS{font('reset')}{font('bold')}]{font('reset')}"
-    elif message == Status.ERROR:
-        return f"{font('bold')}[{font('fg_red')} ERROR {font('reset')}{font('bold')}]{font('reset')}"
-    elif message == Status.WARNING:
-        return f"{font('bold')}[{font('fg_yellow')}WARNING{font('reset')}{font('bold')}]{font('reset')}"
-    elif message == Status.INFO:
-        return f"{font('bold')}[{font('fg_blue')} INFO  {font('reset')}{font('bold')}]{font('reset')}"
+    return STATUS_MESSAGES.get(message)
     
 def get_available_mounts():
     mnt_base = "/mnt"
     all_mnt_dirs = [os.path.join(mnt_base, d) for d in os.listdir(mnt_base)
                     if os.path.isdir(os.path.join(mnt_base, d))]
     
-    with open("/proc/mounts", "r") as f:
-        mounted_points = set(line.split()[1] for line in f)
-        
+    mounted_points = mounts_cache.get(MOUNTS_PATH, read_mount_table)[0]
     return [d for d in all_mnt_dirs if d not in mounted_points]
 
 def is_disk_mounted(mounted_paths, mount_point):
@@ -105,9 +173,12 @@ def is_disk_mounted(mounted_paths, mount_point):
     return normalized_mount in mounted_paths
 
 def get_fstab_uuids():
+    return fstab_cache.get(FSTAB_PATH, read_fstab_uuids)
+
+def read_fstab_uuids():
     fstab_uuids = set()
     try:
-        with open("/etc/fstab", "r") as fstab:
+        with open(FSTAB_PATH, "r") as fstab:
             for line in fstab:
                 line = line.strip()
                 if line.startswith("UUID="):
@@ -116,5 +187,5 @@ def get_fstab_uuids():
                         uuid = parts[0].replace("UUID=", "")
                         fstab_uuids.add(uuid)
     except Exception as e:
-        print(f"Error reading /etc/fstab: {e}")
-    return fstab_uuids
\ No newline at end of file
+        print(f"Error reading {FSTAB_PATH}: {e}")
+    return frozenset(fstab_uuids)
\ No newline at end of file
@@ -1,8 +1,24 @@
+import os
+
 DISKS_CONFIG_PATH = "./configs/disks.json"
 APP_CONFIG_PATH = "./configs/settings.json"
+BANNER_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "deepnexus-cli")
 
 STORCLI = "/opt/MegaRAID/storcli/storcli64"
+# Seconds a storcli show result is reused, keyed by everything after the object path
+STORCLI_CACHE_TTL = {
+    "show": 300,
+    "show smart": 60,
+    "show temperature": 10,
+}
 FSTAB_PATH = "/etc/fstab"
+MOUNTS_PATH = "/proc/self/mounts"
+# Seconds a block device snapshot is reused before devices are discovered again
+BLOCK_INVENTORY_TTL = 10
+# "sysfs" reads /sys, /proc and /dev/disk directly, "lsblk" runs lsblk
+DEVICE_DISCOVERY = "sysfs"
+# Prefix for /sys, /proc, /dev and /run, point it at a fake tree to test discovery
+DEVICE_ROOT = os.environ.get("DEEPNEXUS_DEVICE_ROOT", "/")
 MOUNT_OPTIONS = "ext4 defaults,nofail,x-systemd.device-timeout=0 0 2"
 
 COLORS = {
@@ -12,4 +28,98 @@ COLORS = {
     "info": "#0D6EFD",
     "reset": "\033[0m",
     "purple": "\033[1;35m",
-}
\ No newline at end of file
+}
+
+# Seconds each external tool may run before it is killed, by executable name, others get DEFAULT_COMMAND_TIMEOUT.
+# None waits forever. settings.json "command_timeouts" overrides single entries
+COMMAND_TIMEOUTS = {
+    "storcli64": 30,
+    "smartctl": 20,
+    "lsblk": 10,
+    "blkid": 10,
+    "udevadm": 30,
+    "sensors": 10,
+    "parted": 60,
+    "mount": 120,
+    "e2label": 30,
+    "git": 120,
+    "mkfs.ext4": None,
+}
+DEFAULT_COMMAND_TIMEOUT = 60
+# Processes of a tool allowed to run at the same time, settings.json "command_concurrency" overrides single entries
+COMMAND_CONCURRENCY = {
+    "storcli64": 1,
+}
+# Finished commands and durations per tool kept for stats
+COMMAND_HISTORY = 500
+
+# Where `trace on` and --trace write Chrome trace files, and the most spans kept per trace
+TRACE_DIR = os.path.join(os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state")), "deepnexus-cli", "traces")
+TRACE_MAX_EVENTS = 200000
+
+# `fleet`: seconds each host is given, hosts queried at the same time, the command run on every host and
+# how long pooled SSH connections stay open after their last command
+FLEET_TIMEOUT = 30
+FLEET_CONCURRENCY = 16
+FLEET_REMOTE_COMMAND = "~/.local/bin/deepnexus-cli"
+FLEET_CONTROL_PERSIST = 300
+FLEET_CONTROL_DIR = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or BANNER_CACHE_DIR, "deepnexus-ssh")
+
+# Unix socket of the `--agent` process, seconds between its refreshes of each kind of state and how long a
+# session waits for an answer before collecting the state itself
+# The default socket is one fixed system path so every admin and the systemd unit meet on the same socket,
+# the DEEPNEXUS_AGENT_SOCKET environment variable or settings.json "agent_socket" override it
+AGENT_SOCKET = "/run/deepnexus-cli/agent.sock"
+AGENT_REFRESH = {
+    "temps": 10,
+    "inventory": 10,
+    "sas": 60,
+}
+AGENT_CLIENT_TIMEOUT = 5
+# storcli dumps the agent keeps warm between refreshes
+AGENT_STORCLI_WARM = ["/call/sall show J"]
+
+# `--exporter`: node_exporter textfile collector file, seconds between collections and the HTTP listen address
+EXPORTER_TEXTFILE = "/var/lib/node_exporter/textfile_collector/deepnexus.prom"
+EXPORTER_INTERVAL = 60
+EXPORTER_ADDRESS = "127.0.0.1"
+
+# Default number of smartctl processes allowed to run at the same time
+SMART_CONCURRENCY = 8
+# Seconds a locate LED stays on when no --for is given
+LOCATE_DURATION = 60
+# Disks partitioned and formatted at the same time by 'init batch'
+INIT_CONCURRENCY = 4
+# Extra mkfs.ext4 options per format profile, settings.json "format_profiles" can override or add profiles
+FORMAT_PROFILES = {
+    "archive": "-T largefile4 -m 0 -E lazy_itable_init=1,lazy_journal_init=1,nodiscard",
+    "general": "",
+    "small-file": "-i 4096",
+}
+DEFAULT_FORMAT_PROFILE = "general"
+# Temperature_Celsius, Airflow_Temperature_Cel
+SMART_TEMPERATURE_ATTRIBUTES = (194, 190)
+# Exit status smartctl is told to use (`-n standby,3`) when it skips a sleeping disk instead of spinning it up,
+# no read ever ends with both the command line (bit 0) and the device open (bit 1) failure bits set
+SMART_STANDBY_STATUS = 3
+SMART_STANDBY = "standby"
+
+# Seconds each temperature source is given before its branch is reported as timed out
+TEMPERATURE_TIMEOUTS = {
+    "SAS": 10,
+    "Disks": 20,
+    "Sensors": 5,
+}
+
+# Default seconds between `temps watch` samples and readings kept per sensor for min/max/trend
+TEMPERATURE_WATCH_INTERVAL = 5
+TEMPERATURE_WATCH_SAMPLES = 120
+
+# Where per-sensor temperature history rings are kept and how many records each resolution holds
+TEMPERATURE_HISTORY_DIR = os.path.join(os.environ.get("XDG_STATE_HOME", os.path.expanduser("~/.local/state")), "deepnexus-cli", "history")
+TEMPERATURE_HISTORY_CAPACITY = {
+    "raw": 2160,     # 6 hours of 10 second samples
+    "minute": 10080, # 7 days
+    "hour": 8760,    # 1 year
+}
+DEFAULT_HISTORY_RANGE = "1h"
\ No newline at end of file
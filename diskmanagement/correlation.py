@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from deepnexus.cache import TTLCache
+from deepnexus.runner import CommandError
+from deepnexus.tracing import traced
+from deepnexus.utils import load_cached_config
+from deepnexus.vars import APP_CONFIG_PATH, BLOCK_INVENTORY_TTL, DEVICE_ROOT
+from diskmanagement.inventory import get_block_inventory
+from diskmanagement.sas import get_sas_drive_identities
+from diskmanagement.sysfs import read_disk_ids
+
+# disks.json records the sdX name a disk had when it was initialized, those names move between boots.
+# Which device sits in which slot is worked out again in one pass: the serials and WWNs of every SAS drive
+# (one storcli call per controller) joined in memory with /dev/disk/by-id and the block inventory.
+
+# Follows the block inventory, a rediscovered inventory is joined again straight away
+correlation_cache = TTLCache("disk-correlation", default_ttl=BLOCK_INVENTORY_TTL)
+
+@dataclass
+class DiskLocation:
+    dev: Optional[str] = None
+    card: Optional[int] = None
+    slot: Optional[int] = None
+    enclosure: Optional[int] = None
+    serial: Optional[str] = None
+    wwn: Optional[str] = None
+    uuids: list = field(default_factory=list)
+    mountpoints: list = field(default_factory=list)
+
+def normalize_wwn(value):
+    value = str(value or "").strip().lower()
+    if value.startswith("0x"):
+        value = value[2:]
+    return value if re.fullmatch(r'[0-9a-f]{16,32}', value) else None
+
+def id_keys(name):
+    """What a /dev/disk/by-id name identifies its disk by, `("wwn", ...)` or `("serial", ...)`."""
+    if "-part" in name:
+        return []
+    kind, _, rest = name.partition("-")
+    if kind == "wwn":
+        wwn = normalize_wwn(rest)
+        return [("wwn", wwn)] if wwn else []
+    # scsi-3<wwn> carries the NAA designator, the other bus names end in _<serial>
+    if kind == "scsi" and rest.startswith("3") and normalize_wwn(rest[1:]):
+        return [("wwn", normalize_wwn(rest[1:]))]
+    if kind in ("ata", "scsi", "nvme") and "_" in rest:
+        return [("serial", rest.rsplit("_", 1)[1])]
+    return []
+
+def device_keys(device, names):
+    keys = [key for name in names for key in id_keys(name)]
+    if normalize_wwn(device.get("wwn")):
+        keys.append(("wwn", normalize_wwn(device["wwn"])))
+    if device.get("serial"):
+        keys.append(("serial", str(device["serial"]).strip()))
+    return keys
+
+class DiskCorrelation(object):
+    """ Slot <-> device <-> UUID <-> mount map of every disk, built in one batch.
+
+    `inventory` is the BlockInventory it was joined with, `disk_ids` the by-id names per device
+    (`read_disk_ids`) and `identities` the StorcliDriveIdentity of every SAS drive.
+    """
+
+    def __init__(self, inventory, disk_ids, identities):
+        self.inventory = inventory
+        self.locations = []
+        self.by_slot = {}
+        self.by_dev = {}
+        self.by_serial = {}
+        self.by_uuid = {}
+        self.by_mount = {}
+
+        keys = {}
+        for device in inventory.disks():
+            location = DiskLocation(dev=device["name"], serial=device.get("serial"), wwn=normalize_wwn(device.get("wwn")))
+            for member in self._members(device["name"]):
+                if member.get("uuid"):
+                    location.uuids.append(member["uuid"])
+                location.mountpoints += member["mountpoints"]
+            self.locations.append(location)
+            self.by_dev[location.dev] = location
+            for key in device_keys(device, disk_ids.get(device["name"], [])):
+                keys.setdefault(key, location)
+
+        for identity in identities:
+            location = keys.get(("wwn", normalize_wwn(identity.wwn))) or keys.get(("serial", identity.serial))
+            if location is None:
+                # Not exposed to the OS (e.g. part of a virtual drive), still known by its slot
+                location = DiskLocation()
+                self.locations.append(location)
+            location.card = identity.controller
+            location.slot = identity.slot
+            location.enclosure = identity.enclosure
+            location.serial = identity.serial or location.serial
+            location.wwn = normalize_wwn(identity.wwn) or location.wwn
+            self.by_slot[(identity.controller, identity.slot)] = location
+
+        for location in self.locations:
+            if location.serial:
+                self.by_serial.setdefault(location.serial, location)
+            for uuid in location.uuids:
+                self.by_uuid.setdefault(uuid, location)
+            for mountpoint in location.mountpoints:
+                self.by_mount.setdefault(mountpoint, location)
+
+    def _members(self, name):
+        device = self.inventory.get(name)
+        members = [device] if device else []
+        for child in self.inventory.children(name):
+            members += self._members(child["name"])
+        return members
+
+    def find(self, dev=None, uuid=None, serial=None, mount=None, card=None, slot=None):
+        if dev is not None:
+            return self.by_dev.get(dev[5:] if dev.startswith("/dev/") else dev)
+        if uuid is not None:
+            return self.by_uuid.get(uuid)
+        if serial is not None:
+            return self.by_serial.get(serial)
+        if mount is not None:
+            return self.by_mount.get(mount)
+        if card is not None and slot is not None:
+            return self.by_slot.get((int(card), int(slot)))
+        return None
+
+    def resolve(self, disk):
+        """Where a disks.json entry is now, found by its partition UUID or serial, None when it isn't attached."""
+        return self.by_uuid.get(disk.get("uuid")) or (self.by_serial.get(disk["serial"]) if disk.get("serial") else None)
+
+@traced("collect", "disk correlation")
+def build_disk_correlation(inventory):
+    identities = []
+    if load_cached_config(APP_CONFIG_PATH).get("enable_sas"):
+        try:
+            identities = get_sas_drive_identities()
+        except CommandError as e:
+            print(f"Warning: could not read SAS drive identities: {e}")
+    return DiskCorrelation(inventory, read_disk_ids(DEVICE_ROOT), identities)
+
+def get_disk_correlation():
+    inventory = get_block_inventory()
+    correlation = correlation_cache.get("correlation", lambda: build_disk_correlation(inventory))
+    if correlation.inventory is not inventory:
+        # Devices were discovered again (mount, format, refresh), so the join is out of date as well
+        correlation_cache.invalidate()
+        correlation = correlation_cache.get("correlation", lambda: build_disk_correlation(inventory))
+    return correlation
+
+def disk_device(disk, correlation=None):
+    """Current device name of a disks.json entry, None when the disk isn't attached."""
+    location = (correlation or get_disk_correlation()).resolve(disk)
+    return location.dev if location else None
+
+def disk_slot(disk, correlation=None):
+    """Current (card, slot) of a disks.json entry, the recorded one when storcli doesn't report it."""
+    location = (correlation or get_disk_correlation()).resolve(disk)
+    if location and location.card is not None:
+        return location.card, location.slot
+    return disk["card"], disk["slt"]
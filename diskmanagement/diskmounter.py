@@ -9,21 +9,18 @@ from prompt_toolkit.layout.dimension import Dimension as D
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.formatted_text import FormattedText
 import os
-from deepnexus.utils import run_command
-from diskmanagement.utils import list_unmounted_partitions, get_partition_uuid, log_message, get_disk_size
+import asyncio
+from diskmanagement.utils import list_unmounted_partitions, get_partition_uuid, log_message, get_disk_size, run_step
 from diskmanagement.initialize_disk.popups import show_mount_popup, show_log_popup, show_confirmation_disk_mount_dialog
+from diskmanagement.inventory import invalidate_block_inventory
+from diskmanagement.fstab import add_to_fstab
+from diskmanagement.registry import mount_name
 from deepnexus.vars import COLORS
 
 def mount_disk_module():
     dry_run = True
     interactive_mount_disk(dry_run=dry_run)
 
-def add_to_fstab(uuid, mount_point, output_lines, output_control):
-    fstab_entry = f"UUID={uuid} {mount_point} ext4 defaults,nofail,x-systemd.device-timeout=0 0 2"
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Partition {uuid} added to fstab on mount point {mount_point}")
-    with open('/etc/fstab', 'a') as f:
-        f.write(fstab_entry + '\n')
-
 def interactive_mount_disk(dry_run=False):
     floats = []
     
@@ -49,28 +46,55 @@ def interactive_mount_disk(dry_run=False):
         text = f"Selected mount: {value}" if value else "Selected mount: <none>"
         return FormattedText([("white", text)])
 
+    task = [None]
+
+    def cancel():
+        if task[0] and not task[0].done():
+            task[0].cancel()
+
     def accept():
-        show_log_popup(floats, output_control, on_close=lambda: get_app().exit())
+        show_log_popup(
+            floats, output_control, on_close=lambda: get_app().exit(),
+            running=lambda: task[0] is not None and not task[0].done(), on_cancel=cancel
+        )
+        log = lambda style, message: log_message(output_lines, output_control, style, message)
 
         partition = disk_radio.current_value        
-        mount_name = mount_point_value[0]
-        mount_point = f"/mnt/{mount_name}"        
+        mount_point = f"/mnt/{mount_name(mount_point_value[0])}"
         add_fstab = fstab_input.current_value
 
-        if not dry_run:
-            os.makedirs(mount_point, exist_ok=True)
-            log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Mount point {mount_point} ready")
-            log_message(output_lines, output_control, f"fg:{COLORS['info']}", f"Mounting {partition}")
-            run_command(f"mount {partition} {mount_point}")
-            log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Mounted {partition}")
-            uuid = get_partition_uuid(partition)
-            if add_fstab:
-                add_to_fstab(uuid, mount_point)
-        else:
-            uuid = 'dry-run-uuid'
-            log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'[DRY RUN] PARTITION: {partition} UUID: {uuid} MOUNT NAME: {mount_name} FSTAB: {add_fstab}')
-
-        log_message(output_lines, output_control, f"fg:{COLORS['success']}", 'Disk mounted successfully. Press ESC to exit.')
+        async def run():
+            # What was being done, so a bare OSError still says which step it came from
+            step = ["Preparing the mount point"]
+            try:
+                if not dry_run:
+                    os.makedirs(mount_point, exist_ok=True)
+                    log(f"fg:{COLORS['success']}", f"Mount point {mount_point} ready")
+                    log(f"fg:{COLORS['info']}", f"Mounting {partition}")
+                    step[0] = f"Mounting {partition}"
+                    await run_step(["mount", partition, mount_point], log)
+                    log(f"fg:{COLORS['success']}", f"Mounted {partition}")
+                    invalidate_block_inventory()
+                    step[0] = f"Reading the UUID of {partition}"
+                    uuid = await asyncio.to_thread(get_partition_uuid, partition)
+                    if add_fstab:
+                        step[0] = "Adding it to fstab"
+                        if add_to_fstab(uuid, mount_point):
+                            log(f"fg:{COLORS['success']}", f"Partition {uuid} added to fstab on mount point {mount_point}")
+                        else:
+                            log(f"fg:{COLORS['warning']}", f"Partition {uuid} is already in fstab")
+                else:
+                    uuid = 'dry-run-uuid'
+                    log(f"fg:{COLORS['info']}", f'[DRY RUN] PARTITION: {partition} UUID: {uuid} MOUNT NAME: {mount_point} FSTAB: {add_fstab}')
+
+                log(f"fg:{COLORS['success']}", 'Disk mounted successfully. Press ESC to exit.')
+            except asyncio.CancelledError:
+                log(f"fg:{COLORS['error']}", "Cancelled. Press ESC to exit.")
+            except (RuntimeError, OSError) as e:
+                # Failed commands (with their stderr) and mount point or fstab write errors
+                log(f"fg:{COLORS['error']}", f"{step[0]} failed: {e}. Press ESC to exit.")
+
+        task[0] = get_app().create_background_task(run())
 
     mount_label_control = FormattedTextControl(text=get_mount_text)
     mount_label_window = Window(content=mount_label_control, height=1)
@@ -117,6 +141,10 @@ def interactive_mount_disk(dry_run=False):
 
     @kb.add('escape')
     def exit_(event):
+        # The first ESC stops a running mount, the next one leaves
+        if task[0] and not task[0].done():
+            cancel()
+            return
         event.app.exit()
 
 
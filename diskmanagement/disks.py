@@ -1,27 +1,37 @@
-from deepnexus.utils import run_command, parse_mount_targets, is_disk_mounted, get_fstab_uuids
-from deepnexus.vars import COLORS, DISKS_CONFIG_PATH
-from diskmanagement.sas import show_sas_all, start_locate_drive, end_locate_drive
+from deepnexus.utils import parse_mount_targets, is_disk_mounted
+from deepnexus.runner import get_runner, CommandError
+from deepnexus.tracing import traced
+from deepnexus.vars import COLORS
+from diskmanagement.sas import show_sas_all, get_sas_controllers, start_locate, stop_all_locates
+from diskmanagement.inventory import get_block_inventory, invalidate_block_inventory
+from diskmanagement.registry import get_disk_registry
+from diskmanagement.correlation import get_disk_correlation, disk_slot
 import os
 import json
 from pathlib import Path
 from tabulate import tabulate
-from deepnexus.utils import status_message, Status, load_config, get_available_mounts, get_fstab_uuids
+from deepnexus.utils import status_message, Status, load_cached_config, get_available_mounts, get_fstab_uuids, format_size
 from deepnexus.escape import Ansi
-from deepnexus.vars import APP_CONFIG_PATH, DISKS_CONFIG_PATH
-import subprocess
-import re
+from deepnexus.vars import APP_CONFIG_PATH, DISKS_CONFIG_PATH, SMART_CONCURRENCY, SMART_TEMPERATURE_ATTRIBUTES, SMART_STANDBY_STATUS, SMART_STANDBY, LOCATE_DURATION
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 font = Ansi.escape
 
+@traced("render")
 def show_all_disks(config):
     if len(config) > 0:
         mounted_paths = parse_mount_targets()
+        correlation = get_disk_correlation()
+        mounted_icon = f"{font('fg_green')}   ●  {font('reset')}"
+        unmounted_icon = f"{font('fg_red')}   ●  {font('reset')}"
         data = []
         for disk in config:
             mount_point = f"/mnt/{disk['mnt']}"            
             is_mounted = is_disk_mounted(mounted_paths, mount_point)
-            status_icon = f"{font('fg_green')}   ●  {font('reset')}" if is_mounted else f"{font('fg_red')}   ●  {font('reset')}"
-            entry = [status_icon, disk['label'], mount_point, disk['uuid'], disk['phy'], disk['card'] if disk['card'] != -1 else "N/A", disk['slt'] if disk['slt'] != -1 else "N/A"]
+            status_icon = mounted_icon if is_mounted else unmounted_icon
+            card, slot = disk_slot(disk, correlation)
+            entry = [status_icon, disk['label'], mount_point, disk['uuid'], disk['phy'], card if card != -1 else "N/A", slot if slot != -1 else "N/A"]
             data.append(entry)
         if data:
             print(tabulate(data, headers=["Status", "Label", "Mount Point", "Partition UUID", "Physical Location", "SAS Card", "SAS Slot"]))
@@ -33,31 +43,14 @@ def show_all_disks(config):
 
 def mount_disk(config):
     print(f"{status_message(Status.INFO)} Scanning for unmounted /dev/sdX disks...\n")
-    lsblk_output = run_command("lsblk -nr -o NAME,MOUNTPOINT,SIZE")
+    inventory = get_block_inventory()
 
     eligible_partitions = []
-
-    for line in lsblk_output.strip().splitlines():
-        parts = line.split(None, 2)  # split into max 3 parts
-        if len(parts) == 3:
-            name, mountpoint, size = parts
-        elif len(parts) == 2:
-            name = parts[0]
-            if parts[1].startswith('/'):
-                mountpoint = parts[1]
-                size = ""
-            else:
-                mountpoint = ""
-                size = parts[1]
-        else:
-            continue  # Skip malformed lines
-
-        base = os.path.basename(name)
-
-        # Match sdXY pattern (e.g. sda1, sdb9, sdc123)
-        if base.startswith("sd") and len(base) > 3:
-            if not mountpoint:  # Only include unmounted
-                eligible_partitions.append((name, size))
+    for device in inventory.by_name.values():
+        # Match sdXY pattern (e.g. sda1, sdb9, sdc123), only unmounted
+        if device["name"].startswith("sd") and len(device["name"]) > 3 and not device["mountpoints"]:
+            size = format_size(device["size"]) if device["size"] is not None else ""
+            eligible_partitions.append((device["name"], size))
 
     if not eligible_partitions:
         print(f"{status_message(Status.ERROR)}No eligible unmounted /dev/sdXY partitions found.")
@@ -108,86 +101,188 @@ def mount_disk(config):
     else:
         mount_point = available_mounts[mp_choice - 2]
 
-    os.makedirs(mount_point, exist_ok=True)
-    
-    result = run_command(f"mount /dev/{target_partition} /mnt/{mount_point.replace('/mnt/', '')}")
-    print(result)
-    print(f"{status_message(Status.SUCCESS)} Disk mounted at /mnt/{mount_point.replace('/mnt/', '')}.")
+    mount_path = f"/mnt/{mount_point.replace('/mnt/', '')}"
+    os.makedirs(mount_path, exist_ok=True)
 
-def locate_disk(config, target=None):
-    app_config = load_config(APP_CONFIG_PATH)
+    result = get_runner().run(["mount", f"/dev/{target_partition}", mount_path])
+    invalidate_block_inventory()
+    if result.stdout.strip():
+        print(result.stdout)
+    try:
+        result.check()
+    except CommandError as e:
+        print(f"{status_message(Status.ERROR)} Could not mount /dev/{target_partition}: {e}")
+        print()
+        return
+    print(f"{status_message(Status.SUCCESS)} Disk mounted at {mount_path}.")
+
+def locate_command(config, cmd):
+    """`locate disk [disk...]`, `locate card <id>`, `locate all` (each with an optional `--for <duration>`) and `locate stop`."""
+    app_config = load_cached_config(APP_CONFIG_PATH)
     if app_config['enable_sas'] == False: # type: ignore
         print(f"{status_message(Status.ERROR)} SAS Functionality Disabled! This functionality currently only works on SAS connected disks\n")
         return
 
-    if target is None:
+    parts = cmd.split()[1:]
+    duration = app_config.get("locate_duration", LOCATE_DURATION)
+    if "--for" in parts:
+        # Imported here, the temperature modules import this one
+        from deepnexus.temperature_history import parse_range
+        index = parts.index("--for")
+        duration = parse_range(parts[index + 1]) if index + 1 < len(parts) else None
+        parts = parts[:index] + parts[index + 2:]
+        if not duration:
+            print("Invalid duration. Use e.g. '--for 60s' or '--for 5m'\n")
+            return
+
+    try:
+        if parts == ["stop"]:
+            report_locate_failures(stop_all_locates())
+            print("Locate indicators stopped.\n")
+            return
+        if parts[:1] == ["disk"]:
+            slots = select_locate_slots(config, parts[1:])
+            if not slots:
+                return
+            description = ", ".join(f"Card {card} Slot {slot}" for card, slot in slots)
+        elif parts[:1] == ["card"] and len(parts) == 2 and parts[1].isdigit():
+            slots = [(int(parts[1]), None)]
+            description = f"every disk on card {parts[1]}"
+        elif parts == ["all"]:
+            slots = [(card, None) for card in get_sas_controllers()]
+            description = "every disk"
+        else:
+            print("Invalid syntax. Use 'locate disk [disk...]', 'locate card <id>' or 'locate all', optionally with '--for 60s', or 'locate stop'\n")
+            return
+        paths, failures = start_locate(slots, duration)
+        if not paths:
+            print("No SAS drives found\n")
+            return
+        report_locate_failures(failures)
+    except CommandError as e:
+        print(f"{status_message(Status.ERROR)} {e}\n")
+        return
+    print(f"Locating {description} for {duration:g}s. The indicators switch off by themselves, 'locate stop' stops them now.\n")
+
+def select_locate_slots(config, names):
+    """(card, slot) of every named disk (mount name or device), or of the disks picked from a list."""
+    if not names:
         print("Available disks:")
         for i, disk in enumerate(config):
             print(f"  {i + 1}. {disk['label']} {disk['mnt']} ({disk['phy']})")
         try:
-            index = int(input("Select a disk by number: ")) - 1
-            if 0 <= index < len(config):
-                selected_disk = config[index]
-                run_locate_disk_action(selected_disk['mnt'], selected_disk['phy'], selected_disk['card'], selected_disk['slt'])  # type: ignore
-            else:
-                print("Invalid selection.")
+            indexes = [int(n) - 1 for n in input("Select disks by number (e.g. 1 3 5): ").split()]
         except ValueError:
             print("Invalid input.")
-    else:
-        match = next((d for d in config if d['mnt'] == f"/mnt/{target}"), None)
-        if match:
-            run_locate_disk_action(target, match['phy'], match['card'], match['slt']) # type: ignore
+            return []
+        if not indexes or not all(0 <= index < len(config) for index in indexes):
+            print("Invalid selection.")
+            return []
+        names = [config[index]['mnt'] for index in indexes]
+
+    correlation = get_disk_correlation()
+    slots = []
+    for name in names:
+        disk = config.find(mnt=name)
+        if disk:
+            card, slot = disk_slot(disk, correlation)
         else:
-            print(f"Disk with mount ID '{target}' not found in config.")
-
-def run_locate_disk_action(mount_id, card, slot):
-    print(f"Locating disk: {mount_id} (Card {card}, Slot {slot})")
-    print("The disk indicator light is now blinking.")
-    print("Press Enter to stop the indicator.")
-    start_locate_drive(card, slot)
-    input()
-    end_locate_drive(card, slot)
-    print("Indicator stopped.")
-
-def get_smart_temperatures():
-    disks = load_config(DISKS_CONFIG_PATH)
-    temperatures = {}
+            location = correlation.find(dev=name)
+            card, slot = (location.card, location.slot) if location and location.card is not None else (-1, -1)
+        if card == -1 or slot == -1:
+            print(f"Disk '{name}' not found in config or on a SAS card.")
+            return []
+        slots.append((card, slot))
+    return list(dict.fromkeys(slots))
+
+def report_locate_failures(failures):
+    for failure in failures:
+        print(f"{status_message(Status.WARNING)} {failure}")
+
+last_smart_poll = {}
+
+def get_smart_temperatures(timeout=None):
+    disks = get_disk_registry()
+    app_config = load_cached_config(APP_CONFIG_PATH)
+    workers = max(1, int(app_config.get("smart_concurrency", SMART_CONCURRENCY)))
+    last_smart_poll.clear()
+
+    # The recorded sdX name may belong to another disk after a reboot, poll whatever device holds the disk now
+    correlation = get_disk_correlation()
+    targets = []
     for disk in disks:
-        if 'dev' not in disk:
-            print(f"Warning: Disk entry missing 'dev' field. Skipping: {disk}")
+        location = correlation.resolve(disk)
+        if location is None or location.dev is None:
+            print(f"Warning: {disk['label']} ({disk['uuid']}) is not attached. Skipping")
             continue
+        targets.append((disk["label"], f"/dev/{location.dev}"))
 
-        dev = f"/dev/{disk['dev']}"
-        name = disk["label"]
+    temperatures = {}
+    timings = {}
+    started = time.monotonic()
+    if targets:
+        workers = min(workers, len(targets))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smartctl") as executor:
+            results = executor.map(lambda target: poll_smart_temperature(target[1], timeout), targets)
+            for (name, _), (temp, elapsed) in zip(targets, results):
+                temperatures[name] = temp
+                timings[name] = elapsed
 
-        try:
-            result = subprocess.run(
-                ["smartctl", "-A", dev],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.DEVNULL,
-                text=True,
-                check=True
-            )
-            output = result.stdout
-
-            # Match known temperature attributes
-            for line in output.splitlines():
-                if re.search(r'Temperature_Celsius|Temperature_Internal|Temperature', line):
-                    parts = line.split()
-                    if len(parts) >= 10 and parts[9].isdigit():
-                        temperatures[name] = int(parts[9])
-                        break
-                    elif len(parts) >= 2 and parts[1].isdigit():
-                        temperatures[name] = int(parts[1])
-                        break
-        except Exception as e:
-            print(f"smartctl failed for {dev}: {e}")
-            temperatures[name] = None
+    last_smart_poll.update({
+        "disks": len(targets),
+        "workers": workers if targets else 0,
+        "elapsed": time.monotonic() - started,
+        "timings": timings
+    })
     return temperatures
 
+def poll_smart_temperature(dev, timeout=None):
+    started = time.monotonic()
+    try:
+        # Sleeping disks are left asleep, polling them every few seconds (the agent) would keep them spinning
+        result = get_runner().run(["smartctl", "--json", "-n", f"standby,{SMART_STANDBY_STATUS}", "-A", dev], timeout).check(allow_status=True)
+        if result.returncode == SMART_STANDBY_STATUS:
+            return SMART_STANDBY, time.monotonic() - started
+        # smartctl uses its exit status as a bitmask, only bits 0 and 1 mean nothing was read
+        if result.returncode & 0b11:
+            raise RuntimeError(f"exit status {result.returncode}")
+        temp = parse_smart_temperature(json.loads(result.stdout))
+    except Exception as e:
+        print(f"smartctl failed for {dev}: {e}")
+        temp = None
+    return temp, time.monotonic() - started
+
+def parse_smart_temperature(data):
+    current = data.get("temperature", {}).get("current")
+    if isinstance(current, int):
+        return current
+
+    nvme_temp = data.get("nvme_smart_health_information_log", {}).get("temperature")
+    if isinstance(nvme_temp, int):
+        return nvme_temp
+
+    attributes = {attr.get("id"): attr for attr in data.get("ata_smart_attributes", {}).get("table", [])}
+    for attr_id in SMART_TEMPERATURE_ATTRIBUTES:
+        attr = attributes.get(attr_id)
+        if attr:
+            # The low byte of the raw value holds the current temperature, the rest is min/max history
+            return attr.get("raw", {}).get("value", 0) & 0xFF
+    return None
+
+def smart_poll_summary():
+    if not last_smart_poll.get("disks"):
+        return None
+    timings = last_smart_poll["timings"]
+    slowest = max(timings, key=timings.get)
+    return (f"SMART: polled {last_smart_poll['disks']} disks in {last_smart_poll['elapsed']:.2f}s "
+            f"with {last_smart_poll['workers']} workers "
+            f"(slowest {slowest} {timings[slowest]:.2f}s, sequential {sum(timings.values()):.2f}s)")
+
 def print_tree(data, prefix=""):
     mounted_paths = parse_mount_targets()
     fstab_uuids = get_fstab_uuids()
+    mounted_icon = f"{font('fg_green')}● {font('reset')}"
+    unmounted_icon = f"{font('fg_red')}● {font('reset')}"
     keys = list(data.keys())
     for i, key in enumerate(keys):
         is_last = i == len(keys) - 1
@@ -196,7 +291,7 @@ def print_tree(data, prefix=""):
         if isinstance(data[key], list):
             for j, item in enumerate(data[key]):
                 is_mounted = is_disk_mounted(mounted_paths, f"/mnt/{item['mnt']}")
-                status_icon = f"{font('fg_green')}● {font('reset')}" if is_mounted else f"{font('fg_red')}● {font('reset')}"
+                status_icon = mounted_icon if is_mounted else unmounted_icon
                 sub_prefix = prefix + ("    " if is_last else "│   ")
                 sub_branch = "└── " if j == len(data[key]) - 1 else "├── "
                 print(f"{sub_prefix}{sub_branch}{status_icon} {item['label']}")
@@ -204,7 +299,7 @@ def print_tree(data, prefix=""):
                 print(f"{details_prefix}├── Mount Point: /mnt/{item['mnt']}")
                 print(f"{details_prefix}├── Partition UUID: {item['uuid']}")
                 print(f"{details_prefix}├── Physical Location: {item['phy']}")
-                print(f"{details_prefix}├── Device: /dev/{item['dev']}")
+                print(f"{details_prefix}├── Device: {'/dev/' + item['dev'] if item['dev'] else 'Not attached'}")
                 if item['uuid'] in fstab_uuids:
                     print(f"{details_prefix}├── Automount: YES")
                 else:
@@ -212,16 +307,20 @@ def print_tree(data, prefix=""):
                 print(f"{details_prefix}└── SAS Slot: {item['slt']}")
     print()
 
+@traced("render")
 def show_disks_tree(config):
     if not config:
         print("There are no configured disks")
         return
 
+    correlation = get_disk_correlation()
     grouped = defaultdict(list)
     for disk in config:
-        if disk.get("card", -1) == -1 or disk.get("slt", -1) == -1:
+        location = correlation.resolve(disk)
+        card, slot = disk_slot(disk, correlation)
+        if card == -1 or slot == -1:
             continue
-        grouped[disk["card"]].append(disk)
+        grouped[card].append({**disk, "card": card, "slt": slot, "dev": location.dev if location else None})
 
     if not grouped:
         print("No valid disks with SAS card and slot info")
@@ -0,0 +1,39 @@
+import re
+import shlex
+from deepnexus.vars import FORMAT_PROFILES, DEFAULT_FORMAT_PROFILE
+
+# Shown next to the built-in profiles in the init dialogs
+PROFILE_DESCRIPTIONS = {
+    "archive": "large files, 1 inode per 4MiB, no reserved blocks, lazy init, no discard",
+    "general": "mkfs.ext4 defaults",
+    "small-file": "many small files, 1 inode per 4KiB",
+}
+
+def get_format_profiles(app_config):
+    return {**FORMAT_PROFILES, **app_config.get("format_profiles", {})}
+
+def default_format_profile(app_config):
+    profile = app_config.get("format_profile", DEFAULT_FORMAT_PROFILE)
+    return profile if profile in get_format_profiles(app_config) else DEFAULT_FORMAT_PROFILE
+
+def format_profile_choices(app_config):
+    """(name, text) pairs for a RadioList, the configured default profile first."""
+    profiles = get_format_profiles(app_config)
+    default = default_format_profile(app_config)
+    names = [default] + sorted(name for name in profiles if name != default)
+    return [(name, f"{name} ({PROFILE_DESCRIPTIONS.get(name) or profiles[name] or 'defaults'})") for name in names]
+
+def mkfs_argv(partition, options=""):
+    return ["mkfs.ext4", "-F"] + shlex.split(options) + [partition]
+
+def mkfs_command(partition, options=""):
+    return shlex.join(mkfs_argv(partition, options))
+
+# mke2fs redraws "Writing inode tables:  123/5960" in place while a phase runs
+MKFS_PROGRESS = re.compile(r'^(?P<phase>[A-Za-z][^:]*):\s+(?P<done>\d+)/(?P<total>\d+)\s*$')
+
+def parse_mkfs_progress(line):
+    match = MKFS_PROGRESS.match(line.strip())
+    if not match or int(match.group("total")) == 0:
+        return None
+    return match.group("phase"), int(match.group("done")) / int(match.group("total"))
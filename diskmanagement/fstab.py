@@ -0,0 +1,149 @@
+import os
+import difflib
+from deepnexus.utils import atomic_write
+from deepnexus.cache import FileCache
+from deepnexus.vars import FSTAB_PATH, MOUNT_OPTIONS
+
+fstab_text_cache = FileCache("fstab-text")
+
+class FstabError(RuntimeError):
+    pass
+
+def read_fstab_text(path):
+    if not os.path.exists(path):
+        return ""
+    with open(path) as f:
+        return f.read()
+
+class FstabLine(object):
+    """ A single line of fstab, the original text is kept so untouched lines are written back byte for byte. """
+
+    def __init__(self, text):
+        self.text = text
+        stripped = text.strip()
+        self.commented = stripped.startswith("#")
+        fields = stripped.lstrip("#").split()
+        # Commented lines only count as entries when they are a disabled UUID mount, not free text
+        if len(fields) >= 2 and (not self.commented or fields[0].startswith("UUID=")):
+            self.fields = fields
+        else:
+            self.fields = None
+
+    @property
+    def is_entry(self):
+        return self.fields is not None
+
+    @property
+    def uuid(self):
+        if self.fields and self.fields[0].startswith("UUID="):
+            return self.fields[0][5:]
+        return None
+
+    @property
+    def mount(self):
+        return self.fields[1] if self.fields else None
+
+    def commented_out(self):
+        return FstabLine("# " + self.text)
+
+    def uncommented(self):
+        return FstabLine(self.text.lstrip().lstrip("#").lstrip())
+
+class FstabDocument(object):
+    """ fstab parsed once, with edits staged in memory and applied in a single atomic write.
+
+    Comments, blank lines and ordering are preserved, `diff()` previews the staged changes.
+    """
+
+    def __init__(self, text="", path=FSTAB_PATH):
+        self.path = path
+        self.original = text
+        self.lines = [FstabLine(line) for line in text.splitlines()]
+        self._baseline = self.render()
+
+    @classmethod
+    def load(cls, path=FSTAB_PATH):
+        return cls(fstab_text_cache.get(path, lambda: read_fstab_text(path)), path)
+
+    def render(self):
+        return "".join(line.text + "\n" for line in self.lines)
+
+    @property
+    def dirty(self):
+        return self.render() != self._baseline
+
+    def entries(self, include_commented=False):
+        return [line for line in self.lines if line.is_entry and (include_commented or not line.commented)]
+
+    def active_uuids(self):
+        return {line.uuid for line in self.entries() if line.uuid}
+
+    def is_active(self, uuid):
+        return uuid in self.active_uuids()
+
+    def _indexes(self, uuid):
+        return [idx for idx, line in enumerate(self.lines) if line.is_entry and line.uuid == uuid]
+
+    def add(self, uuid, mount, options=MOUNT_OPTIONS):
+        if not uuid:
+            # `UUID= /mnt/x` is not a valid entry and would break mounting at boot
+            raise FstabError(f"refusing to add {mount} to fstab without a partition UUID")
+        if self.is_active(uuid):
+            return False
+        self.lines.append(FstabLine(f"UUID={uuid} {mount} {options}"))
+        return True
+
+    def enable(self, uuid, mount, options=MOUNT_OPTIONS):
+        if not uuid:
+            raise FstabError(f"refusing to add {mount} to fstab without a partition UUID")
+        indexes = self._indexes(uuid)
+        if not indexes:
+            return self.add(uuid, mount, options)
+        for idx in indexes:
+            if self.lines[idx].commented:
+                self.lines[idx] = self.lines[idx].uncommented()
+        return True
+
+    def disable(self, uuid):
+        for idx in self._indexes(uuid):
+            if not self.lines[idx].commented:
+                self.lines[idx] = self.lines[idx].commented_out()
+
+    def toggle(self, uuid, mount, options=MOUNT_OPTIONS):
+        if self.is_active(uuid):
+            self.disable(uuid)
+        else:
+            self.enable(uuid, mount, options)
+
+    def remove(self, uuid):
+        indexes = set(self._indexes(uuid))
+        self.lines = [line for idx, line in enumerate(self.lines) if idx not in indexes]
+        return bool(indexes)
+
+    def revert(self):
+        self.lines = [FstabLine(line) for line in self.original.splitlines()]
+
+    def diff(self):
+        return list(difflib.unified_diff(
+            self.original.splitlines(),
+            self.render().splitlines(),
+            fromfile=self.path,
+            tofile=f"{self.path} (staged)",
+            lineterm=""
+        ))
+
+    def pending_changes(self):
+        return sum(1 for line in self.diff() if line[:1] in "+-" and line[:3] not in ("+++", "---"))
+
+    def save(self):
+        if not self.dirty:
+            return False
+        text = self.render()
+        atomic_write(self.path, text)
+        self.original = self._baseline = text
+        return True
+
+def add_to_fstab(uuid, mount_point, path=FSTAB_PATH):
+    document = FstabDocument.load(path)
+    document.add(uuid, mount_point)
+    return document.save()
@@ -1,8 +1,7 @@
-from deepnexus.utils import get_fstab_uuids, format_size
-import os
+from deepnexus.utils import format_size
 from deepnexus.escape import Ansi
-from deepnexus.vars import FSTAB_PATH, MOUNT_OPTIONS
-import subprocess
+from diskmanagement.inventory import get_block_inventory
+from diskmanagement.fstab import FstabDocument, FstabError
 from prompt_toolkit import Application
 from prompt_toolkit.key_binding import KeyBindings
 from prompt_toolkit.layout import Layout
@@ -11,6 +10,7 @@ from prompt_toolkit.layout.containers import HSplit, Window
 from prompt_toolkit.formatted_text import FormattedText
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.styles import Style
+from prompt_toolkit.filters import Condition
 import asyncio
 font = Ansi.escape
 
@@ -41,68 +41,116 @@ def build_lines(disks, fstab_uuids, selected_index, mounted_disks):
 
     return FormattedText(lines)
 
+def build_diff_lines(diff):
+    if not diff:
+        return FormattedText([("class:dim", "No staged changes\n")])
+    lines = []
+    for line in diff:
+        if line.startswith("+") and not line.startswith("+++"):
+            style = "class:added"
+        elif line.startswith("-") and not line.startswith("---"):
+            style = "class:removed"
+        else:
+            style = "class:dim"
+        lines.append((style, line + "\n"))
+    return FormattedText(lines)
+
 async def run_fstab_menu_async():
+    document = FstabDocument.load()
     mounted_disks = get_mounted_disks()
-    fstab_entries = get_fstab_entries()
+    fstab_entries = get_fstab_entries(document)
 
     # Merge fstab entries with mounted disks (mounted takes precedence)
     all_disks = {**fstab_entries, **mounted_disks}  # mounted_disks overrides same UUIDs
     disks = sorted(all_disks.values(), key=lambda disk: disk.get("mount", ""))
-    fstab_uuids = set(fstab_entries.keys())
     selected = [0]
+    state = {"preview": False, "message": ""}
 
     def get_display_text():
-        return build_lines(disks, fstab_uuids, selected[0], mounted_disks)
+        if state["preview"]:
+            return build_diff_lines(document.diff())
+        return build_lines(disks, document.active_uuids(), selected[0], mounted_disks)
+
+    def get_footer_text():
+        if state["preview"]:
+            return "Staged changes: y to write /etc/fstab, n to go back"
+        pending = f" [{document.pending_changes()} pending line changes]" if document.dirty else ""
+        message = f" {state['message']}" if state["message"] else ""
+        return f"Use ↑/↓ to navigate, space to toggle, r to remove, w to review and write, u to undo, q to quit{pending}{message}"
 
     text_control = FormattedTextControl(get_display_text, focusable=True)
     disk_window = Window(content=text_control, always_hide_cursor=True)
-    footer = Window(height=1, content=FormattedTextControl(
-        "Use ↑/↓ to navigate, space to toggle, r to remove, q to quit"
-    ))
+    footer = Window(height=1, content=FormattedTextControl(get_footer_text))
 
 
     root_container = HSplit([disk_window, footer])
     body = Frame(root_container, title="FSTAB Manager")
 
     kb = KeyBindings()
+    listing = Condition(lambda: not state["preview"])
+    previewing = Condition(lambda: state["preview"])
 
-    @kb.add("up")
+    @kb.add("up", filter=listing)
     def up(event):
-        selected[0] = (selected[0] - 1) % len(disks)
+        if disks:
+            selected[0] = (selected[0] - 1) % len(disks)
 
-    @kb.add("down")
+    @kb.add("down", filter=listing)
     def down(event):
-        selected[0] = (selected[0] + 1) % len(disks)
+        if disks:
+            selected[0] = (selected[0] + 1) % len(disks)
 
-    @kb.add(" ")
+    @kb.add(" ", filter=listing)
     def toggle(event):
-        disk = disks[selected[0]]
-        uuid = disk["uuid"]
-        mount = disk["mount"]
-        present = uuid in fstab_uuids
-        toggle_fstab_entry(uuid, mount, present)
-        fstab_uuids.clear()
-        fstab_uuids.update(get_fstab_entries().keys())
-
-    @kb.add("r")
+        if disks:
+            disk = disks[selected[0]]
+            try:
+                document.toggle(disk["uuid"], disk["mount"])
+                state["message"] = ""
+            except FstabError as e:
+                state["message"] = str(e)
+
+    @kb.add("r", filter=listing)
     def remove(event):
-        disk = disks[selected[0]]
-        uuid = disk["uuid"]
-        mount = disk["mount"]
-        present = uuid in fstab_uuids
-        remove_fstab_entry(uuid, mount, present)
-        fstab_uuids.clear()
-        fstab_uuids.update(get_fstab_entries().keys())
-
-
-    @kb.add("q")
-    @kb.add("escape")
+        if disks:
+            document.remove(disks[selected[0]]["uuid"])
+            state["message"] = ""
+
+    @kb.add("u", filter=listing)
+    def undo(event):
+        document.revert()
+        state["message"] = "Staged changes discarded."
+
+    @kb.add("w", filter=listing)
+    def review(event):
+        state["preview"] = True
+
+    @kb.add("y", filter=previewing)
+    def write(event):
+        try:
+            state["message"] = "/etc/fstab written." if document.save() else "Nothing to write."
+        except OSError as e:
+            state["message"] = f"Write failed: {e}"
+        state["preview"] = False
+
+    @kb.add("n", filter=previewing)
+    @kb.add("escape", filter=previewing)
+    def back(event):
+        state["preview"] = False
+
+    @kb.add("q", filter=listing)
+    @kb.add("escape", filter=listing)
     def exit_app(event):
+        if document.dirty and not state["message"].startswith("Unsaved"):
+            state["message"] = "Unsaved changes, press q again to discard them or w to write."
+            return
         event.app.exit()
 
     style = Style.from_dict({
         "highlight": "bold underline",
         "dim": "fg:#888888",
+        "added": "fg:#198754",
+        "removed": "fg:#DC3545",
     })
 
     app = Application(
@@ -114,82 +162,26 @@ async def run_fstab_menu_async():
     await app.run_async()
 
 def get_mounted_disks():
-    result = subprocess.run(['lsblk', '-b', '-o', 'MOUNTPOINT,UUID,SIZE'], capture_output=True, text=True)
     disks = {}
-    for line in result.stdout.splitlines()[1:]:
-        parts = line.strip().split(None, 2)
-        if len(parts) == 3:
-            mount, uuid, size = parts
-            if mount and mount.startswith("/mnt/") and uuid:
+    for device in get_block_inventory().by_name.values():
+        uuid = device.get("uuid")
+        for mount in device["mountpoints"]:
+            if mount.startswith("/mnt/") and uuid:
                 disks[uuid] = {
                     "mount": mount,
                     "uuid": uuid,
-                    "size": format_size(int(size)) if size.isdigit() else "unknown"
+                    "size": format_size(device["size"]) if device["size"] is not None else "unknown"
                 }
     return disks
 
-def get_fstab_entries():
+def get_fstab_entries(document=None):
+    document = document or FstabDocument.load()
     entries = {}
-    if os.path.exists(FSTAB_PATH):
-        with open(FSTAB_PATH) as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("UUID="):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        uuid = parts[0].split("=")[1]
-                        mount = parts[1]
-                        if mount.startswith("/mnt/"):
-                            entries[uuid] = {
-                                "uuid": uuid,
-                                "mount": mount,
-                                "size": "not connected"
-                            }
+    for line in document.entries():
+        if line.uuid and line.mount.startswith("/mnt/"):
+            entries[line.uuid] = {
+                "uuid": line.uuid,
+                "mount": line.mount,
+                "size": "not connected"
+            }
     return entries
-
-
-def remove_fstab_entry(uuid, mount, present):
-    lines = []
-    if os.path.exists(FSTAB_PATH):
-        with open(FSTAB_PATH, "r") as f:
-            lines = f.readlines()
-
-    new_line = f"UUID={uuid} {mount} {MOUNT_OPTIONS}\n"
-
-    if present:
-        lines = [line for line in lines if f"UUID={uuid}" not in line]
-    else:
-        lines.append(new_line)
-
-    with open(FSTAB_PATH, "w") as f:
-        f.writelines(lines)
-
-def toggle_fstab_entry(uuid, mount, present):
-    lines = []
-    new_line = f"UUID={uuid} {mount} {MOUNT_OPTIONS}\n"
-    updated = False
-
-    if os.path.exists(FSTAB_PATH):
-        with open(FSTAB_PATH, "r") as f:
-            for line in f:
-                stripped = line.strip()
-                if f"UUID={uuid}" in stripped:
-                    if present:
-                        # Cement: comment it out if not already
-                        if not stripped.startswith("#"):
-                            line = "# " + line
-                    else:
-                        # Reactivate: uncomment if commented
-                        if stripped.startswith("#"):
-                            line = line.lstrip("# ").rstrip() + "\n"
-                        else:
-                            # already active, skip duplication
-                            updated = True
-                    updated = True
-                lines.append(line)
-
-    if not updated and not present:
-        lines.append(new_line)
-
-    with open(FSTAB_PATH, "w") as f:
-        f.writelines(lines)
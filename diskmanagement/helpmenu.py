@@ -5,13 +5,18 @@ def disks_help():
 Available commands:
   sas                        - Enter SAS submenu
   initialize disk, init disk - Initializes a disk (interactive)
+  initialize batch, init batch - Initializes several disks in parallel from name patterns
   show                       - If SAS enabled shows SAS connected disks otherwise shows all disks
   show all                   - Shows all connected disks
   fstab                      - Shows the fstab menu
   mount disk                 - Mounts a disk on a selected mount point
   lsblk [options]            - Runs the lsblk command directly and passes all options
-  locate disk                - Interactively locate a disk
-  locate disk ID             - Locate a specific disk by mount ID (e.g., sda)
+  locate disk                - Interactively locate one or more disks
+  locate disk ID [ID...]     - Locate disks by mount ID or device (e.g., locate disk sda sdb)
+  locate card ID             - Locate every disk on a SAS card
+  locate all                 - Locate every disk on every SAS card
+  locate ... --for 60s       - Keep the indicators on for a given time (default locate_duration)
+  locate stop                - Switch every locate indicator off now
   {common_commands_with_back()}
 """
     print(help_text)
@@ -20,6 +25,7 @@ def sas_submenu_help():
     help_text = f"""
 Available commands:
   show all                   - Show all SAS info using storcli64
+  show slots [controller id] - Show a table of the drives in every slot (optionally one controller)
   show disk <disk>           - Show info for disk at a mount point
   controller <controller id> - Displays the info for a single controller
   smart sda                  - Show SMART info for disk at row X col Y
@@ -0,0 +1,323 @@
+from prompt_toolkit import Application
+from prompt_toolkit.layout import Layout
+from prompt_toolkit.widgets import Button, Dialog, Label, TextArea, RadioList, CheckboxList
+from prompt_toolkit.layout.containers import HSplit, Window, FloatContainer, ConditionalContainer
+from prompt_toolkit.key_binding import KeyBindings
+from prompt_toolkit.application.current import get_app
+from prompt_toolkit.filters import Condition
+from prompt_toolkit.styles import Style
+from prompt_toolkit.layout.dimension import Dimension as D
+from prompt_toolkit.layout.controls import FormattedTextControl
+from prompt_toolkit.formatted_text import FormattedText
+import time
+import asyncio
+from diskmanagement.utils import list_unmounted_disks, get_disk_size
+from diskmanagement.initialize_disk.initialize_disk import provision_disk, provision_steps
+from diskmanagement.initialize_disk.popups import show_batch_confirmation_dialog
+from diskmanagement.sas import invalidate_storcli_cache
+from diskmanagement.inventory import invalidate_block_inventory
+from diskmanagement.registry import mount_name
+from diskmanagement.fstab import FstabDocument
+from deepnexus.utils import parse_mount_targets
+from diskmanagement.formatting import format_profile_choices
+from deepnexus.vars import COLORS, INIT_CONCURRENCY
+
+def initialize_disks_batch(disk_config, app_config):
+    dry_run = False
+    interactive_batch_setup(app_config, disk_config, dry_run=dry_run)
+
+def expand_pattern(pattern, number, disk):
+    """Fills `{n}` (supports format specs, e.g. `{n:02}`) and `{dev}` (e.g. sdb) in a label or mount name pattern."""
+    return pattern.format(n=number, dev=disk.replace("/dev/", ""))
+
+def taken_mount_names(disk_config, mount_targets=None, fstab=None):
+    """Mount names a new disk can't get, with why: mounted right now, in fstab or in disks.json."""
+    mount_targets = parse_mount_targets() if mount_targets is None else mount_targets
+    fstab = FstabDocument.load() if fstab is None else fstab
+    taken = {}
+    for target in mount_targets:
+        if target.startswith("/mnt/"):
+            taken.setdefault(mount_name(target), "is already mounted")
+    for line in fstab.entries():
+        if line.mount.startswith("/mnt/"):
+            taken.setdefault(mount_name(line.mount), f"is already in {fstab.path}")
+    for disk in disk_config:
+        taken.setdefault(disk["mnt"], f"is already in {disk_config.path}")
+    return taken
+
+def build_batch_jobs(disks, label_pattern, mount_pattern, phy_pattern, start, options, taken):
+    jobs = []
+    errors = []
+    mount_names = set()
+    for number, disk in enumerate(disks, start):
+        try:
+            label = expand_pattern(label_pattern, number, disk).strip() or "NO LABEL"
+            mnt = mount_name(expand_pattern(mount_pattern, number, disk))
+            phy = expand_pattern(phy_pattern, number, disk).strip() or "Unknown"
+        except (KeyError, IndexError, ValueError) as e:
+            return [], [f"Invalid pattern: {e}. Use {{n}}, {{n:02}} or {{dev}}"]
+        if not mnt:
+            errors.append(f"{disk}: empty mount name")
+        elif mnt in mount_names:
+            errors.append(f"{disk}: mount name {mnt} is generated twice, add {{n}} or {{dev}} to the pattern")
+        elif mnt in taken:
+            # Mounting over another disk or a second fstab line for the same path must never happen
+            errors.append(f"{disk}: /mnt/{mnt} {taken[mnt]}")
+        mount_names.add(mnt)
+        jobs.append(dict(options, disk=disk, label=label, mnt=mnt, phy=phy, card=-1, slt=-1))
+    return jobs, errors
+
+class BatchProgress(object):
+    """ Progress of every disk in a batch, updated by the provisioning tasks and drawn by the dialog. """
+
+    def __init__(self, jobs, on_change):
+        self.jobs = jobs
+        self.on_change = on_change
+        self.state = {job["disk"]: {"status": "queued", "done": 0, "total": len(provision_steps(job)), "fraction": None,
+                                    "started": None, "finished": None, "error": None} for job in jobs}
+
+    def update(self, disk, **changes):
+        self.state[disk].update(changes)
+        self.on_change()
+
+    def step(self, disk, name):
+        state = self.state[disk]
+        state["status"] = name
+        state["fraction"] = None
+        state["done"] = min(state["done"] + 1, state["total"])
+        self.on_change()
+
+    def progress(self, disk, phase, fraction):
+        self.state[disk]["fraction"] = fraction
+        self.on_change()
+
+    def render(self, width=20):
+        lines = []
+        now = time.monotonic()
+        for job in self.jobs:
+            state = self.state[job["disk"]]
+            if state["error"]:
+                style, status = f"fg:{COLORS['error']}", f"failed: {state['error']}"
+            elif state["finished"]:
+                style, status = f"fg:{COLORS['success']}", "done"
+            else:
+                style, status = "fg:#ffffff", state["status"]
+                if state["fraction"] is not None:
+                    status += f" {state['fraction'] * 100:.0f}%"
+            # A step counts as done once the next one starts, so the bar only fills when the disk finishes
+            done = state["total"] if state["finished"] and not state["error"] else max(0, state["done"] - 1 + (state["fraction"] or 0))
+            filled = int(width * done / state["total"])
+            bar = "#" * filled + "-" * (width - filled)
+            elapsed = ""
+            if state["started"]:
+                elapsed = f"{(state['finished'] or now) - state['started']:.0f}s"
+            lines.append((style, f"{job['disk']:<12}{job['mnt']:<16}[{bar}] {elapsed:>5}  {status}\n"))
+        return lines
+
+def interactive_batch_setup(app_config, disk_config, dry_run=False):
+    floats = []
+    state = {"running": False, "summary": "", "errors": []}
+
+    disks = list_unmounted_disks()
+    spacer = Window(height=1, content=FormattedTextControl(''))
+
+    disk_checkboxes = CheckboxList([(d, f"{d} ({get_disk_size(d)})") for d in disks])
+    label_input = TextArea(prompt='Label pattern: ', text="DISK-{n:02}", height=1, multiline=False)
+    mount_input = TextArea(prompt='Mount name pattern: /mnt/', text="hdd-{n:02}", height=1, multiline=False)
+    phy_input = TextArea(prompt='Physical location pattern (optional): ', height=1, multiline=False)
+    start_input = TextArea(prompt='First number: ', text="1", height=1, multiline=False)
+    concurrency_input = TextArea(prompt='Disks at once: ', text=str(app_config.get("init_concurrency", INIT_CONCURRENCY)), height=1, multiline=False)
+    mount_when_ready_input = RadioList([(True, 'Yes'), (False, 'No')])
+    fstab_input = RadioList([(True, 'Yes'), (False, 'No')])
+    config_input = RadioList([(True, 'Yes'), (False, 'No')])
+    profile_input = RadioList(format_profile_choices(app_config))
+
+    progress = [None]
+    tasks = []
+
+    def current_jobs():
+        start = int(start_input.text.strip()) if start_input.text.strip().isdigit() else 1
+        options = {
+            "mount": mount_when_ready_input.current_value,
+            "fstab": fstab_input.current_value,
+            "config": config_input.current_value,
+            "profile": profile_input.current_value,
+        }
+        selected = [d for d in disks if d in disk_checkboxes.current_values]
+        return build_batch_jobs(selected, label_input.text, mount_input.text, phy_input.text, start, options, taken_mount_names(disk_config))
+
+    def get_preview_text():
+        jobs, errors = current_jobs()
+        if not jobs and not errors:
+            return FormattedText([("white", "Select the disks to initialize")])
+        lines = [("white", f"{job['disk']:<12} label {job['label']:<20} /mnt/{job['mnt']}\n") for job in jobs]
+        lines += [(f"fg:{COLORS['error']}", f"{error}\n") for error in errors]
+        return FormattedText(lines)
+
+    def get_progress_text():
+        lines = progress[0].render() if progress[0] else []
+        if state["summary"]:
+            lines.append(("white", "\n" + state["summary"]))
+        return FormattedText(lines)
+
+    def run_batch(jobs, workers):
+        app = get_app()
+        batch = progress[0] = BatchProgress(jobs, app.invalidate)
+        limit = asyncio.Semaphore(workers)
+
+        async def run(job):
+            disk = job["disk"]
+            errors = []
+
+            def log(style, message):
+                # Full command output stays out of the progress view, only errors are kept
+                if style == f"fg:{COLORS['error']}":
+                    errors.append(message.strip())
+
+            try:
+                async with limit:
+                    batch.update(disk, status="starting", started=time.monotonic())
+                    await provision_disk(job, disk_config, app_config, log, step=lambda name: batch.step(disk, name),
+                                         progress=lambda phase, fraction: batch.progress(disk, phase, fraction), dry_run=dry_run)
+                batch.update(disk, finished=time.monotonic(), error=errors[-1] if errors else None)
+            except asyncio.CancelledError:
+                batch.update(disk, finished=time.monotonic(), error="cancelled")
+                raise
+            except Exception as e:
+                batch.update(disk, finished=time.monotonic(), error=str(e))
+
+        async def run_all():
+            started = time.monotonic()
+            tasks[:] = [asyncio.ensure_future(run(job)) for job in jobs]
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not dry_run:
+                invalidate_storcli_cache()
+                invalidate_block_inventory()
+            failed = sum(1 for s in batch.state.values() if s["error"])
+            state["summary"] = (f"{len(jobs) - failed} of {len(jobs)} disks initialized in {time.monotonic() - started:.0f}s "
+                                f"({workers} at once). Press ESC to exit.")
+            state["running"] = False
+            app.invalidate()
+
+        state["running"] = True
+        app.create_background_task(run_all())
+
+    def cancel_batch():
+        for task in tasks:
+            task.cancel()
+        state["summary"] = "Cancelling, running steps are being stopped..."
+
+    def apply():
+        jobs, pattern_errors = current_jobs()
+        errors = []
+        value = concurrency_input.text.strip()
+        if not value.isdigit() or int(value) < 1:
+            errors.append("Disks at once must be a number above 0")
+        if not jobs and not pattern_errors:
+            errors.append("No disks selected")
+        state["errors"] = errors
+        # Pattern problems are already listed under the preview
+        if errors or pattern_errors:
+            get_app().invalidate()
+            return
+        workers = min(int(value), len(jobs))
+        show_batch_confirmation_dialog(
+            floats,
+            lambda: (get_app().layout.focus(progress_window), run_batch(jobs, workers)),
+            lambda: (get_app().layout.focus(dialog), get_app().invalidate()),
+            jobs,
+            workers
+        )
+
+    def get_error_text():
+        return FormattedText([(f"fg:{COLORS['error']}", f"{error}\n") for error in state["errors"]])
+
+    form_items = [
+        Label("Select the disks to initialize:"),
+        disk_checkboxes,
+        spacer,
+        Label("Patterns accept {n} (e.g. {n:02}) for the disk number and {dev} for the device name"),
+        label_input,
+        mount_input,
+        phy_input,
+        start_input,
+        spacer,
+        Label("Format profile:"),
+        profile_input,
+        spacer,
+        Label("Mount after initialization?"),
+        mount_when_ready_input,
+        spacer,
+        Label("Add to /etc/fstab?"),
+        fstab_input,
+        spacer,
+        Label("Add to disk_config?"),
+        config_input,
+        spacer,
+        concurrency_input,
+        spacer,
+        Label("Preview:"),
+        Window(content=FormattedTextControl(get_preview_text), height=D(min=1, max=12)),
+        Window(content=FormattedTextControl(get_error_text), height=D(min=0, max=4)),
+        Window(height=D(weight=1)),
+        Button(text="Apply", handler=apply),
+        Label("Press ESC to exit"),
+    ]
+
+    progress_window = Window(content=FormattedTextControl(get_progress_text, focusable=True), always_hide_cursor=True)
+    started = Condition(lambda: progress[0] is not None)
+    body = HSplit([
+        ConditionalContainer(HSplit(form_items), filter=~started),
+        ConditionalContainer(progress_window, filter=started),
+    ], width=D(), height=D())
+    dialog = Dialog(title="Batch Disk Initialization", body=body, buttons=[], width=100, with_background=False)
+
+    root_container = FloatContainer(
+        content=dialog,
+        floats=floats
+    )
+
+    layout = Layout(container=root_container)
+
+    kb = KeyBindings()
+
+    @kb.add('escape')
+    def exit_(event):
+        # The first ESC cancels the running batch, the next one leaves
+        if state["running"]:
+            cancel_batch()
+            return
+        event.app.exit()
+
+    style = Style.from_dict({
+        "window": "bg:default",
+        "frame.label": "bg:#000000 fg:#ffffff",
+        "frame.border": "fg:#ffffff",
+        "label": "fg:#ffffff",
+
+        "radio-list": "fg:#ffffff bg:",
+        "radio-list.focused": "fg:#ffffff bg:",
+        "radio": "fg:#ffffff bg:#000000",
+        "radio-selected": "fg:#ffffff bold",
+        "radio-checked": "fg:#ffffff bg:#000000",
+        "radio-unchecked": "fg:#ffffff bg:#000000",
+
+        "checkbox-list": "fg:#ffffff bg:",
+        "checkbox": "fg:#ffffff bg:#000000",
+        "checkbox-selected": "fg:#ffffff bold",
+        "checkbox-checked": "fg:#ffffff bg:#000000",
+
+        "confirmation-text": "fg:white",
+        "dialog": "bg:",
+        "dialog.body": "bg:",
+        "dialog.shadow": "bg:",
+        "dialog.frame": "fg:#ffffff",
+        "button": "bg:#444444 #ffffff",
+        "button.focused": "bg:#666666 #ffffff",
+
+        "text-area": "bg:#111111 fg:#cccccc",
+        "output-field": "bg:",
+    })
+
+    app = Application(layout=layout, key_bindings=kb, full_screen=True, mouse_support=False, style=style, refresh_interval=1)
+    app.run()
@@ -9,41 +9,115 @@ from prompt_toolkit.layout.dimension import Dimension as D
 from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.formatted_text import FormattedText
 import os
-from deepnexus.utils import run_command
-from diskmanagement.utils import list_unmounted_disks, get_partition_uuid, log_message, get_disk_size
+import asyncio
+from diskmanagement.utils import list_unmounted_disks, read_partition_uuid, log_message, get_disk_size, run_step
 from diskmanagement.initialize_disk.popups import show_mount_popup, show_sas_controller_popup, show_sas_slot_popup, show_log_popup, show_confirmation_dialog
+from diskmanagement.sas import invalidate_storcli_cache
+from diskmanagement.inventory import get_block_inventory, invalidate_block_inventory
+from diskmanagement.registry import DiskRegistryError, mount_name
+from diskmanagement.fstab import add_to_fstab
+from diskmanagement.formatting import get_format_profiles, format_profile_choices, mkfs_command, mkfs_argv
 from deepnexus.vars import COLORS
 
 def initialize_disk(disk_config, app_config):
     dry_run = False
     interactive_disk_setup(app_config, disk_config, dry_run=dry_run)
 
-def disk_init(disk, label, output_lines, output_control):
-    log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'Preparing disk {disk}')
-    log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'Creating partition table...')
-    partition_table_output = run_command(f"parted -s {disk} mklabel gpt")
-    log_message(output_lines, output_control, f"fg:#ffffff", partition_table_output)
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", "Partition table created")
-    log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'Creating partition...')
-    partition_output = run_command(f"parted -s {disk} mkpart primary ext4 0% 100%")
-    log_message(output_lines, output_control, f"fg:#ffffff", partition_output)    
+async def disk_init(disk, label, log, step=None, mkfs_options="", progress=None):
+    step = step or (lambda name: None)
+    log(f"fg:{COLORS['info']}", f'Preparing disk {disk}')
+    step("partition table")
+    log(f"fg:{COLORS['info']}", f'Creating partition table...')
+    await run_step(["parted", "-s", disk, "mklabel", "gpt"], log)
+    log(f"fg:{COLORS['success']}", "Partition table created")
+    step("partition")
+    log(f"fg:{COLORS['info']}", f'Creating partition...')
+    await run_step(["parted", "-s", disk, "mkpart", "primary", "ext4", "0%", "100%"], log)
     partition = disk + '1'
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Partition created: {partition}")
-    log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'Creating file system...')
-    mkfs_output = run_command(f"mkfs.ext4 -F {partition}")
-    log_message(output_lines, output_control, f"fg:#ffffff", mkfs_output)
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"File system created")
-    log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'Labeling partition...')
-    labeling_output = run_command(f"e2label {partition} \"{label}\"")
-    log_message(output_lines, output_control, f"fg:#ffffff", labeling_output)
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Partition labeled")
+    log(f"fg:{COLORS['success']}", f"Partition created: {partition}")
+    step("file system")
+    log(f"fg:{COLORS['info']}", f'Creating file system...')
+    await run_step(mkfs_argv(partition, mkfs_options), log, progress)
+    log(f"fg:{COLORS['success']}", f"File system created")
+    step("label")
+    log(f"fg:{COLORS['info']}", f'Labeling partition...')
+    await run_step(["e2label", partition, label], log)
+    log(f"fg:{COLORS['success']}", f"Partition labeled")
     return partition
 
-def add_to_fstab(uuid, mount_point, output_lines, output_control):
-    fstab_entry = f"UUID={uuid} {mount_point} ext4 defaults,nofail,x-systemd.device-timeout=0 0 2"
-    log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Partition {uuid} added to fstab on mount point {mount_point}")
-    with open('/etc/fstab', 'a') as f:
-        f.write(fstab_entry + '\n')
+def provision_steps(job):
+    steps = ["mount point", "partition table", "partition", "file system", "label", "uuid"]
+    if job["mount"]:
+        steps.append("mount")
+    if job["fstab"]:
+        steps.append("fstab")
+    if job["config"]:
+        steps.append("config")
+    return steps
+
+async def provision_disk(job, disk_config, app_config, log, step=None, progress=None, dry_run=False):
+    """ Partitions, formats, labels and optionally mounts one disk, then records it in fstab and disks.json.
+
+    `job` holds disk, label, mnt, phy, card, slt, the format profile and the mount/fstab/config flags.
+    Runs in the application's event loop, the fstab and disks.json updates don't await so concurrent
+    disks never interleave them.
+    """
+    step = step or (lambda name: None)
+    disk = job["disk"]
+    mount_point = f"/mnt/{job['mnt']}"
+    profiles = get_format_profiles(app_config)
+    if job["profile"] not in profiles:
+        raise RuntimeError(f"Unknown format profile '{job['profile']}'")
+
+    if dry_run:
+        partition = disk + '1'
+        uuid = 'dry-run-uuid'
+        log(f"fg:{COLORS['info']}", f'[DRY RUN] DISK | PARTITION: {disk} | {partition} UUID: {uuid} LABEL: {job["label"]} MOUNT NAME: {job["mnt"]}')
+        log(f"fg:{COLORS['info']}", f'[DRY RUN] PHYSICAL LOCATION: {job["phy"]} FSTAB: {job["fstab"]} CONFIG: {job["config"]} CARD: {job["card"]} SLOT: {job["slt"]}')
+        log(f"fg:{COLORS['info']}", f'[DRY RUN] FORMAT: {mkfs_command(disk + "1", profiles[job["profile"]])}')
+        if job["config"]:
+            log(f"fg:{COLORS['info']}", f'[DRY RUN] Would add {job["mnt"]} to {disk_config.path}')
+        return uuid
+
+    step("mount point")
+    os.makedirs(mount_point, exist_ok=True)
+    log(f"fg:{COLORS['success']}", f"Mount point {mount_point} ready")
+    log(f"fg:{COLORS['info']}", f"Format profile: {job['profile']}")
+    partition = await disk_init(disk, job["label"], log, step, profiles[job["profile"]], progress)
+    step("uuid")
+    uuid = await asyncio.to_thread(read_partition_uuid, partition)
+    if not uuid:
+        raise RuntimeError(f"{partition} has no file system UUID, initialization failed")
+    if job["mount"]:
+        step("mount")
+        log(f"fg:{COLORS['info']}", f"Mounting {partition}")
+        await run_step(["mount", partition, mount_point], log)
+        log(f"fg:{COLORS['success']}", f"Mounted {partition}")
+    if job["fstab"]:
+        step("fstab")
+        if add_to_fstab(uuid, mount_point):
+            log(f"fg:{COLORS['success']}", f"Partition {uuid} added to fstab on mount point {mount_point}")
+        else:
+            log(f"fg:{COLORS['warning']}", f"Partition {uuid} is already in fstab")
+    if job["config"]:
+        step("config")
+        device = get_block_inventory().get(disk) or {}
+        entry = {
+            "label": job["label"],
+            "phy": job["phy"],
+            "mnt": job["mnt"],
+            "card": job["card"],
+            "slt": job["slt"],
+            "uuid": uuid,
+            "dev": disk.replace("/dev/", ""),
+            "serial": device.get("serial") or ""
+        }
+        try:
+            disk_config.add(entry)
+            log(f"fg:{COLORS['success']}", f"Disk {job['mnt']} saved to {disk_config.path}")
+        except (DiskRegistryError, OSError) as e:
+            log(f"fg:{COLORS['error']}", f"Disk {job['mnt']} not saved: {e}")
+    return uuid
 
 def interactive_disk_setup(app_config, disk_config, dry_run=False):
     floats = []
@@ -64,6 +138,7 @@ def interactive_disk_setup(app_config, disk_config, dry_run=False):
     fstab_input = RadioList([(True, 'Yes'), (False, 'No')])
     config_input = RadioList([(True, 'Yes'), (False, 'No')])
     mount_when_ready_input = RadioList([(True, 'Yes'), (False, 'No')])
+    profile_input = RadioList(format_profile_choices(app_config))
     sas_controller_value = [-1]
     sas_controller_button = Button(
         text="Select SAS controller", 
@@ -97,49 +172,53 @@ def interactive_disk_setup(app_config, disk_config, dry_run=False):
         text = f"SAS Slot: {value}" if int(value) != -1 else "SAS Slot: None"
         return FormattedText([("white", text)])
 
+    task = [None]
+    mkfs_progress = [None]
+
+    def set_progress(phase, fraction):
+        mkfs_progress[0] = (phase, fraction) if phase else None
+        get_app().invalidate()
+
+    def cancel():
+        if task[0] and not task[0].done():
+            task[0].cancel()
+
     def accept():
-        show_log_popup(floats, output_control, on_close=lambda: get_app().exit())
-
-        disk = disk_radio.current_value
-        label = label_input.text.strip() or "NO LABEL"
-        mount_name = mount_point_value[0]
-        mount_point = f"/mnt/{mount_name}"
-        phy = phy_input.text.strip() or "Unknown"
-        add_fstab = fstab_input.current_value
-        add_config = config_input.current_value
-        mount_after_init = mount_when_ready_input.current_value
-        card = int(sas_controller_value[0]) if app_config.get("enable_sas") else -1
-        slt = int(sas_slot_value[0]) if app_config.get("enable_sas") else -1
-
-        if not dry_run:
-            os.makedirs(mount_point, exist_ok=True)
-            log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Mount point {mount_point} ready")
-            partition = disk_init(disk, label, output_lines, output_control)
-            uuid = get_partition_uuid(partition)
-            if mount_after_init:
-                log_message(output_lines, output_control, f"fg:{COLORS['info']}", f"Mounting {partition}")
-                run_command(f"mount {partition} {mount_point}")
-                log_message(output_lines, output_control, f"fg:{COLORS['success']}", f"Mounted {partition}")
-            if add_fstab:
-                add_to_fstab(uuid, mount_point)
-        else:
-            partition = disk + '1'
-            uuid = 'dry-run-uuid'
-            log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'[DRY RUN] DISK | PARTITION: {disk} | {partition} UUID: {uuid} LABEL: {label} MOUNT NAME: {mount_name}')
-            log_message(output_lines, output_control, f"fg:{COLORS['info']}", f'[DRY RUN] PHYSICAL LOCATION: {phy} FSTAB: {add_fstab} CONFIG: {add_config} CARD: {card} SLOT: {slt}')
-
-        if add_config:
-            disk_config.append({
-                "label": label,
-                "phy": phy,
-                "mnt": mount_name,
-                "card": card,
-                "slt": slt,
-                "uuid": uuid,
-                "dev": disk.replace("/dev/", "")
-            })
-
-        log_message(output_lines, output_control, f"fg:{COLORS['success']}", 'Disk setup complete. Press ESC to exit.')
+        show_log_popup(
+            floats, output_control, on_close=lambda: get_app().exit(),
+            progress=lambda: mkfs_progress[0], running=lambda: task[0] is not None and not task[0].done(), on_cancel=cancel
+        )
+        log = lambda style, message: log_message(output_lines, output_control, style, message)
+
+        job = {
+            "disk": disk_radio.current_value,
+            "label": label_input.text.strip() or "NO LABEL",
+            "mnt": mount_name(mount_point_value[0]),
+            "phy": phy_input.text.strip() or "Unknown",
+            "mount": mount_when_ready_input.current_value,
+            "fstab": fstab_input.current_value,
+            "config": config_input.current_value,
+            "profile": profile_input.current_value,
+            "card": int(sas_controller_value[0]) if app_config.get("enable_sas") else -1,
+            "slt": int(sas_slot_value[0]) if app_config.get("enable_sas") else -1,
+        }
+
+        async def run():
+            try:
+                await provision_disk(job, disk_config, app_config, log, progress=set_progress, dry_run=dry_run)
+                log(f"fg:{COLORS['success']}", 'Disk setup complete. Press ESC to exit.')
+            except asyncio.CancelledError:
+                log(f"fg:{COLORS['error']}", f"Cancelled, {job['disk']} may be left partially initialized. Press ESC to exit.")
+            except (RuntimeError, OSError) as e:
+                # Failed commands and mount point or fstab writes, registry conflicts are logged by provision_disk
+                log(f"fg:{COLORS['error']}", f"{e}. Press ESC to exit.")
+            finally:
+                mkfs_progress[0] = None
+                if not dry_run:
+                    invalidate_storcli_cache()
+                    invalidate_block_inventory()
+
+        task[0] = get_app().create_background_task(run())
 
     mount_label_control = FormattedTextControl(text=get_mount_text)
     mount_label_window = Window(content=mount_label_control, height=1)
@@ -158,6 +237,9 @@ def interactive_disk_setup(app_config, disk_config, dry_run=False):
         mount_label_window,
         mount_button,
         spacer,
+        Label("Format profile:"),
+        profile_input,
+        spacer,
         Label("Mount after initialization?"),
         mount_when_ready_input,
         spacer,
@@ -197,7 +279,8 @@ def interactive_disk_setup(app_config, disk_config, dry_run=False):
                 "disk_config": config_input.current_value,
                 "phy": phy_input.text.strip(),
                 "controller": sas_controller_value[0],
-                "slot": sas_slot_value[0]
+                "slot": sas_slot_value[0],
+                "profile": profile_input.current_value
             }
         )
     ))    
@@ -217,6 +300,10 @@ def interactive_disk_setup(app_config, disk_config, dry_run=False):
 
     @kb.add('escape')
     def exit_(event):
+        # The first ESC stops the running step, the next one leaves
+        if task[0] and not task[0].done():
+            cancel()
+            return
         event.app.exit()
 
 
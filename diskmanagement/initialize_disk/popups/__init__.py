@@ -2,7 +2,7 @@ from diskmanagement.initialize_disk.popups.mount import show_mount_popup
 from diskmanagement.initialize_disk.popups.sas_controller import show_sas_controller_popup
 from diskmanagement.initialize_disk.popups.sas_slot import show_sas_slot_popup
 from diskmanagement.initialize_disk.popups.log import show_log_popup
-from diskmanagement.initialize_disk.popups.confirmation import show_confirmation_dialog, show_confirmation_disk_mount_dialog
+from diskmanagement.initialize_disk.popups.confirmation import show_confirmation_dialog, show_confirmation_disk_mount_dialog, show_batch_confirmation_dialog
 
 __all__ = [
     "show_mount_popup",
@@ -10,5 +10,6 @@ __all__ = [
     "show_sas_slot_popup",
     "show_log_popup",
     "show_confirmation_dialog",
-    "show_confirmation_disk_mount_dialog"
+    "show_confirmation_disk_mount_dialog",
+    "show_batch_confirmation_dialog"
 ]
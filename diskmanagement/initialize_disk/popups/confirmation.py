@@ -3,11 +3,11 @@ from prompt_toolkit.layout.containers import HSplit, VSplit, Window, Float
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.layout.dimension import Dimension as D
 from prompt_toolkit.layout.controls import FormattedTextControl
-from deepnexus.utils import load_config
+from deepnexus.utils import load_cached_config
 from deepnexus.vars import APP_CONFIG_PATH, COLORS
 
 def show_confirmation_dialog(floats, on_confirm, on_cancel, initialization_info):
-    app_config = load_config(APP_CONFIG_PATH)
+    app_config = load_cached_config(APP_CONFIG_PATH)
     text=[
         ("class:confirmation-text", "Are you sure you want to proceed with disk initialization?")    
     ]
@@ -19,6 +19,7 @@ def show_confirmation_dialog(floats, on_confirm, on_cancel, initialization_info)
         ("Add to fstab", str(initialization_info['fstab'])),
         ("Add to configuration", str(initialization_info['disk_config'])),
         ("Physical location", initialization_info['phy'] if initialization_info['phy'] else "Unknown"),
+        ("Format profile", initialization_info['profile']),
     ]
 
     if app_config['enable_sas']:
@@ -62,7 +63,7 @@ def show_confirmation_dialog(floats, on_confirm, on_cancel, initialization_info)
     get_app().invalidate()
 
 def show_confirmation_disk_mount_dialog(floats, on_confirm, on_cancel, initialization_info):
-    app_config = load_config(APP_CONFIG_PATH)
+    app_config = load_cached_config(APP_CONFIG_PATH)
     text=[
         ("class:confirmation-text", "Do you want to mount the disk?")    
     ]
@@ -106,4 +107,48 @@ def show_confirmation_disk_mount_dialog(floats, on_confirm, on_cancel, initializ
 
     get_app().layout.focus(yes_button)
 
-    get_app().invalidate()
\ No newline at end of file
+    get_app().invalidate()
+
+def show_batch_confirmation_dialog(floats, on_confirm, on_cancel, jobs, workers):
+    text=[
+        ("class:confirmation-text", f"Are you sure you want to initialize {len(jobs)} disks, {workers} at a time?")
+    ]
+
+    formatted_table = [
+        ("class:confirmation-text", f"{job['disk']:<12} {job['label']:<20} /mnt/{job['mnt']}\n")
+        for job in jobs
+    ]
+    options = [
+        ("class:confirmation-text", f"{'Format profile':<22}: {jobs[0]['profile']}\n"),
+        ("class:confirmation-text", f"{'Mount after init':<22}: {jobs[0]['mount']}\n"),
+        ("class:confirmation-text", f"{'Add to fstab':<22}: {jobs[0]['fstab']}\n"),
+        ("class:confirmation-text", f"{'Add to configuration':<22}: {jobs[0]['config']}\n"),
+    ]
+
+    centered_text_window = VSplit([
+        Window(width=D(weight=1)),
+        HSplit([
+            Window(content=FormattedTextControl([(f"fg:{COLORS['error']}", "This process will erase all data on every listed disk!")])),
+            Window(content=FormattedTextControl(text)),
+            Window(height=1, content=FormattedTextControl('')),
+            Window(content=FormattedTextControl(formatted_table), height=D(max=12)),
+            Window(height=1, content=FormattedTextControl('')),
+            Window(content=FormattedTextControl(options)),
+        ]),
+        Window(width=D(weight=1)),
+    ])
+
+    yes_button = Button(text="Yes", handler=lambda: (floats.clear(), on_confirm()))
+    no_button = Button(text="No", handler=lambda: (floats.clear(), on_cancel()))
+
+    confirm_dialog = Dialog(
+        title="Confirm Action",
+        body=HSplit([centered_text_window]),
+        buttons=[yes_button, no_button],
+        width=80
+    )
+
+    floats.append(Float(content=confirm_dialog))
+
+    get_app().layout.focus(no_button)
+    get_app().invalidate()
@@ -1,9 +1,20 @@
 from prompt_toolkit.widgets import Button, Dialog
-from prompt_toolkit.layout.containers import HSplit, Window, Float
+from prompt_toolkit.layout.containers import HSplit, Window, Float, ConditionalContainer
 from prompt_toolkit.application.current import get_app
+from prompt_toolkit.layout.controls import FormattedTextControl
 from prompt_toolkit.layout.margins import ScrollbarMargin
+from prompt_toolkit.filters import Condition
 
-def show_log_popup(floats, output_control, on_close):
+def progress_bar(phase, fraction, width=60):
+    filled = int(width * fraction)
+    return f"{phase}: [{'#' * filled}{'-' * (width - filled)}] {fraction * 100:5.1f}%"
+
+def show_log_popup(floats, output_control, on_close, progress=None, running=None, on_cancel=None):
+    """ Scrolling log of the running operation.
+
+    `progress` returns (phase, fraction) while a step reports progress, or None. While `running()` is true
+    the Close button calls `on_cancel` instead of closing the popup.
+    """
     output_window = Window(
         content=output_control,
         wrap_lines=True,
@@ -12,15 +23,28 @@ def show_log_popup(floats, output_control, on_close):
         always_hide_cursor=True
     )
 
+    has_progress = Condition(lambda: bool(progress and progress()))
+    progress_window = ConditionalContainer(
+        Window(content=FormattedTextControl(lambda: progress_bar(*progress()) if progress and progress() else ""), height=1),
+        filter=has_progress
+    )
+
+    def close():
+        if running and running():
+            on_cancel()
+            return
+        floats.clear()
+        on_close()
+
     dialog = Dialog(
         title="Operation Log",
-        body=HSplit([output_window]),
+        body=HSplit([output_window, progress_window]),
         buttons=[
-            Button(text="Close", handler=lambda: (floats.clear(), on_close()))
+            Button(text="Close", handler=close)
         ],
         width=120
     )
 
     floats.append(Float(content=dialog))
     get_app().layout.focus(dialog)
-    get_app().invalidate()
\ No newline at end of file
+    get_app().invalidate()
@@ -1,15 +1,17 @@
-from diskmanagement.sas import show_sas_all
-from diskmanagement.utils import parse_sas_controllers
+from diskmanagement.sas import get_sas_controllers
+from deepnexus.runner import CommandError
 from prompt_toolkit.widgets import Button, Dialog, Box, RadioList
 from prompt_toolkit.application.current import get_app
 from prompt_toolkit.layout.containers import HSplit, Float
 
 def show_sas_controller_popup(floats, selected_sas_container, on_close, dialog):
-    sas_output = show_sas_all(False)
-    controller_ids = parse_sas_controllers(sas_output)
+    try:
+        controllers = get_sas_controllers()
+    except CommandError:
+        controllers = {}
 
     entries = [('-1', "None")]
-    entries.extend([(cid, f"Controller {cid}") for cid in controller_ids])
+    entries.extend([(str(cid), f"Controller {cid} ({len(c.drives)} drives)") for cid, c in sorted(controllers.items())])
     
     radio = RadioList(entries)
     radio.current_value = '-1'
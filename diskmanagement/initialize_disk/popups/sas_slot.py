@@ -1,22 +1,26 @@
 from prompt_toolkit.application.current import get_app
-from diskmanagement.utils import parse_sas_slots, load_used_slots
+from diskmanagement.utils import load_used_slots
 from prompt_toolkit.widgets import Button, Dialog, Box, RadioList
 from prompt_toolkit.layout.containers import Float
-from diskmanagement.sas import show_sas_controller
+from diskmanagement.sas import get_sas_drives
+from deepnexus.runner import CommandError
 
 def show_sas_slot_popup(floats, controller, selected_value_container, on_close, dialog):
-    output = show_sas_controller(controller, False)
     entries = [("-1", "None")]
 
     used_slots = []
-    parsed_slots = []
+    drives = []
 
     if int(controller) != -1:
-        used_slots = load_used_slots()
-        parsed_slots = parse_sas_slots(output)
-
-    for slot, model, size in parsed_slots:
-        label = f"Slot {slot} ({model} {size})"
+        used_slots = load_used_slots(controller)
+        try:
+            drives = get_sas_drives(controller)
+        except CommandError:
+            drives = []
+
+    for drive in drives:
+        slot = str(drive.slot)
+        label = f"Slot {slot} ({drive.model} {drive.size})"
         if slot in used_slots:
             label += " (in use)"
         entries.append((slot, label))
@@ -0,0 +1,119 @@
+import os
+import json
+from deepnexus.cache import TTLCache
+from deepnexus.runner import get_runner
+from deepnexus.agent import agent_request
+from deepnexus.tracing import traced
+from deepnexus.utils import load_cached_config
+from deepnexus.vars import APP_CONFIG_PATH, BLOCK_INVENTORY_TTL, DEVICE_DISCOVERY, DEVICE_ROOT
+from diskmanagement.sysfs import discover_block_devices
+
+inventory_cache = TTLCache("block-inventory", default_ttl=BLOCK_INVENTORY_TTL)
+inventory_stale = [False]
+
+class BlockInventory(object):
+    """ Snapshot of every block device, from sysfs/udev (`from_sysfs`) or a single `lsblk -J -b -O` call.
+
+    Devices keep lsblk's field names, with `mountpoints` always a list and `size` always an int (bytes).
+    """
+
+    def __init__(self, devices):
+        # The tree as discovered, what the agent hands to sessions
+        self.tree = list(devices)
+        self.devices = []
+        self.by_name = {}
+        self.by_uuid = {}
+        self.by_mountpoint = {}
+        self.by_parent = {}
+        for device in self.tree:
+            self._index(device, None)
+
+    def _index(self, device, parent):
+        device = dict(device)
+        children = device.pop("children", [])
+        device["pkname"] = parent["name"] if parent else device.get("pkname")
+        device["size"] = _to_int(device.get("size"))
+        mountpoints = device.get("mountpoints")
+        if mountpoints is None:
+            mountpoints = [device.get("mountpoint")]
+        device["mountpoints"] = [m for m in mountpoints if m]
+
+        if parent is None:
+            self.devices.append(device)
+        # A disk appears once per holder (e.g. under several md arrays), the first occurrence wins
+        self.by_name.setdefault(device["name"], device)
+        if device.get("uuid"):
+            self.by_uuid.setdefault(device["uuid"], device)
+        for mountpoint in device["mountpoints"]:
+            self.by_mountpoint[mountpoint] = device
+        if parent is not None:
+            self.by_parent.setdefault(parent["name"], []).append(device)
+
+        for child in children:
+            self._index(child, device)
+
+    @classmethod
+    def from_lsblk(cls):
+        output = get_runner().run(['lsblk', '-J', '-b', '-O']).check().stdout
+        return cls(json.loads(output).get("blockdevices", []))
+
+    @classmethod
+    def from_sysfs(cls, root=DEVICE_ROOT):
+        return cls(discover_block_devices(root))
+
+    def get(self, name):
+        return self.by_name.get(_short_name(name))
+
+    def children(self, name):
+        return self.by_parent.get(_short_name(name), [])
+
+    def disks(self):
+        return [d for d in self.devices if d.get("type") == "disk"]
+
+    def mountpoints(self):
+        return set(self.by_mountpoint.keys())
+
+    def is_mounted(self, name):
+        device = self.get(name)
+        if device is None:
+            return False
+        return bool(device["mountpoints"]) or any(self.is_mounted(child["name"]) for child in self.children(name))
+
+    def size(self, name):
+        device = self.get(name)
+        return device["size"] if device else None
+
+    def uuid(self, name):
+        device = self.get(name)
+        return device.get("uuid") if device else None
+
+def _short_name(name):
+    return name[5:] if name.startswith("/dev/") else name
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+@traced("parse", "block inventory")
+def discover_inventory():
+    devices = agent_request({"get": "inventory", "fresh": inventory_stale[0]})
+    inventory_stale[0] = False
+    if devices is not None:
+        return BlockInventory(devices)
+    app_config = load_cached_config(APP_CONFIG_PATH)
+    method = app_config.get("device_discovery", DEVICE_DISCOVERY)
+    if method == "sysfs" and os.path.isdir(os.path.join(DEVICE_ROOT, "sys/class/block")):
+        return BlockInventory.from_sysfs()
+    return BlockInventory.from_lsblk()
+
+def get_block_inventory(refresh=False):
+    if refresh:
+        invalidate_block_inventory()
+    return inventory_cache.get("inventory", discover_inventory)
+
+def invalidate_block_inventory():
+    inventory_cache.invalidate()
+    # The agent's snapshot predates the change too, the next lookup asks it to discover again
+    inventory_stale[0] = True
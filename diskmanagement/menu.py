@@ -1,69 +1,82 @@
+import shlex
 from deepnexus.helpmenus import command_not_found
 from diskmanagement.helpmenu import disks_help, sas_submenu_help
-from deepnexus.vars import COLORS, DISKS_CONFIG_PATH
-from deepnexus.utils import load_config, get_prompt_text, clear_screen, status_message, Status, run_command
-from diskmanagement.disks import show_all_disks, locate_disk, show_disks_tree
-from diskmanagement.sas import show_sas_all, show_sas_disk, show_disk_smart, show_sas_controller
+from deepnexus.vars import COLORS
+from deepnexus.utils import get_prompt_text, clear_screen, status_message, Status, refresh_caches
+from diskmanagement.disks import show_all_disks, locate_command, show_disks_tree
+from diskmanagement.sas import show_sas_all, show_sas_disk, show_disk_smart, show_sas_controller, show_sas_slots
 from diskmanagement.fstab_manager import run_fstab_menu
 from diskmanagement.initialize_disk.initialize_disk import initialize_disk
+from diskmanagement.initialize_disk.batch import initialize_disks_batch
 from diskmanagement.diskmounter import mount_disk_module
+from diskmanagement.registry import get_disk_registry
+from diskmanagement.correlation import disk_slot
+from deepnexus.runner import get_runner
+from deepnexus.tracing import span, print_stats, trace_command
 
 def disks_menu(app_config):
-    disks_config = load_config(DISKS_CONFIG_PATH)
+    disks_config = get_disk_registry()
     print()
     print(f"{COLORS['purple']}DeepNexus{COLORS['reset']} Disk CLI Tool. Type 'help' for commands.")
     print()
     while True:
         try:
             cmd = input(get_prompt_text(app_config, ["disks"])).strip()
-            if cmd == "exit":
-                break
-            elif cmd == "mount disk":
-                mount_disk_module()
-            elif cmd == "initialize disk" or cmd == "init disk":
-                initialize_disk(disks_config, app_config)
-            elif cmd == "back" or cmd == "..":
-                break
-            elif cmd.startswith("lsblk"):
-                print()
-                print(run_command(cmd))
-            elif cmd == "fstab":
-                run_fstab_menu()
-            elif cmd == "sas":
-                if app_config["enable_sas"]:                    
-                    goback = sas_submenu(app_config, disks_config)
-                    if goback:
-                        break
+            # Only parsed again when disks.json changed, e.g. after a disk was initialized
+            disks_config = get_disk_registry()
+            if not cmd:
+                continue
+            with span(f"disks: {cmd}", "command"):
+                if cmd == "exit":
+                    break
+                elif cmd == "mount disk":
+                    mount_disk_module()
+                elif cmd == "initialize disk" or cmd == "init disk":
+                    initialize_disk(disks_config, app_config)
+                elif cmd == "initialize batch" or cmd == "init batch":
+                    initialize_disks_batch(disks_config, app_config)
+                elif cmd == "back" or cmd == "..":
+                    break
+                elif cmd.startswith("lsblk"):
+                    print()
+                    result = get_runner().run(shlex.split(cmd))
+                    print(result.stdout or result.stderr)
+                elif cmd == "fstab":
+                    run_fstab_menu()
+                elif cmd == "sas":
+                    if app_config["enable_sas"]:                    
+                        goback = sas_submenu(app_config, disks_config)
+                        if goback:
+                            break
+                        else:
+                            continue
                     else:
-                        continue
-                else:
-                    print(f"{status_message(Status.ERROR)} SAS Functionality Disabled!")
+                        print(f"{status_message(Status.ERROR)} SAS Functionality Disabled!")
+                        print()
+                elif cmd == "show all":
                     print()
-            elif cmd == "show all":
-                print()
-                show_all_disks(disks_config)
-            elif cmd == "show":
-                print()
-                if app_config["enable_sas"]:
-                    show_disks_tree(disks_config)
-                else:
                     show_all_disks(disks_config)
-            elif cmd.startswith("locate disk"):
-                parts = cmd.split()
-                if len(parts) == 2:
-                    locate_disk(disks_config)
-                elif len(parts) == 3:
-                    locate_disk(disks_config, parts[2])
+                elif cmd == "show":
+                    print()
+                    if app_config["enable_sas"]:
+                        show_disks_tree(disks_config)
+                    else:
+                        show_all_disks(disks_config)
+                elif cmd == "locate" or cmd.startswith("locate "):
+                    locate_command(disks_config, cmd)
+                elif cmd == "stats":
+                    print()
+                    print_stats()
+                elif cmd == "trace" or cmd.startswith("trace "):
+                    trace_command(cmd)
+                elif cmd == "refresh":
+                    refresh_caches()
+                elif cmd == "help":
+                    disks_help()
+                elif cmd == "clear":
+                    clear_screen()
                 else:
-                    print("Invalid syntax. Use 'locate disk' or 'locate disk sda'")
-            elif cmd == "help":
-                disks_help()
-            elif cmd == "clear":
-                clear_screen()
-            elif cmd == "":
-                continue
-            else:
-                command_not_found(cmd)
+                    command_not_found(cmd)
         except KeyboardInterrupt:
             print("Interrupted Detected! Exiting Disk Management Tool...")
             break
@@ -73,54 +86,61 @@ def sas_submenu(app_config, config):
     while True:
         try:
             cmd = input(get_prompt_text(app_config, ["disks", "sas"])).strip()
-            if cmd == "exit":
-                goback = True
-                break
-            elif cmd == "back" or cmd == "..":
-                break
-            elif cmd == "show all":
-                show_sas_all()
-            elif cmd.startswith("controller "):
-                arg = cmd[11:].strip().lower()
-                show_sas_controller(arg)
-            elif cmd.startswith("show disk "):
-                arg = cmd[10:].strip().lower()
-                disk = next((d for d in config if d.get("mnt") == f"/mnt/{arg}"), None)
-                if disk:
-                    card = disk.get("card")
-                    slot = disk.get("slt")
-                    if card is not None and slot is not None:
+            if not cmd:
+                continue
+            with span(f"sas: {cmd}", "command"):
+                if cmd == "exit":
+                    goback = True
+                    break
+                elif cmd == "back" or cmd == "..":
+                    break
+                elif cmd == "show all":
+                    show_sas_all()
+                elif cmd == "show slots" or cmd.startswith("show slots "):
+                    arg = cmd[10:].strip()
+                    print()
+                    if arg and not arg.isdigit():
+                        print("Invalid syntax. Use 'show slots' or 'show slots <controller id>'\n")
+                    else:
+                        show_sas_slots(arg if arg else None)
+                elif cmd.startswith("controller "):
+                    arg = cmd[11:].strip().lower()
+                    show_sas_controller(arg)
+                elif cmd.startswith("show disk "):
+                    arg = cmd[10:].strip().lower()
+                    disk = config.find(mnt=arg)
+                    if disk:
+                        card, slot = disk_slot(disk)
                         if card == -1 or slot == -1:
                             print(f"Disk {arg} found but missing card/slot info.\n")
                         else:
                             show_sas_disk(card, slot)
                     else:
-                        print(f"Disk {arg} found but missing card/slot info.\n")
-                else:
-                    print(f"No disk found with mount point {arg}.\n")
-            elif cmd.startswith("smart "):
-                arg = cmd[6:].strip().lower()
-                disk = next((d for d in config if d.get("mnt") == f"/mnt/{arg}"), None)
-                if disk:
-                    card = disk.get("card")
-                    slot = disk.get("slt")
-                    if card is not None and slot is not None:
+                        print(f"No disk found with mount point {arg}.\n")
+                elif cmd.startswith("smart "):
+                    arg = cmd[6:].strip().lower()
+                    disk = config.find(mnt=arg)
+                    if disk:
+                        card, slot = disk_slot(disk)
                         if card == -1 or slot == -1:
                             print(f"Disk {arg} found but missing card/slot info.\n")
                         else:
                             show_disk_smart(card, slot)
                     else:
-                        print(f"Disk {arg} found but missing card/slot info.\n")
+                        print(f"No disk found with mount point {arg}.\n")
+                elif cmd == "stats":
+                    print()
+                    print_stats()
+                elif cmd == "trace" or cmd.startswith("trace "):
+                    trace_command(cmd)
+                elif cmd == "refresh":
+                    refresh_caches()
+                elif cmd == "help":
+                    sas_submenu_help()
+                elif cmd == "clear":
+                    clear_screen()
                 else:
-                    print(f"No disk found with mount point {arg}.\n")
-            elif cmd == "help":
-                sas_submenu_help()
-            elif cmd == "clear":
-                clear_screen()
-            elif cmd == "":
-                continue
-            else:
-                command_not_found(cmd)
+                    command_not_found(cmd)
         except KeyboardInterrupt:
             print("Interrupted Detected! Exiting Disk Management Tool...")
             break
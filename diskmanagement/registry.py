@@ -0,0 +1,187 @@
+import json
+from deepnexus.cache import FileCache
+from deepnexus.utils import atomic_write, load_config
+from deepnexus.vars import DISKS_CONFIG_PATH
+
+registry_cache = FileCache("disk-registry")
+
+# field -> (types, default), fields with a None default are required
+DISK_SCHEMA = {
+    "label": (str, None),
+    "mnt": (str, None),
+    "uuid": (str, None),
+    "phy": (str, "Unknown"),
+    "card": (int, -1),
+    "slt": (int, -1),
+    "dev": (str, ""),
+    "serial": (str, ""),
+}
+
+class DiskRegistryError(ValueError):
+    pass
+
+def mount_name(mnt):
+    """disks.json stores the name inside /mnt/, accept either form."""
+    mnt = (mnt or "").strip()
+    return mnt[5:] if mnt.startswith("/mnt/") else mnt.strip("/")
+
+def device_name(dev):
+    dev = (dev or "").strip()
+    return dev[5:] if dev.startswith("/dev/") else dev
+
+def validate_disk(disk):
+    errors = []
+    if not isinstance(disk, dict):
+        return None, ["entry is not an object"]
+    normalized = dict(disk)
+    for field, (kind, default) in DISK_SCHEMA.items():
+        value = disk.get(field)
+        if value is None:
+            if default is None:
+                errors.append(f"missing '{field}'")
+            else:
+                normalized[field] = default
+        elif kind is int and isinstance(value, str) and value.lstrip("-").isdigit():
+            normalized[field] = int(value)
+        elif not isinstance(value, kind) or isinstance(value, bool):
+            errors.append(f"'{field}' must be {kind.__name__}")
+    normalized["mnt"] = mount_name(normalized.get("mnt"))
+    normalized["dev"] = device_name(normalized.get("dev"))
+    return normalized, errors
+
+class DiskRegistry(object):
+    """ disks.json with constant-time lookups by mount name, UUID, device, serial and (card, slot).
+
+    Every change is validated and persisted straight away with an atomic replace of the file.
+    Entries that fail validation are reported, left out of the indexes and written back untouched.
+    """
+
+    def __init__(self, disks=(), path=DISKS_CONFIG_PATH):
+        self.path = path
+        self.disks = []
+        self.invalid = []
+        self._reset_indexes()
+        for disk in disks:
+            normalized, errors = validate_disk(disk)
+            if errors:
+                print(f"Warning: invalid disk entry in {path} ({', '.join(errors)}). Skipping: {disk}")
+                self.invalid.append(disk)
+                continue
+            self._index(normalized)
+            self.disks.append(normalized)
+
+    @classmethod
+    def load(cls, path=DISKS_CONFIG_PATH):
+        disks = load_config(path)
+        return cls(disks if isinstance(disks, list) else [], path)
+
+    def _reset_indexes(self):
+        self.by_mount = {}
+        self.by_uuid = {}
+        self.by_dev = {}
+        self.by_serial = {}
+        self.by_slot = {}
+
+    def _keys(self, disk):
+        keys = [(self.by_mount, disk["mnt"])]
+        if disk["uuid"]:
+            keys.append((self.by_uuid, disk["uuid"]))
+        if disk["dev"]:
+            keys.append((self.by_dev, disk["dev"]))
+        if disk["serial"]:
+            keys.append((self.by_serial, disk["serial"]))
+        if disk["card"] != -1 and disk["slt"] != -1:
+            keys.append((self.by_slot, (disk["card"], disk["slt"])))
+        return keys
+
+    def _index(self, disk):
+        for index, key in self._keys(disk):
+            index.setdefault(key, disk)
+
+    def _unindex(self, disk):
+        for index, key in self._keys(disk):
+            if index.get(key) is disk:
+                del index[key]
+
+    def __len__(self):
+        return len(self.disks)
+
+    def __iter__(self):
+        return iter(self.disks)
+
+    def __getitem__(self, index):
+        return self.disks[index]
+
+    def __bool__(self):
+        return bool(self.disks)
+
+    def find(self, mnt=None, uuid=None, dev=None, serial=None, card=None, slot=None):
+        if mnt is not None:
+            return self.by_mount.get(mount_name(mnt))
+        if uuid is not None:
+            return self.by_uuid.get(uuid)
+        if dev is not None:
+            return self.by_dev.get(device_name(dev))
+        if serial is not None:
+            return self.by_serial.get(serial)
+        if card is not None and slot is not None:
+            return self.by_slot.get((int(card), int(slot)))
+        return None
+
+    def used_slots(self, card=None):
+        return {slot for (slot_card, slot) in self.by_slot if card is None or slot_card == int(card)}
+
+    def conflicts(self, disk, ignore=None):
+        conflicts = []
+        for index, key in self._keys(disk):
+            existing = index.get(key)
+            if existing is not None and existing is not ignore:
+                conflicts.append(f"{key} is already used by {existing['label']} ({existing['mnt']})")
+        return conflicts
+
+    def add(self, disk):
+        normalized, errors = validate_disk(disk)
+        errors = errors or self.conflicts(normalized)
+        if errors:
+            raise DiskRegistryError(", ".join(errors))
+        self._index(normalized)
+        self.disks.append(normalized)
+        self.save()
+        return normalized
+
+    def update(self, mnt, **changes):
+        disk = self.find(mnt=mnt)
+        if disk is None:
+            raise DiskRegistryError(f"no disk mounted at /mnt/{mount_name(mnt)}")
+        normalized, errors = validate_disk({**disk, **changes})
+        errors = errors or self.conflicts(normalized, ignore=disk)
+        if errors:
+            raise DiskRegistryError(", ".join(errors))
+        self._unindex(disk)
+        disk.clear()
+        disk.update(normalized)
+        self._index(disk)
+        self.save()
+        return disk
+
+    def remove(self, mnt):
+        disk = self.find(mnt=mnt)
+        if disk is None:
+            return None
+        self._unindex(disk)
+        self.disks = [d for d in self.disks if d is not disk]
+        self.save()
+        return disk
+
+    def to_json(self):
+        # Optional fields that were never set stay out of the file
+        disks = [{k: v for k, v in disk.items() if v != "" or DISK_SCHEMA.get(k, (None, None))[1] is None} for disk in self.disks]
+        return json.dumps(disks + self.invalid, indent=2) + "\n"
+
+    def save(self):
+        atomic_write(self.path, self.to_json())
+        registry_cache.put(self.path, self)
+
+def get_disk_registry(path=DISKS_CONFIG_PATH):
+    """The registry of `path`, rebuilt only when the file changes on disk."""
+    return registry_cache.get(path, lambda: DiskRegistry.load(path))
@@ -1,69 +1,241 @@
-import re
-from deepnexus.utils import run_command
-from deepnexus.vars import STORCLI
-import subprocess
+import time
+import atexit
+import threading
+from collections import defaultdict
+from tabulate import tabulate
+from deepnexus.runner import get_runner, CommandError
+from deepnexus.vars import STORCLI, STORCLI_CACHE_TTL, COMMAND_TIMEOUTS, AGENT_CLIENT_TIMEOUT
+from deepnexus.agent import agent_request, AgentError
+from deepnexus.utils import status_message, Status
+from deepnexus.cache import TTLCache
+from deepnexus.tracing import span, traced
+from diskmanagement.storcli import build_controllers, build_controller_temperatures, build_drive_identities, parse_storcli_output
 
 # Commands supported by storcli64
 # https://techdocs.broadcom.com/us/en/storage-and-ethernet-connectivity/enterprise-storage-solutions/storcli-12gbs-megaraid-tri-mode/1-0/v11869215/v11673749/v11675603/v11675913.html
 
+storcli_cache = TTLCache("storcli", default_ttl=STORCLI_CACHE_TTL["show"])
+
+# (card, slot) -> monotonic time its locate LED goes off, one background timer switches off whatever expired
+located = {}
+locate_timer = [None]
+locate_lock = threading.Lock()
+
+def storcli_ttl(args):
+    parts = args.split()
+    if len(parts) < 2 or parts[1] != "show":
+        return None
+    if parts[-1] == "J":
+        parts = parts[:-1]
+    return STORCLI_CACHE_TTL.get(" ".join(parts[1:]), STORCLI_CACHE_TTL["show"])
+
+def run_storcli(args, timeout=None):
+    # With an agent running every session goes through its storcli, so sessions never run storcli at the same time
+    try:
+        output = agent_request({"get": "storcli", "args": args, "timeout": timeout}, timeout=(timeout or COMMAND_TIMEOUTS["storcli64"]) + AGENT_CLIENT_TIMEOUT)
+    except AgentError as e:
+        raise CommandError(str(e))
+    if output is not None:
+        return output
+    result = get_runner().run([STORCLI] + args.split(), timeout)
+    if storcli_ttl(args) is None:
+        # Other commands report failures in their output with a non-zero status, only a timeout is an error
+        if result.timed_out:
+            result.check()
+        return result.stdout
+    # A failed show (busy controller, empty slot) must never be cached as if the controller had nothing to show
+    result.check(allow_status=True)
+    if result.returncode != 0:
+        descriptions = [str(status.get("Description", "")) for _, status, _ in parse_storcli_output(result.stdout)]
+        detail = "; ".join(d for d in descriptions if d) or ((result.stderr or result.stdout).strip().splitlines() or [""])[-1]
+        raise CommandError(f"'{result.command}' failed with exit status {result.returncode}" + (f": {detail}" if detail else ""))
+    return result.stdout
+
+def storcli(args, timeout=None, parser=None):
+    ttl = storcli_ttl(args)
+    if ttl is None:
+        # Anything other than a show changes controller state, cached answers are no longer valid
+        output = run_storcli(args, timeout)
+        invalidate_storcli_cache()
+        return output
+    if parser is None:
+        return storcli_cache.get(args, lambda: run_storcli(args, timeout), ttl)
+    # Parsed results are cached next to the raw text so each dump is only parsed once per TTL
+    return storcli_cache.get((args, parser.__name__), lambda: parse_storcli(parser, storcli(args, timeout)), ttl)
+
+def parse_storcli(parser, output):
+    with span(parser.__name__, "parse"):
+        return parser(output)
+
+def invalidate_storcli_cache():
+    storcli_cache.invalidate()
+
+def get_sas_controllers(timeout=None):
+    return storcli("/call/sall show J", timeout=timeout, parser=build_controllers)
+
+def get_sas_drives(controller=None):
+    controllers = get_sas_controllers()
+    if controller is None:
+        return [drive for c in controllers.values() for drive in c.drives]
+    selected = controllers.get(int(controller))
+    return selected.drives if selected else []
+
+def get_sas_drive_identities(timeout=None):
+    # One `show all` per controller covers every slot, never one storcli call per drive
+    identities = []
+    for controller_id in get_sas_controllers(timeout):
+        identities += storcli(f"/c{controller_id}/sall show all J", timeout=timeout, parser=build_drive_identities)
+    return identities
+
+def print_storcli(args):
+    try:
+        output = storcli(args)
+    except CommandError as e:
+        print(f"{status_message(Status.ERROR)} {e}")
+        print()
+        return None
+    print(output)
+    return output
+
+@traced("render")
+def show_sas_slots(controller=None):
+    try:
+        drives = get_sas_drives(controller)
+    except CommandError as e:
+        print(f"{status_message(Status.ERROR)} {e}")
+        print()
+        return
+    if not drives:
+        print("No SAS drives found")
+        print()
+        return
+    data = [[d.controller, d.enclosure if d.enclosure is not None else "-", d.slot, d.state, d.size, d.interface, d.media, d.model] for d in drives]
+    print(tabulate(data, headers=["Controller", "Enclosure", "Slot", "State", "Size", "Interface", "Media", "Model"]))
+    print()
+
 def show_sas_all(print_output = True):
-    output = run_command(f"{STORCLI} /call/sall show")
     if print_output:
-        print(output)
-    return output
+        return print_storcli("/call/sall show")
+    return storcli("/call/sall show")
 
 def show_sas_controller(controller, print_output = True):
-    output = run_command(f"{STORCLI} /c{controller}/sall show")
     if print_output:
-        print(output)
-    return output
+        return print_storcli(f"/c{controller}/sall show")
+    return storcli(f"/c{controller}/sall show")
 
 def show_sas_disk(card, slot):
-    output = run_command(f"{STORCLI} /c{card}/s{slot} show")
-    print(output)
+    print_storcli(f"/c{card}/s{slot} show")
 
 def show_disk_smart(card, slot):
-    output = run_command(f"{STORCLI} /c{card}/s{slot} show smart")
-    print(output)
+    print_storcli(f"/c{card}/s{slot} show smart")
 
-def start_locate_drive(card, slot):
-    output = run_command(f"{STORCLI} /c{card}/s{slot} start locate")
-    print(output)
+def controller_slots():
+    return {cid: {d.slot for d in c.drives} for cid, c in get_sas_controllers().items()}
 
-def end_locate_drive(card, slot):
-    output = run_command(f"{STORCLI} /c{card}/s{slot} stop locate")
-    print(output)
+def expand_slots(slots, controllers):
+    """(card, slot) pairs of `slots`, where a slot of None stands for every drive of the card."""
+    expanded = set()
+    for card, slot in slots:
+        if slot is None:
+            expanded |= {(card, card_slot) for card_slot in controllers.get(card, ())}
+        else:
+            expanded.add((card, slot))
+    return expanded
+
+def locate_paths(slots, controllers=None):
+    """Fewest storcli paths covering `slots`, (card, slot) pairs where a slot of None stands for the whole card."""
+    controllers = controller_slots() if controllers is None else controllers
+    wanted = defaultdict(set)
+    for card, slot in expand_slots(slots, controllers):
+        wanted[card].add(slot)
+    # Every slot of a card is one /cN/sall call, every slot of every card a single /call/sall
+    whole = {card for card, card_slots in wanted.items() if controllers.get(card) and card_slots >= controllers[card]}
+    if controllers and whole >= set(controllers):
+        return ["/call/sall"]
+    paths = [f"/c{card}/sall" for card in sorted(whole)]
+    for card in sorted(set(wanted) - whole):
+        paths += [f"/c{card}/s{slot}" for slot in sorted(wanted[card])]
+    return paths
+
+def switch_locate(paths, action):
+    """Runs `start` or `stop locate` on every path and returns what failed."""
+    failures = []
+    for path in paths:
+        try:
+            output = storcli(f"{path} {action} locate J")
+        except CommandError as e:
+            failures.append(f"{path}: {e}")
+            continue
+        controllers = parse_storcli_output(output)
+        if not controllers:
+            failures.append(f"{path}: {output.strip() or 'no answer from storcli'}")
+        failures += [f"{path}: {status.get('Description') or status.get('Status')}" for _, status, _ in controllers if status.get("Status") != "Success"]
+    return failures
+
+def start_locate(slots, duration):
+    """Switches on the LEDs of `slots` for `duration` seconds, returns the storcli paths used and what failed."""
+    controllers = controller_slots()
+    slots = expand_slots(slots, controllers)
+    paths = locate_paths(slots, controllers)
+    failures = switch_locate(paths, "start")
+    deadline = time.monotonic() + duration
+    with locate_lock:
+        # A slot asked for again keeps blinking until the later of its deadlines
+        for slot in slots:
+            located[slot] = max(located.get(slot, 0), deadline)
+        schedule_locate_stop()
+    return paths, failures
+
+def release_locates(select):
+    with locate_lock:
+        slots = [slot for slot, deadline in located.items() if select(deadline)]
+        for slot in slots:
+            del located[slot]
+        schedule_locate_stop()
+    return slots
+
+def stop_locate(slots):
+    if not slots:
+        return []
+    try:
+        controllers = controller_slots()
+    except CommandError:
+        # Without the slot list nothing can be grouped, every slot gets its own call
+        controllers = {}
+    return switch_locate(locate_paths(slots, controllers), "stop")
+
+def schedule_locate_stop():
+    # Called with locate_lock held
+    if locate_timer[0] is not None:
+        locate_timer[0].cancel()
+        locate_timer[0] = None
+    if located:
+        timer = threading.Timer(max(0, min(located.values()) - time.monotonic()), stop_expired_locates)
+        timer.daemon = True
+        timer.start()
+        locate_timer[0] = timer
+
+def stop_expired_locates():
+    now = time.monotonic()
+    for failure in stop_locate(release_locates(lambda deadline: deadline <= now)):
+        # Runs in the background, start on a fresh line so the prompt stays readable
+        print(f"\nCould not stop locating {failure}")
+
+def stop_tracked_locates():
+    # Nothing should keep blinking after the tool exits
+    stop_locate(release_locates(lambda deadline: True))
+
+atexit.register(stop_tracked_locates)
+
+def stop_all_locates():
+    """Switches off every locate LED, including ones left on by another session, with a single call."""
+    release_locates(lambda deadline: True)
+    return switch_locate(["/call/sall"], "stop")
 
-def get_storcli_temperatures():
+def get_storcli_temperatures(timeout=None):
     try:
-        result = subprocess.run(
-            [STORCLI, "/call", "show", "temperature"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
-
-        output = result.stdout
-        temperatures = {}
-
-        controller_blocks = output.split("Controller = ")
-        for block in controller_blocks[1:]:
-            lines = block.strip().splitlines()
-            controller_id = lines[0].strip()
-            for line in lines:
-                match = re.search(r'ROC temperature\(Degree Celsius\)\s+(\d+)', line)
-                if match:
-                    temp = int(match.group(1))
-                    temperatures[f"Controller {controller_id}"] = temp
-                    break
-
-        return temperatures
-
-    except subprocess.CalledProcessError as e:
-        print(f"Command failed: {e}")
-        print(e.stderr)
-        return {}
+        temperatures = storcli("/call show temperature J", timeout=timeout, parser=build_controller_temperatures)
+        return {f"Controller {cid}": temp for cid, temp in temperatures.items() if temp is not None}
     except Exception as e:
         print(f"Error: {e}")
         return {}
\ No newline at end of file
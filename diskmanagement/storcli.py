@@ -0,0 +1,155 @@
+import re
+import json
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Parsing of storcli64 JSON output (commands suffixed with `J`) into typed objects.
+# Nothing here runs storcli, see diskmanagement/sas.py for the cached command layer.
+
+SIZE_UNITS = {
+    "B": 1,
+    "KB": 1024,
+    "MB": 1024 ** 2,
+    "GB": 1024 ** 3,
+    "TB": 1024 ** 4,
+    "PB": 1024 ** 5,
+}
+
+# Detail sections of `show all`, drives behind an expander carry the enclosure (/c0/e252/s3)
+DRIVE_DETAILS = re.compile(r'^Drive /c(\d+)(?:/e(\d+))?/s(\d+) - Detailed Information$')
+
+@dataclass
+class StorcliDrive:
+    controller: int
+    enclosure: Optional[int]
+    slot: int
+    device_id: Optional[int]
+    state: str
+    size: str
+    size_bytes: Optional[int]
+    interface: str
+    media: str
+    model: str
+
+@dataclass
+class StorcliDriveIdentity:
+    controller: int
+    enclosure: Optional[int]
+    slot: int
+    serial: str
+    wwn: str
+    model: str
+
+@dataclass
+class StorcliEnclosure:
+    controller: int
+    id: Optional[int]
+    drives: list = field(default_factory=list)
+
+@dataclass
+class StorcliController:
+    id: int
+    status: str
+    description: str = ""
+    enclosures: dict = field(default_factory=dict)
+
+    @property
+    def drives(self):
+        drives = [drive for enclosure in self.enclosures.values() for drive in enclosure.drives]
+        return sorted(drives, key=lambda d: (d.enclosure if d.enclosure is not None else -1, d.slot))
+
+    def drive(self, slot):
+        return next((d for d in self.drives if d.slot == int(slot)), None)
+
+def parse_size(text):
+    match = re.match(r'^\s*([\d.]+)\s*([KMGTP]?)i?B\s*$', str(text), re.IGNORECASE)
+    if not match:
+        return None
+    value, unit = match.groups()
+    return int(float(value) * SIZE_UNITS[f"{unit.upper()}B"])
+
+def parse_storcli_output(output):
+    """Splits a storcli JSON document into `(controller id, command status, response data)` tuples."""
+    try:
+        document = json.loads(output)
+    except (TypeError, ValueError):
+        return []
+
+    controllers = []
+    for entry in document.get("Controllers", []):
+        status = entry.get("Command Status", {})
+        controller_id = status.get("Controller")
+        if controller_id is None:
+            continue
+        controllers.append((int(controller_id), status, entry.get("Response Data", {})))
+    return controllers
+
+def _optional_int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+def parse_drive(controller_id, raw):
+    enclosure, _, slot = str(raw.get("EID:Slt", "")).partition(":")
+    return StorcliDrive(
+        controller=controller_id,
+        enclosure=_optional_int(enclosure),
+        slot=int(slot),
+        device_id=_optional_int(raw.get("DID", "")),
+        state=raw.get("State", ""),
+        size=raw.get("Size", ""),
+        size_bytes=parse_size(raw.get("Size", "")),
+        interface=raw.get("Intf", ""),
+        media=raw.get("Med", ""),
+        model=str(raw.get("Model", "")).strip()
+    )
+
+def build_controllers(output):
+    controllers = {}
+    for controller_id, status, data in parse_storcli_output(output):
+        controller = StorcliController(
+            id=controller_id,
+            status=status.get("Status", ""),
+            description=status.get("Description", "")
+        )
+        # Slot listings use "Drive Information", controller summaries use "PD LIST"
+        for raw in data.get("Drive Information", data.get("PD LIST", [])):
+            if ":" not in str(raw.get("EID:Slt", "")):
+                continue
+            drive = parse_drive(controller_id, raw)
+            enclosure = controller.enclosures.setdefault(drive.enclosure, StorcliEnclosure(controller_id, drive.enclosure))
+            enclosure.drives.append(drive)
+        controllers[controller_id] = controller
+    return controllers
+
+def build_controller_temperatures(output):
+    temperatures = {}
+    for controller_id, _, data in parse_storcli_output(output):
+        properties = data.get("Controller Properties", [])
+        if isinstance(properties, dict):
+            properties = [{"Ctrl_Prop": key, "Value": value} for key, value in properties.items()]
+        for prop in properties:
+            if str(prop.get("Ctrl_Prop", "")).startswith("ROC temperature"):
+                temperatures[controller_id] = _optional_int(prop.get("Value"))
+                break
+    return temperatures
+
+def build_drive_identities(output):
+    """Serial number and WWN of every drive in a `/cN/sall show all J` dump."""
+    identities = []
+    for controller_id, _, data in parse_storcli_output(output):
+        for key, details in data.items():
+            match = DRIVE_DETAILS.match(key)
+            if not match or not isinstance(details, dict):
+                continue
+            attributes = next((v for k, v in details.items() if k.endswith("Device attributes")), {})
+            identities.append(StorcliDriveIdentity(
+                controller=controller_id,
+                enclosure=_optional_int(match.group(2) or ""),
+                slot=int(match.group(3)),
+                serial=str(attributes.get("SN", "")).strip(),
+                wwn=str(attributes.get("WWN", "")).strip(),
+                model=str(attributes.get("Model Number", "")).strip()
+            ))
+    return identities
@@ -0,0 +1,180 @@
+import os
+import re
+
+# Block device discovery straight from the kernel and udev, without starting lsblk or blkid.
+# Every path is resolved below `root` so a fake tree can stand in for /sys, /proc, /dev and /run.
+
+SECTOR_SIZE = 512
+DISK_ID_LINKS = {
+    "by-uuid": "uuid",
+    "by-label": "label",
+    "by-partuuid": "partuuid",
+}
+# Octal (mountinfo) and hex (udev) escapes of single bytes
+ESCAPE = re.compile(rb'\\([0-7]{3})|\\x([0-9a-fA-F]{2})')
+
+def _path(root, *parts):
+    return os.path.join(root, *[p.lstrip("/") for p in parts])
+
+def _read(path, default=None):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def _unescape(value):
+    # mountinfo escapes spaces and friends as octal (\040), udev links as hex (\x20), both escape single bytes
+    # of the UTF-8 name, so they are replaced on the raw bytes and only then decoded
+    if "\\" not in value:
+        return value
+    raw = ESCAPE.sub(lambda m: bytes([int(m.group(1), 8) if m.group(1) else int(m.group(2), 16)]), os.fsencode(value))
+    return os.fsdecode(raw)
+
+def read_mountinfo(root="/"):
+    mounts = {}
+    try:
+        with open(_path(root, "proc/self/mountinfo")) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 10 or "-" not in fields:
+                    continue
+                separator = fields.index("-")
+                entry = mounts.setdefault(fields[2], {"mountpoints": [], "fstype": None})
+                entry["mountpoints"].append(_unescape(fields[4]))
+                entry["fstype"] = fields[separator + 1]
+    except OSError:
+        pass
+    return mounts
+
+def read_disk_links(root="/"):
+    links = {}
+    for directory, field in DISK_ID_LINKS.items():
+        path = _path(root, "dev/disk", directory)
+        try:
+            names = os.listdir(path)
+        except OSError:
+            continue
+        for name in names:
+            try:
+                target = os.path.basename(os.readlink(os.path.join(path, name)))
+            except OSError:
+                continue
+            links.setdefault(target, {})[field] = _unescape(name)
+
+    for target, names in read_disk_ids(root).items():
+        ids = links.setdefault(target, {})
+        ids["ids"] = names
+        wwn = next((name[4:] for name in names if name.startswith("wwn-") and "-part" not in name), None)
+        if wwn:
+            ids.setdefault("wwn", wwn)
+    return links
+
+def read_disk_ids(root="/"):
+    """Every /dev/disk/by-id name, grouped by the device it points at, in one directory scan."""
+    ids = {}
+    path = _path(root, "dev/disk/by-id")
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return ids
+    for name in names:
+        try:
+            target = os.path.basename(os.readlink(os.path.join(path, name)))
+        except OSError:
+            continue
+        ids.setdefault(target, []).append(name)
+    return ids
+
+def read_udev_properties(root, dev_number):
+    properties = {}
+    try:
+        with open(_path(root, "run/udev/data", f"b{dev_number}")) as f:
+            for line in f:
+                if line.startswith("E:") and "=" in line:
+                    key, _, value = line[2:].rstrip("\n").partition("=")
+                    properties[key] = value
+    except OSError:
+        pass
+    return properties
+
+def device_type(name, is_partition):
+    if is_partition:
+        return "part"
+    for prefix, kind in (("loop", "loop"), ("dm-", "dm"), ("md", "md"), ("sr", "rom"), ("zram", "disk")):
+        if name.startswith(prefix):
+            return kind
+    return "disk"
+
+def _build_device(root, name, class_path, mounts, links):
+    dev_number = _read(os.path.join(class_path, "dev"), "")
+    is_partition = os.path.exists(os.path.join(class_path, "partition"))
+    sectors = _read(os.path.join(class_path, "size"))
+    udev = read_udev_properties(root, dev_number) if dev_number else {}
+    link = links.get(name, {})
+    mount = mounts.get(dev_number, {"mountpoints": [], "fstype": None})
+
+    # Queue and removable attributes live on the whole disk, partitions sit one directory below it
+    sysfs_device = os.path.dirname(os.path.realpath(class_path)) if is_partition else class_path
+    return {
+        "name": name,
+        "kname": name,
+        "path": f"/dev/{name}",
+        "maj:min": dev_number,
+        "type": device_type(name, is_partition),
+        "size": int(sectors) * SECTOR_SIZE if sectors and sectors.isdigit() else None,
+        "ro": _read(os.path.join(class_path, "ro")) == "1",
+        "rm": _read(os.path.join(sysfs_device, "removable")) == "1",
+        "rota": _read(os.path.join(sysfs_device, "queue/rotational")) == "1",
+        "model": _read(os.path.join(class_path, "device/model"), udev.get("ID_MODEL")),
+        "serial": udev.get("ID_SERIAL_SHORT") or _read(os.path.join(class_path, "device/serial")),
+        "wwn": udev.get("ID_WWN_WITH_EXTENSION") or udev.get("ID_WWN") or link.get("wwn"),
+        "uuid": link.get("uuid") or udev.get("ID_FS_UUID"),
+        "label": link.get("label") or udev.get("ID_FS_LABEL"),
+        "partuuid": link.get("partuuid") or udev.get("ID_PART_ENTRY_UUID"),
+        "fstype": mount["fstype"] or udev.get("ID_FS_TYPE"),
+        "mountpoints": list(mount["mountpoints"]),
+        "ids": link.get("ids", []),
+        "children": [],
+    }
+
+def discover_block_devices(root="/"):
+    """Returns the block device tree in the same shape as `lsblk -J -b -O` (`blockdevices`)."""
+    class_dir = _path(root, "sys/class/block")
+    try:
+        names = sorted(os.listdir(class_dir))
+    except OSError:
+        return []
+
+    mounts = read_mountinfo(root)
+    links = read_disk_links(root)
+
+    devices = {}
+    for name in names:
+        devices[name] = _build_device(root, name, os.path.join(class_dir, name), mounts, links)
+
+    top_level = []
+    for name in names:
+        device = devices[name]
+        class_path = os.path.join(class_dir, name)
+        if device["type"] == "part":
+            # /sys/class/block/sda1 links into .../block/sda/sda1, the parent directory names the disk
+            parent = os.path.basename(os.path.dirname(os.path.realpath(class_path)))
+            if parent in devices:
+                devices[parent]["children"].append(device)
+                continue
+        else:
+            slaves = [s for s in _listdir(os.path.join(class_path, "slaves")) if s in devices]
+            if slaves:
+                # Device mapper and md devices hang below every device they are built on
+                for slave in slaves:
+                    devices[slave]["children"].append(device)
+                continue
+        top_level.append(device)
+    return top_level
+
+def _listdir(path):
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
@@ -1,79 +1,68 @@
-import re
-import subprocess
-import json
 import os
-from deepnexus.utils import load_config, run_command
-from deepnexus.vars import DISKS_CONFIG_PATH
+from deepnexus.utils import format_size
+from deepnexus.runner import get_runner
+from diskmanagement.inventory import get_block_inventory
+from diskmanagement.registry import get_disk_registry
+from diskmanagement.formatting import parse_mkfs_progress
 from prompt_toolkit.formatted_text import FormattedText
 from prompt_toolkit.application.current import get_app
 
-def parse_sas_slots(output: str):
-    slot_pattern = re.compile(
-        r'(?P<eid_col>:)?(?P<slot>\d+)\s+'
-        r'\d+\s+\S+\s+-\s+(?P<size>\d+\.\d+ TB)\s+\S+\s+\S+\s+\S+\s+\S+\s+\S+\s+(?P<model>\S+)'
-    )
-    return [(slot, model, size) for _, slot, size, model in slot_pattern.findall(output)]
+def load_used_slots(card=None):
+    return {str(slot) for slot in get_disk_registry().used_slots(card)}
 
-def load_used_slots():
-    config = load_config(DISKS_CONFIG_PATH)
-    return {str(d.get("slt")) for d in config if "slt" in d}
-
-def parse_sas_controllers(sas_output: str):
-    controllers = re.findall(r'^Controller\s+=\s+(\d+)', sas_output, re.MULTILINE)
-    return list(set(controllers))
+def is_sd_disk(name):
+    return name.startswith('sd') and len(name) == 3
 
 def list_unmounted_disks():
-    output = subprocess.check_output(['lsblk', '-J', '-o', 'NAME,MOUNTPOINT']).decode()
-    data = json.loads(output)
-
-    unmounted_disks = []
-
-    for device in data['blockdevices']:
-        if device['name'].startswith('sd') and len(device['name']) == 3:
-            has_mounted_partition = False
-
-            if 'children' in device:
-                for child in device['children']:
-                    if child.get('mountpoint'):
-                        has_mounted_partition = True
-                        break
-
-            if not has_mounted_partition:
-                unmounted_disks.append(f"/dev/{device['name']}")
-
-    return unmounted_disks
+    inventory = get_block_inventory()
+    return [f"/dev/{d['name']}" for d in inventory.disks()
+            if is_sd_disk(d['name']) and not any(c['mountpoints'] for c in inventory.children(d['name']))]
 
 def list_unmounted_partitions():
-    output = subprocess.check_output(['lsblk', '-J', '-o', 'NAME,MOUNTPOINT']).decode()
-    data = json.loads(output)
-
-    unmounted_partitions = []
-
-    for device in data['blockdevices']:
-        if device['name'].startswith('sd') and len(device['name']) == 3:
-            if 'children' in device:
-                for child in device['children']:
-                    if not child.get('mountpoint'):
-                        unmounted_partitions.append(f"/dev/{child['name']}")
-
-    return unmounted_partitions
+    inventory = get_block_inventory()
+    return [f"/dev/{c['name']}" for d in inventory.disks() if is_sd_disk(d['name'])
+            for c in inventory.children(d['name']) if not c['mountpoints']]
 
 def get_disk_size(device):
-    output = subprocess.check_output(['lsblk', '-dn', '-o', 'SIZE', device])
-    return output.decode().strip()
+    size = get_block_inventory().size(device)
+    return format_size(size) if size is not None else "unknown"
 
 def list_available_mounts():
     if not os.path.exists('/mnt'):
         os.makedirs('/mnt')
 
-    mounted = subprocess.check_output(['lsblk', '-nr', '-o', 'MOUNTPOINT']).decode().splitlines()
-    mounted = set(filter(None, mounted))
+    mounted = get_block_inventory().mountpoints()
 
     return [d for d in os.listdir('/mnt')
         if os.path.isdir(f"/mnt/{d}") and f"/mnt/{d}" not in mounted]
 
 def get_partition_uuid(partition):
-    return run_command(f"blkid -s UUID -o value {partition}")
+    """UUID of a partition that already has its file system, from the inventory (udev) or blkid when udev has none."""
+    uuid = get_block_inventory().uuid(partition)
+    return uuid or read_partition_uuid(partition)
+
+def read_partition_uuid(partition):
+    """UUID straight from the file system superblock, "" when there is none.
+
+    Right after partitioning and mkfs udev can still map the partition to the previous file system's UUID,
+    so a freshly formatted partition is never looked up in the inventory.
+    """
+    # Lets udev finish with the new partition table before anything reads the rediscovered inventory
+    get_runner().run(["udevadm", "settle"], coalesce=False)
+    result = get_runner().run(["blkid", "-p", "-s", "UUID", "-o", "value", partition], coalesce=False)
+    return result.stdout.strip() if result.ok else ""
+
+async def run_step(argv, log, progress=None):
+    """Streams the output of one step into `log`, mke2fs style progress goes to `progress(phase, fraction)`."""
+    def on_partial(line):
+        parsed = parse_mkfs_progress(line)
+        if parsed and progress:
+            progress(*parsed)
+
+    result = await get_runner().stream(argv, lambda line: line and log(f"fg:#ffffff", line), on_partial)
+    if progress:
+        progress(None, None)
+    result.check()
 
 def log_message(output_lines, output_control, style, message):
         output_lines.append((style, message + '\n'))
@@ -0,0 +1,13 @@
+import os
+import sys
+import pytest
+
+# The tool runs from its checkout without being installed, the tests import it the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepnexus.runner import CommandRunner, FixtureBackend, set_runner
+
+@pytest.fixture(autouse=True)
+def no_external_tools():
+    # Commands a test doesn't give fixtures for fail with 127 instead of touching the machine's hardware
+    set_runner(CommandRunner(FixtureBackend({})))
@@ -0,0 +1,81 @@
+import os
+import socket
+import threading
+import pytest
+from deepnexus import agent
+from deepnexus.agent import AgentServer, AgentState, AgentError, agent_request, peer_allowed, PEER_CREDENTIALS
+
+class Peer(object):
+    """ Connection reporting the given credentials for SO_PEERCRED. """
+
+    def __init__(self, uid, gid):
+        self.credentials = PEER_CREDENTIALS.pack(1234, uid, gid)
+
+    def getsockopt(self, level, option, size):
+        assert (level, option, size) == (socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size)
+        return self.credentials
+
+@pytest.fixture
+def agent_user(monkeypatch):
+    monkeypatch.setattr(agent.os, "geteuid", lambda: 900)
+    monkeypatch.setattr(agent.pwd, "getpwuid", lambda uid: type("pw", (), {"pw_name": f"user{uid}"}))
+    monkeypatch.setattr(agent.os, "getgrouplist", lambda name, gid: [gid, 50] if name == "user1001" else [gid])
+
+def test_peers_allowed_by_uid_and_group(agent_user):
+    assert peer_allowed(Peer(0, 0), 50)
+    assert peer_allowed(Peer(900, 900), 50)
+    assert peer_allowed(Peer(1000, 50), 50)
+    # Supplementary group membership counts as well
+    assert peer_allowed(Peer(1001, 1001), 50)
+    assert not peer_allowed(Peer(65534, 65534), 50)
+
+def test_unknown_peer_user_is_refused(agent_user, monkeypatch):
+    def missing(uid):
+        raise KeyError(uid)
+    monkeypatch.setattr(agent.pwd, "getpwuid", missing)
+    assert not peer_allowed(Peer(1234, 1234), 50)
+
+def test_real_peer_credentials_are_our_own():
+    left, right = socket.socketpair()
+    with left, right:
+        assert peer_allowed(left, os.getegid())
+
+def test_allowed_storcli():
+    pytest.importorskip("tabulate")
+    from deepnexus.agent import allowed_storcli
+    assert allowed_storcli("/call/sall show J")
+    assert allowed_storcli("/c0/e252/s3 show all J")
+    assert allowed_storcli("/c0/s3 start locate J") and allowed_storcli("/call/sall stop locate J")
+    assert not allowed_storcli("/c0/v0 del force")
+    assert not allowed_storcli("/c0/s3 set jbod")
+    assert not allowed_storcli("/c0 show events file=/etc/passwd")
+    assert not allowed_storcli("/c0/s3 start locate J; reboot")
+
+@pytest.fixture
+def running_agent(tmp_path, monkeypatch):
+    def serve(group_id):
+        path = str(tmp_path / "agent.sock")
+        state = AgentState({"temps": lambda: {"CPU": {"Core 0": 49.0}}}, {})
+        server = AgentServer(path, state, group_id)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return path
+    servers = []
+    monkeypatch.delenv("DEEPNEXUS_NO_AGENT", raising=False)
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_agent_answers_allowed_peers(running_agent):
+    path = running_agent(os.getegid())
+    assert agent_request({"get": "temps"}, path=path) == {"CPU": {"Core 0": 49.0}}
+    with pytest.raises(AgentError, match="unknown request"):
+        agent_request({"get": "nothing"}, path=path)
+    assert agent_request({"get": "temps"}, path=path + ".missing") is None
+
+def test_agent_refuses_other_peers(running_agent, monkeypatch):
+    path = running_agent(os.getegid())
+    monkeypatch.setattr(agent, "peer_allowed", lambda connection, group_id: False)
+    with pytest.raises(AgentError, match="permission denied"):
+        agent_request({"get": "temps"}, path=path)
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("tabulate")
+
+from diskmanagement.initialize_disk.batch import build_batch_jobs, taken_mount_names
+from diskmanagement.fstab import FstabDocument
+from diskmanagement.registry import DiskRegistry
+
+OPTIONS = {"mount": True, "fstab": True, "config": False, "profile": "archive"}
+FSTAB = "UUID=root-uuid / ext4 defaults 0 1\nUUID=b-uuid /mnt/hdd-02 ext4 defaults 0 2\n# UUID=old-uuid /mnt/hdd-09 ext4 defaults 0 2\n"
+
+def taken(tmp_path):
+    registry = DiskRegistry([{"label": "Old", "mnt": "hdd-03", "uuid": "c-uuid"}], str(tmp_path / "disks.json"))
+    return taken_mount_names(registry, {"/", "/mnt/hdd-01", "/home"}, FstabDocument(FSTAB, "/etc/fstab"))
+
+def test_taken_mount_names(tmp_path):
+    assert taken(tmp_path) == {
+        "hdd-01": "is already mounted",
+        "hdd-02": "is already in /etc/fstab",
+        "hdd-03": f"is already in {tmp_path / 'disks.json'}",
+    }
+
+def test_names_in_use_are_refused_even_without_saving_to_disks_json(tmp_path):
+    disks = ["/dev/sdb", "/dev/sdc", "/dev/sdd", "/dev/sde"]
+    jobs, errors = build_batch_jobs(disks, "HDD {n}", "hdd-{n:02}", "R1-{n}", 1, OPTIONS, taken(tmp_path))
+    assert [job["mnt"] for job in jobs] == ["hdd-01", "hdd-02", "hdd-03", "hdd-04"]
+    assert errors == [
+        "/dev/sdb: /mnt/hdd-01 is already mounted",
+        "/dev/sdc: /mnt/hdd-02 is already in /etc/fstab",
+        f"/dev/sdd: /mnt/hdd-03 is already in {tmp_path / 'disks.json'}",
+    ]
+
+def test_patterns_are_expanded_per_disk():
+    jobs, errors = build_batch_jobs(["/dev/sdb", "/dev/sdc"], "HDD {n}", "{dev}", "", 9, OPTIONS, {})
+    assert errors == []
+    assert [(job["disk"], job["label"], job["mnt"], job["phy"]) for job in jobs] == [
+        ("/dev/sdb", "HDD 9", "sdb", "Unknown"), ("/dev/sdc", "HDD 10", "sdc", "Unknown")]
+    assert all(job["profile"] == "archive" and job["card"] == -1 for job in jobs)
+    _, errors = build_batch_jobs(["/dev/sdb", "/dev/sdc"], "HDD", "hdd", "", 1, OPTIONS, {})
+    assert errors == ["/dev/sdc: mount name hdd is generated twice, add {n} or {dev} to the pattern"]
+    assert build_batch_jobs(["/dev/sdb"], "{x}", "hdd", "", 1, OPTIONS, {})[1][0].startswith("Invalid pattern")
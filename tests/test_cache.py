@@ -0,0 +1,77 @@
+import os
+import pytest
+from deepnexus import cache
+from deepnexus.cache import FileCache, TTLCache, StatWatch, InotifyWatch, watch_file, clear_all_caches
+from deepnexus.utils import atomic_write
+
+def counting_loader(path, loads):
+    def load():
+        loads.append(path)
+        with open(path) as f:
+            return f.read()
+    return load
+
+@pytest.fixture(params=["inotify", "stat"])
+def watched(request, monkeypatch):
+    # Every path through watch_file, and the stat fallback used when inotify isn't available
+    if request.param == "stat":
+        monkeypatch.setattr(cache, "get_inotify", lambda: None)
+    elif cache.get_inotify() is None:
+        pytest.skip("inotify is not available")
+    return request.param
+
+def test_file_is_loaded_again_only_after_it_changes(tmp_path, watched):
+    path = str(tmp_path / "disks.json")
+    with open(path, "w") as f:
+        f.write("one")
+    files, loads = FileCache("test"), []
+    assert files.get(path, counting_loader(path, loads)) == "one"
+    assert files.get(path, counting_loader(path, loads)) == "one"
+    assert len(loads) == 1
+
+    with open(path, "a") as f:
+        f.write(" two")
+    assert files.get(path, counting_loader(path, loads)) == "one two"
+    # Atomic replaces (rename over the file) count as changes too
+    atomic_write(path, "three")
+    assert files.get(path, counting_loader(path, loads)) == "three"
+    assert len(loads) == 3
+
+def test_put_stores_the_callers_own_write(tmp_path, watched):
+    path = str(tmp_path / "fstab")
+    files, loads = FileCache("test"), []
+    atomic_write(path, "written")
+    files.put(path, "parsed")
+    assert files.get(path, counting_loader(path, loads)) == "parsed" and loads == []
+
+def test_invalidate_and_clear_all(tmp_path):
+    path = str(tmp_path / "fstab")
+    atomic_write(path, "text")
+    files, loads = FileCache("test"), []
+    expiring = TTLCache("test", default_ttl=60)
+    files.get(path, counting_loader(path, loads))
+    expiring.get("key", lambda: "value")
+    files.invalidate(path)
+    assert len(files) == 0
+    files.get(path, counting_loader(path, loads))
+    assert clear_all_caches() >= 2
+    assert len(files) == 0 and len(expiring) == 0
+    assert len(loads) == 2
+
+def test_ttl_cache_expires_entries():
+    expiring, loads = TTLCache("test", default_ttl=60), []
+    load = lambda: loads.append(1) or len(loads)
+    assert expiring.get("a", load) == 1 and expiring.get("a", load) == 1
+    # A ttl of 0 never stores the value
+    assert expiring.get("b", load, ttl=0) == 2 and expiring.get("b", load, ttl=0) == 3
+
+def test_watch_file_picks_the_watch(tmp_path, monkeypatch):
+    path = str(tmp_path / "file")
+    atomic_write(path, "")
+    if cache.get_inotify() is not None:
+        assert isinstance(watch_file(path), InotifyWatch)
+        os.symlink(path, str(tmp_path / "link"))
+        # inotify would watch the link, not its target
+        assert isinstance(watch_file(str(tmp_path / "link")), StatWatch)
+    monkeypatch.setattr(cache, "get_inotify", lambda: None)
+    assert isinstance(watch_file(path), StatWatch)
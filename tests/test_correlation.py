@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("tabulate")
+
+from diskmanagement.correlation import DiskCorrelation, id_keys, normalize_wwn
+from diskmanagement.inventory import BlockInventory
+from diskmanagement.storcli import StorcliDriveIdentity
+
+def test_normalize_wwn():
+    assert normalize_wwn("0x5000C500A1B2C3D4") == "5000c500a1b2c3d4"
+    assert normalize_wwn(" 5000c500a1b2c3d4 ") == "5000c500a1b2c3d4"
+    assert normalize_wwn("") is None and normalize_wwn(None) is None and normalize_wwn("N/A") is None
+
+def test_id_keys():
+    assert id_keys("wwn-0x5000c500a1b2c3d4") == [("wwn", "5000c500a1b2c3d4")]
+    assert id_keys("scsi-35000c500a1b2c3d4") == [("wwn", "5000c500a1b2c3d4")]
+    assert id_keys("ata-ST4000DM004-2CV104_ZFN0ABCD") == [("serial", "ZFN0ABCD")]
+    assert id_keys("scsi-SATA_ST4000DM004-2CV1_ZFN0ABCD") == [("serial", "ZFN0ABCD")]
+    assert id_keys("ata-ST4000DM004-2CV104_ZFN0ABCD-part1") == []
+    assert id_keys("usb-Generic_Flash_Disk_12345678-0:0") == []
+
+def inventory():
+    return BlockInventory([
+        {"name": "sda", "type": "disk", "serial": "ZFN0ABCD", "wwn": None, "mountpoints": [None], "children": [
+            {"name": "sda1", "type": "part", "uuid": "uuid-a", "mountpoints": ["/mnt/a"]}]},
+        {"name": "sdc", "type": "disk", "serial": None, "wwn": None, "mountpoints": [None], "children": [
+            {"name": "sdc1", "type": "part", "uuid": "uuid-c", "mountpoints": []}]},
+    ])
+
+def identity(slot, serial, wwn):
+    return StorcliDriveIdentity(controller=0, enclosure=252, slot=slot, serial=serial, wwn=wwn, model="ST4000")
+
+def test_slots_are_joined_by_wwn_then_serial():
+    correlation = DiskCorrelation(
+        inventory(),
+        {"sdc": ["wwn-0x5000c500a1b2c3d4", "wwn-0x5000c500a1b2c3d4-part1"]},
+        [identity(1, "ZFN0ABCD", "5000C500DEADBEEF"), identity(4, "Z1Z0XXXX", "5000C500A1B2C3D4"), identity(7, "HIDDEN01", "")],
+    )
+    assert correlation.find(card=0, slot=1).dev == "sda"
+    assert correlation.find(card=0, slot=4).dev == "sdc"
+    # Drives the OS doesn't see are still known by their slot
+    assert correlation.find(card=0, slot=7).dev is None
+    assert correlation.find(dev="/dev/sdc").slot == 4
+    assert correlation.find(mount="/mnt/a").slot == 1
+    assert correlation.find(serial="Z1Z0XXXX").dev == "sdc"
+
+def test_registry_entries_resolve_to_where_the_disk_is_now():
+    correlation = DiskCorrelation(inventory(), {}, [identity(1, "ZFN0ABCD", "")])
+    moved = {"label": "A", "uuid": "uuid-a", "card": 0, "slt": 9, "dev": "sdq", "serial": ""}
+    gone = {"label": "G", "uuid": "uuid-g", "card": 0, "slt": 2, "dev": "sda", "serial": ""}
+    assert correlation.resolve(moved).dev == "sda"
+    assert (correlation.resolve(moved).card, correlation.resolve(moved).slot) == (0, 1)
+    assert correlation.resolve(gone) is None
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("tabulate")
+
+from diskmanagement import disks
+from diskmanagement.inventory import BlockInventory
+from deepnexus.runner import CommandRunner, FixtureBackend, set_runner
+
+@pytest.fixture
+def mount_dialog(tmp_path, monkeypatch):
+    inventory = BlockInventory([{"name": "sdb", "type": "disk", "size": 4000, "mountpoints": [None], "children": [
+        {"name": "sdb1", "type": "part", "size": 4000, "mountpoints": []}]}])
+    monkeypatch.setattr(disks, "get_block_inventory", lambda: inventory)
+    monkeypatch.setattr(disks, "invalidate_block_inventory", lambda: None)
+    monkeypatch.setattr(disks, "get_available_mounts", lambda: ["/mnt/archive"])
+    made = []
+    monkeypatch.setattr(disks.os, "makedirs", lambda path, exist_ok=False: made.append(path))
+    answers = iter(["1", "2"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    return made
+
+def test_mount_reports_success(mount_dialog, capsys):
+    backend = FixtureBackend({"mount /dev/sdb1 /mnt/archive": ""})
+    set_runner(CommandRunner(backend))
+    disks.mount_disk([])
+    assert "Disk mounted at /mnt/archive." in capsys.readouterr().out
+    assert mount_dialog == ["/mnt/archive"] and backend.calls == ["mount /dev/sdb1 /mnt/archive"]
+
+def test_mount_failure_is_not_reported_as_success(mount_dialog, capsys):
+    set_runner(CommandRunner(FixtureBackend({"mount /dev/sdb1 /mnt/archive": {
+        "returncode": 32, "stderr": "mount: /mnt/archive: wrong fs type, bad option, bad superblock on /dev/sdb1.\n"}})))
+    disks.mount_disk([])
+    out = capsys.readouterr().out
+    assert "Could not mount /dev/sdb1" in out and "wrong fs type" in out
+    assert "Disk mounted" not in out
@@ -0,0 +1,45 @@
+import json
+import pytest
+from deepnexus.runner import CommandRunner, FixtureBackend, set_runner
+from deepnexus.fleet import TRANSPORTS, SshTransport, FleetError, check_hosts, query_fleet, TIMED_OUT
+
+def test_host_names_are_checked():
+    check_hosts(["node1", "admin@10.0.0.5", "backup.lan", "root@[fe80::1%eth0]", "::1", "nas_2"])
+    for host in ["-oProxyCommand=touch /tmp/x", "admin@-oProxyCommand=x", "-F/etc/passwd", "a b", "", "host;reboot"]:
+        with pytest.raises(FleetError, match="invalid fleet host"):
+            check_hosts([host])
+
+def test_ssh_argv_ends_options_before_the_command(tmp_path):
+    transport = SshTransport("~/.local/bin/deepnexus-cli", str(tmp_path / "control"), 300)
+    argv = transport.argv("admin@node1", ["disks", "show", "--json"], 30)
+    assert argv[0] == "ssh" and "BatchMode=yes" in argv and "ConnectTimeout=30" in argv
+    assert argv[-3:] == ["admin@node1", "--", "~/.local/bin/deepnexus-cli disks show --json"]
+    with pytest.raises(FleetError):
+        transport.argv("-oProxyCommand=x", ["temps"], 30)
+
+def fleet_config(hosts):
+    return {"fleet": {"hosts": hosts, "transport": "ssh", "timeout": 1, "remote_command": "deepnexus-cli"}}
+
+def test_answers_are_merged_and_failures_marked(tmp_path, monkeypatch):
+    monkeypatch.setitem(TRANSPORTS, "ssh", lambda remote_command: SshTransport(remote_command, str(tmp_path), 300))
+    disk = {"label": "Archive", "mnt": "archive", "uuid": "uuid-a", "mounted": True}
+    set_runner(CommandRunner(FixtureBackend({
+        "ssh * node1 -- 'deepnexus-cli disks show --json'": json.dumps([disk]),
+        "ssh * node2 -- 'deepnexus-cli disks show --json'": {"delay": 5},
+        "ssh * node3 -- 'deepnexus-cli disks show --json'": {"returncode": 255, "stderr": "ssh: connect to host node3 port 22: No route to host\n"},
+        "ssh * node4 -- 'deepnexus-cli disks show --json'": json.dumps({"error": "disks.json not found"}),
+    })))
+    answers = query_fleet(["disks", "show"], ["node1", "node2", "node3", "node4"], fleet_config([]))
+    assert answers["node1"] == ([disk], None)
+    assert answers["node2"] == (None, TIMED_OUT)
+    assert answers["node3"] == (None, "failed: ssh: connect to host node3 port 22: No route to host")
+    assert answers["node4"] == (None, "failed: disks.json not found")
+
+def test_no_command_runs_for_an_invalid_host():
+    backend = FixtureBackend({})
+    set_runner(CommandRunner(backend))
+    with pytest.raises(FleetError, match="-oProxyCommand"):
+        query_fleet(["temps"], ["node1", "-oProxyCommand=x"], fleet_config([]))
+    with pytest.raises(FleetError, match="no fleet hosts"):
+        query_fleet(["temps"], None, fleet_config([]))
+    assert backend.calls == []
@@ -0,0 +1,20 @@
+from diskmanagement.formatting import mkfs_argv, mkfs_command, parse_mkfs_progress, get_format_profiles, default_format_profile
+
+def test_mkfs_argv_splits_profile_options():
+    assert mkfs_argv("/dev/sdb1", "-T largefile4 -m 0") == ["mkfs.ext4", "-F", "-T", "largefile4", "-m", "0", "/dev/sdb1"]
+    assert mkfs_argv("/dev/sdb1") == ["mkfs.ext4", "-F", "/dev/sdb1"]
+
+def test_mkfs_command_quotes_arguments():
+    assert mkfs_command("/dev/disk/by-id/a b", "-L 'my label'") == "mkfs.ext4 -F -L 'my label' '/dev/disk/by-id/a b'"
+
+def test_parse_mkfs_progress():
+    assert parse_mkfs_progress("Writing inode tables:  123/5960") == ("Writing inode tables", 123 / 5960)
+    assert parse_mkfs_progress("Allocating group tables: 0/0") is None
+    assert parse_mkfs_progress("Creating journal (262144 blocks): done") is None
+
+def test_configured_profiles_override_the_built_in_ones():
+    app_config = {"format_profiles": {"general": "-m 1", "video": "-T huge"}, "format_profile": "video"}
+    profiles = get_format_profiles(app_config)
+    assert profiles["general"] == "-m 1" and profiles["video"] == "-T huge" and "archive" in profiles
+    assert default_format_profile(app_config) == "video"
+    assert default_format_profile({"format_profile": "missing"}) == "general"
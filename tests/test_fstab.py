@@ -0,0 +1,64 @@
+import pytest
+from diskmanagement.fstab import FstabDocument, FstabError, add_to_fstab
+
+FSTAB = """# /etc/fstab: static file system information.
+UUID=root-uuid / ext4 errors=remount-ro 0 1
+
+# UUID=old-uuid /mnt/old ext4 defaults 0 2
+UUID=media-uuid /mnt/media ext4 defaults 0 2
+"""
+
+def test_parsing_keeps_comments_and_disabled_entries():
+    document = FstabDocument(FSTAB, "/etc/fstab")
+    assert document.render() == FSTAB and not document.dirty
+    assert document.active_uuids() == {"root-uuid", "media-uuid"}
+    assert [line.uuid for line in document.entries(include_commented=True)] == ["root-uuid", "old-uuid", "media-uuid"]
+    assert not document.is_active("old-uuid")
+
+def test_edits_are_staged_until_saved(tmp_path):
+    path = tmp_path / "fstab"
+    path.write_text(FSTAB)
+    document = FstabDocument.load(str(path))
+    assert document.add("new-uuid", "/mnt/new", "defaults 0 2")
+    assert not document.add("media-uuid", "/mnt/media")
+    document.enable("old-uuid", "/mnt/old")
+    document.disable("media-uuid")
+    assert document.dirty and document.pending_changes() == 5
+    assert path.read_text() == FSTAB
+
+    assert document.save()
+    text = path.read_text()
+    assert "UUID=old-uuid /mnt/old ext4 defaults 0 2\n" in text
+    assert "# UUID=media-uuid /mnt/media" in text
+    assert text.endswith("UUID=new-uuid /mnt/new defaults 0 2\n")
+    assert text.startswith("# /etc/fstab: static file system information.\n")
+    assert not document.dirty and not document.save()
+
+def test_remove_toggle_and_revert():
+    document = FstabDocument(FSTAB)
+    document.toggle("media-uuid", "/mnt/media")
+    assert not document.is_active("media-uuid")
+    document.toggle("media-uuid", "/mnt/media")
+    assert document.is_active("media-uuid") and not document.dirty
+    assert document.remove("old-uuid") and not document.remove("missing-uuid")
+    document.revert()
+    assert document.render() == FSTAB
+
+def test_add_to_fstab_writes_once(tmp_path):
+    path = str(tmp_path / "fstab")
+    assert add_to_fstab("new-uuid", "/mnt/new", path)
+    assert not add_to_fstab("new-uuid", "/mnt/new", path)
+    with open(path) as f:
+        assert [line.split()[:2] for line in f] == [["UUID=new-uuid", "/mnt/new"]]
+
+def test_entries_without_a_uuid_are_refused(tmp_path):
+    document = FstabDocument(FSTAB)
+    for uuid in ("", None):
+        with pytest.raises(FstabError, match="without a partition UUID"):
+            document.add(uuid, "/mnt/new")
+        with pytest.raises(FstabError):
+            document.enable(uuid, "/mnt/new")
+    assert not document.dirty
+    with pytest.raises(FstabError):
+        add_to_fstab("", "/mnt/new", str(tmp_path / "fstab"))
+    assert not (tmp_path / "fstab").exists()
@@ -0,0 +1,31 @@
+from diskmanagement import utils
+from diskmanagement.inventory import BlockInventory
+from deepnexus.runner import CommandRunner, FixtureBackend, set_runner
+
+STALE = "a140cf0d-c26e-4904-9dc2-c5e51332d37e"
+FRESH = "5b1f0e4e-7a0e-4c36-9f0e-0a9f1d1c2b3a"
+
+def inventory(uuid):
+    return BlockInventory([{"name": "sdb", "type": "disk", "mountpoints": [None], "children": [
+        {"name": "sdb1", "type": "part", "uuid": uuid, "mountpoints": []}]}])
+
+def test_formatted_partitions_are_read_from_the_superblock(monkeypatch):
+    # udev still reports the UUID of the file system that was on the disk before
+    monkeypatch.setattr(utils, "get_block_inventory", lambda refresh=False: inventory(STALE))
+    backend = FixtureBackend({"udevadm settle": "", "blkid -p -s UUID -o value /dev/sdb1": FRESH + "\n"})
+    set_runner(CommandRunner(backend))
+    assert utils.read_partition_uuid("/dev/sdb1") == FRESH
+    assert backend.calls == ["udevadm settle", "blkid -p -s UUID -o value /dev/sdb1"]
+
+def test_no_file_system_reads_as_no_uuid():
+    set_runner(CommandRunner(FixtureBackend({"udevadm settle": "", "blkid *": {"returncode": 2}})))
+    assert utils.read_partition_uuid("/dev/sdb1") == ""
+
+def test_existing_partitions_are_looked_up_in_the_inventory(monkeypatch):
+    monkeypatch.setattr(utils, "get_block_inventory", lambda refresh=False: inventory(STALE))
+    backend = FixtureBackend({})
+    set_runner(CommandRunner(backend))
+    assert utils.get_partition_uuid("/dev/sdb1") == STALE and backend.calls == []
+    monkeypatch.setattr(utils, "get_block_inventory", lambda refresh=False: inventory(None))
+    set_runner(CommandRunner(FixtureBackend({"udevadm settle": "", "blkid -p -s UUID -o value /dev/sdb1": FRESH})))
+    assert utils.get_partition_uuid("/dev/sdb1") == FRESH
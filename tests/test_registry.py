@@ -0,0 +1,62 @@
+import json
+import pytest
+from diskmanagement.registry import DiskRegistry, DiskRegistryError, get_disk_registry
+
+def disk(label, mnt, uuid, **fields):
+    return {"label": label, "mnt": mnt, "uuid": uuid, **fields}
+
+def test_lookups_by_every_key(tmp_path):
+    registry = DiskRegistry([
+        disk("Archive", "/mnt/archive", "uuid-a", dev="/dev/sdb", serial="Z1Z0ABCD", card="0", slt=3),
+        disk("Media", "media", "uuid-m"),
+    ], str(tmp_path / "disks.json"))
+    archive = registry.find(mnt="archive")
+    assert archive["mnt"] == "archive" and archive["dev"] == "sdb" and archive["card"] == 0
+    assert registry.find(mnt="/mnt/archive") is archive
+    assert registry.find(uuid="uuid-a") is archive
+    assert registry.find(dev="/dev/sdb") is archive
+    assert registry.find(serial="Z1Z0ABCD") is archive
+    assert registry.find(card=0, slot="3") is archive
+    # Unset slots aren't indexed
+    assert registry.find(mnt="media")["card"] == -1 and registry.used_slots() == {3}
+
+def test_invalid_entries_are_skipped_and_kept(tmp_path, capsys):
+    path = tmp_path / "disks.json"
+    broken = {"label": "No uuid", "mnt": "broken"}
+    registry = DiskRegistry([broken, disk("Media", "media", "uuid-m")], str(path))
+    assert "missing 'uuid'" in capsys.readouterr().out
+    assert len(registry) == 1 and registry.find(mnt="broken") is None
+    registry.save()
+    assert broken in json.loads(path.read_text())
+
+def test_changes_are_validated_and_saved(tmp_path):
+    path = tmp_path / "disks.json"
+    registry = DiskRegistry([disk("Archive", "archive", "uuid-a", card=0, slt=3)], str(path))
+    with pytest.raises(DiskRegistryError, match="already used by Archive"):
+        registry.add(disk("Copy", "copy", "uuid-a"))
+    with pytest.raises(DiskRegistryError, match="'card' must be int"):
+        registry.add(disk("Bad", "bad", "uuid-b", card="zero"))
+    assert not path.exists()
+
+    registry.add(disk("Media", "media", "uuid-m"))
+    registry.update("media", card=0, slt=4)
+    assert registry.find(card=0, slot=4)["label"] == "Media"
+    with pytest.raises(DiskRegistryError, match=r"\(0, 3\) is already used"):
+        registry.update("media", slt=3)
+    assert registry.remove("archive")["label"] == "Archive"
+    assert registry.find(uuid="uuid-a") is None and registry.find(card=0, slot=3) is None
+    # Unset optional fields stay out of the file
+    assert json.loads(path.read_text()) == [{"label": "Media", "mnt": "media", "uuid": "uuid-m", "phy": "Unknown", "card": 0, "slt": 4}]
+
+def test_registry_is_reloaded_when_the_file_changes(tmp_path):
+    path = str(tmp_path / "disks.json")
+    with open(path, "w") as f:
+        json.dump([disk("Archive", "archive", "uuid-a")], f)
+    registry = get_disk_registry(path)
+    assert get_disk_registry(path) is registry
+    registry.add(disk("Media", "media", "uuid-m"))
+    # Its own save is not a change
+    assert get_disk_registry(path) is registry
+    with open(path, "w") as f:
+        json.dump([disk("Other", "other", "uuid-o"), disk("Bigger", "bigger", "uuid-b")], f)
+    assert [d["label"] for d in get_disk_registry(path)] == ["Other", "Bigger"]
@@ -0,0 +1,98 @@
+import time
+import asyncio
+import threading
+import pytest
+from deepnexus.runner import CommandRunner, CommandError, FixtureBackend, SubprocessBackend
+
+def run_in_threads(target, count):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_fixtures_match_exact_commands_and_patterns():
+    runner = CommandRunner(FixtureBackend({"lsblk -J -b -O": "exact", "smartctl *": {"stdout": "pattern", "returncode": 4}}))
+    assert runner.run(["lsblk", "-J", "-b", "-O"]).stdout == "exact"
+    result = runner.run(["smartctl", "--json", "-A", "/dev/sda"])
+    assert (result.stdout, result.returncode) == ("pattern", 4)
+
+def test_command_without_fixture_fails_with_127():
+    backend = FixtureBackend()
+    result = CommandRunner(backend).run(["storcli64", "/call", "show"])
+    assert result.returncode == 127 and not result.ok
+    assert backend.calls == ["storcli64 /call show"]
+    with pytest.raises(CommandError, match="could not run"):
+        result.check()
+
+def test_check_only_ignores_the_exit_status_when_allowed():
+    result = CommandRunner(FixtureBackend({"smartctl *": {"returncode": 4, "stderr": "bad sector"}})).run(["smartctl", "-A", "/dev/sda"])
+    assert result.check(allow_status=True) is result
+    with pytest.raises(CommandError, match="exit status 4: bad sector"):
+        result.check()
+
+def test_identical_commands_in_flight_are_coalesced():
+    backend = FixtureBackend({"storcli64 /call/sall show J": {"stdout": "{}", "delay": 0.2}})
+    runner = CommandRunner(backend)
+    results = []
+    run_in_threads(lambda i: results.append(runner.run(["storcli64", "/call/sall", "show", "J"])), 5)
+    assert len(backend.calls) == 1
+    assert [r.stdout for r in results] == ["{}"] * 5
+    assert sum(r.coalesced for r in results) == 4
+    assert runner.stats()["storcli64"]["coalesced"] == 4
+
+def test_coalesce_false_runs_every_command():
+    backend = FixtureBackend({"blkid *": {"stdout": "uuid", "delay": 0.05}})
+    runner = CommandRunner(backend)
+    run_in_threads(lambda i: runner.run(["blkid", "/dev/sda1"], coalesce=False), 3)
+    assert len(backend.calls) == 3
+
+def test_concurrency_is_capped_per_tool():
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def fixture(argv):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return "ok"
+
+    runner = CommandRunner(FixtureBackend({"sensors *": fixture}), limits={"sensors": 2})
+    run_in_threads(lambda i: runner.run(["sensors", f"chip{i}"]), 6)
+    assert active[1] == 2
+
+def test_timeout_from_the_call_and_from_the_tool_defaults():
+    backend = FixtureBackend({"sensors *": {"stdout": "late", "delay": 1}})
+    runner = CommandRunner(backend, timeouts={"sensors": 0.05})
+    for result in (runner.run(["sensors", "-j"]), CommandRunner(backend).run(["sensors", "-A"], timeout=0.05)):
+        assert result.timed_out and result.returncode is None
+        with pytest.raises(CommandError, match="timed out"):
+            result.check()
+    assert runner.stats()["sensors"]["timeouts"] == 1
+
+def test_subprocess_timeout_kills_the_whole_process_group():
+    # The background sleep keeps stdout open, the run only ends in time when the group is killed
+    result = CommandRunner(SubprocessBackend()).run(["sh", "-c", "sleep 5 & wait"], timeout=0.3)
+    assert result.timed_out
+    assert result.duration < 3
+
+def test_subprocess_missing_binary():
+    result = CommandRunner(SubprocessBackend()).run(["/nonexistent/deepnexus-tool"])
+    assert result.returncode == 127 and result.error
+
+def test_stream_emulates_carriage_returns_and_backspaces():
+    lines, partials = [], []
+    script = r"printf 'Writing: 1/4\rWriting: 4/4\nab\bc\ndone'"
+    result = asyncio.run(CommandRunner(SubprocessBackend()).stream(["sh", "-c", script], lines.append, partials.append))
+    assert result.ok
+    assert lines == ["Writing: 4/4", "ac", "done"]
+    assert result.stdout == "Writing: 4/4\nac\ndone"
+
+def test_stream_from_fixtures():
+    lines = []
+    runner = CommandRunner(FixtureBackend({"mkfs.ext4 *": "one\ntwo"}))
+    result = asyncio.run(runner.stream(["mkfs.ext4", "-F", "/dev/sdb1"], lines.append))
+    assert lines == ["one", "two"] and result.ok
@@ -0,0 +1,30 @@
+import json
+import pytest
+
+pytest.importorskip("tabulate")
+
+from deepnexus.runner import CommandRunner, CommandError, FixtureBackend, set_runner
+from diskmanagement import sas
+
+CONTROLLERS = {0: {0, 1, 2}, 1: {0, 1}}
+
+def test_locate_paths_use_the_fewest_storcli_calls():
+    assert sas.locate_paths([(0, 1), (0, 2), (1, 0)], CONTROLLERS) == ["/c0/s1", "/c0/s2", "/c1/s0"]
+    assert sas.locate_paths([(1, 0), (1, 1), (0, 2)], CONTROLLERS) == ["/c1/sall", "/c0/s2"]
+    assert sas.locate_paths([(0, None)], CONTROLLERS) == ["/c0/sall"]
+    assert sas.locate_paths([(0, None), (1, None)], CONTROLLERS) == ["/call/sall"]
+    # Without the slot list nothing can be grouped
+    assert sas.locate_paths([(0, 0), (0, 1), (0, 2)], {}) == ["/c0/s0", "/c0/s1", "/c0/s2"]
+
+def test_failed_shows_are_not_cached(monkeypatch):
+    monkeypatch.setenv("DEEPNEXUS_NO_AGENT", "1")
+    busy = json.dumps({"Controllers": [{"Command Status": {"Controller": 0, "Status": "Failure", "Description": "Controller is busy"}}]})
+    backend = FixtureBackend({"*storcli64 /call/sall show J": {"stdout": busy, "returncode": 46}})
+    set_runner(CommandRunner(backend))
+    sas.invalidate_storcli_cache()
+    with pytest.raises(CommandError, match="Controller is busy"):
+        sas.get_sas_controllers()
+    backend.fixtures["*storcli64 /call/sall show J"] = json.dumps({"Controllers": [{"Command Status": {"Controller": 0, "Status": "Success"},
+        "Response Data": {"Drive Information": [{"EID:Slt": "252:1", "State": "JBOD", "Size": "1 TB", "Model": "M"}]}}]})
+    assert [d.slot for d in sas.get_sas_drives()] == [1]
+    assert len(backend.calls) == 2
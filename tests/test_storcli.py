@@ -0,0 +1,62 @@
+import json
+from diskmanagement.storcli import (build_controllers, build_controller_temperatures, build_drive_identities,
+                                    parse_storcli_output, parse_size)
+
+def document(*controllers):
+    return json.dumps({"Controllers": [
+        {"Command Status": {"Controller": cid, "Status": status, "Description": "None"}, "Response Data": data}
+        for cid, status, data in controllers
+    ]})
+
+def drive(eid_slot, model="ST4000NM0023", size="3.637 TB"):
+    return {"EID:Slt": eid_slot, "DID": 10, "State": "JBOD", "Size": size, "Intf": "SAS", "Med": "HDD", "Model": f" {model} "}
+
+def test_parse_size():
+    assert parse_size("3.637 TB") == int(3.637 * 1024 ** 4)
+    assert parse_size("512 B") == 512
+    assert parse_size("1.0 GiB") == 1024 ** 3
+    assert parse_size("unknown") is None
+
+def test_invalid_output_parses_to_nothing():
+    assert parse_storcli_output("storcli64: command not found") == []
+    assert build_controllers("") == {}
+    assert build_drive_identities(None) == []
+
+def test_build_controllers_groups_drives_per_enclosure():
+    output = document(
+        (0, "Success", {"Drive Information": [drive("252:3"), drive("252:1"), drive(" :0", model="DIRECT")]}),
+        (1, "Success", {"PD LIST": [drive("8:2")]}),
+    )
+    controllers = build_controllers(output)
+    assert sorted(controllers) == [0, 1]
+    assert [(d.enclosure, d.slot) for d in controllers[0].drives] == [(None, 0), (252, 1), (252, 3)]
+    assert controllers[0].drive(3).model == "ST4000NM0023"
+    assert controllers[0].drive(3).size_bytes == parse_size("3.637 TB")
+    assert controllers[1].drives[0].slot == 2
+    assert controllers[0].status == "Success"
+
+def test_rows_without_a_slot_are_skipped():
+    controllers = build_controllers(document((0, "Success", {"Drive Information": [{"EID:Slt": "-"}, drive("252:4")]})))
+    assert [d.slot for d in controllers[0].drives] == [4]
+
+def test_controller_temperatures_from_list_and_dict_properties():
+    output = document(
+        (0, "Success", {"Controller Properties": [{"Ctrl_Prop": "ROC temperature(Degree Celsius)", "Value": "61"}]}),
+        (1, "Success", {"Controller Properties": {"ROC temperature(Degree Celsius)": "55"}}),
+        (2, "Success", {"Controller Properties": []}),
+    )
+    assert build_controller_temperatures(output) == {0: 61, 1: 55}
+
+def test_drive_identities_from_show_all():
+    def details(path, serial, wwn):
+        return {f"Drive {path} State": {}, f"Drive {path} Device attributes": {"SN": serial, "WWN": wwn, "Model Number": "ST4000NM0023 "}}
+    output = document((0, "Success", {
+        "Drive /c0/e252/s3": [drive("252:3")],
+        "Drive /c0/e252/s3 - Detailed Information": details("/c0/e252/s3", "Z1Z0ABCD    ", "5000C500A1B2C3D4"),
+        "Drive /c0/s5 - Detailed Information": details("/c0/s5", "ZFN0EFGH", ""),
+    }))
+    identities = sorted(build_drive_identities(output), key=lambda i: i.slot)
+    assert [(i.controller, i.enclosure, i.slot, i.serial, i.wwn, i.model) for i in identities] == [
+        (0, 252, 3, "Z1Z0ABCD", "5000C500A1B2C3D4", "ST4000NM0023"),
+        (0, None, 5, "ZFN0EFGH", "", "ST4000NM0023"),
+    ]
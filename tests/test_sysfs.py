@@ -0,0 +1,83 @@
+import os
+from diskmanagement.sysfs import discover_block_devices, read_disk_ids, _unescape
+from diskmanagement.inventory import BlockInventory
+
+def write(root, path, text):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def link(root, path, target):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.symlink(target, path)
+
+def fake_tree(root):
+    # /sys/class/block entries link into the device tree, partitions sit below their disk
+    disk = "sys/devices/pci0000:00/host0/block/sda"
+    write(root, f"{disk}/dev", "8:0\n")
+    write(root, f"{disk}/size", "7814037168\n")
+    write(root, f"{disk}/removable", "0\n")
+    write(root, f"{disk}/queue/rotational", "1\n")
+    write(root, f"{disk}/device/model", "ST4000NM0023\n")
+    write(root, f"{disk}/sda1/dev", "8:1\n")
+    write(root, f"{disk}/sda1/size", "7814035087\n")
+    write(root, f"{disk}/sda1/partition", "1\n")
+    link(root, "sys/class/block/sda", os.path.join(root, disk))
+    link(root, "sys/class/block/sda1", os.path.join(root, disk, "sda1"))
+
+    write(root, "proc/self/mountinfo", "36 25 8:1 / /mnt/hdd\\040r0c0 rw,relatime shared:1 - ext4 /dev/sda1 rw\n")
+    write(root, "run/udev/data/b8:0", "E:ID_SERIAL_SHORT=Z1Z0ABCD\nE:ID_MODEL=ST4000NM0023\n")
+    link(root, "dev/disk/by-uuid/a140cf0d-c26e-4904-9dc2-c5e51332d37e", "../../sda1")
+    link(root, "dev/disk/by-label/EXOS\\x20X18", "../../sda1")
+    link(root, "dev/disk/by-id/wwn-0x5000c500a1b2c3d4", "../../sda")
+    link(root, "dev/disk/by-id/wwn-0x5000c500a1b2c3d4-part1", "../../sda1")
+    link(root, "dev/disk/by-id/scsi-SSEAGATE_ST4000NM0023_Z1Z0ABCD", "../../sda")
+
+def test_discovery_builds_the_lsblk_tree(tmp_path):
+    root = str(tmp_path)
+    fake_tree(root)
+    devices = discover_block_devices(root)
+    assert [d["name"] for d in devices] == ["sda"]
+    disk = devices[0]
+    assert disk["type"] == "disk" and disk["rota"] and not disk["rm"]
+    assert disk["size"] == 7814037168 * 512
+    assert (disk["model"], disk["serial"], disk["wwn"]) == ("ST4000NM0023", "Z1Z0ABCD", "0x5000c500a1b2c3d4")
+    assert disk["ids"] == ["scsi-SSEAGATE_ST4000NM0023_Z1Z0ABCD", "wwn-0x5000c500a1b2c3d4"]
+
+    partition = disk["children"][0]
+    assert partition["name"] == "sda1" and partition["type"] == "part"
+    assert partition["uuid"] == "a140cf0d-c26e-4904-9dc2-c5e51332d37e"
+    assert partition["label"] == "EXOS X18"
+    assert partition["mountpoints"] == ["/mnt/hdd r0c0"] and partition["fstype"] == "ext4"
+
+def test_inventory_from_the_discovered_tree(tmp_path):
+    root = str(tmp_path)
+    fake_tree(root)
+    inventory = BlockInventory.from_sysfs(root)
+    assert [d["name"] for d in inventory.disks()] == ["sda"]
+    assert inventory.is_mounted("/dev/sda")
+    assert inventory.uuid("sda1") == "a140cf0d-c26e-4904-9dc2-c5e51332d37e"
+    assert inventory.by_mountpoint["/mnt/hdd r0c0"]["name"] == "sda1"
+    assert [c["name"] for c in inventory.children("sda")] == ["sda1"]
+
+def test_missing_tree_discovers_nothing(tmp_path):
+    assert discover_block_devices(str(tmp_path)) == []
+    assert read_disk_ids(str(tmp_path)) == {}
+
+def test_read_disk_ids_groups_names_per_device(tmp_path):
+    root = str(tmp_path)
+    fake_tree(root)
+    assert read_disk_ids(root) == {
+        "sda": ["scsi-SSEAGATE_ST4000NM0023_Z1Z0ABCD", "wwn-0x5000c500a1b2c3d4"],
+        "sda1": ["wwn-0x5000c500a1b2c3d4-part1"],
+    }
+
+def test_unescape():
+    assert _unescape("/mnt/plain") == "/mnt/plain"
+    assert _unescape("/mnt/hdd\\040r0c0") == "/mnt/hdd r0c0"
+    assert _unescape("EXOS\\x20X18") == "EXOS X18"
+    # Escaped bytes of a UTF-8 name, and escapes next to characters outside latin-1
+    assert _unescape("caf\\xc3\\xa9") == "café"
+    assert _unescape("/mnt/データ\\040dir") == "/mnt/データ dir"
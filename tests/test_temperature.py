@@ -0,0 +1,77 @@
+import time
+import threading
+import pytest
+
+pytest.importorskip("tabulate")
+
+from deepnexus import temperature
+from deepnexus.runner import CommandRunner, FixtureBackend, set_runner
+from deepnexus.temperature import collect_temperatures, get_sensor_temperatures, flatten_tree, TIMED_OUT, FAILED
+
+SENSORS = """coretemp-isa-0000
+Adapter: ISA adapter
+Package id 0:  +52.0°C  (high = +80.0°C, crit = +100.0°C)
+Core 0:        +49.0°C  (high = +80.0°C, crit = +100.0°C)
+
+nouveau-pci-0800
+Adapter: PCI adapter
+temp1:        +41.0°C  (high = +95.0°C, hyst =  +3.0°C)
+"""
+
+@pytest.fixture
+def sources(monkeypatch):
+    def use(sources, timeouts):
+        monkeypatch.setattr(temperature, "temperature_sources", lambda: sources)
+        monkeypatch.setattr(temperature, "TEMPERATURE_TIMEOUTS", timeouts)
+    return use
+
+def test_a_hung_source_only_costs_its_own_timeout(sources):
+    release = threading.Event()
+    timeouts = []
+    def hung(timeout=None):
+        timeouts.append(timeout)
+        release.wait(5)
+        return {"sda": 40}
+    def failing(timeout=None):
+        raise RuntimeError("storcli64 not found")
+    sources({"SAS": failing, "Disks": hung, "Sensors": lambda timeout=None: {"CPU": {"Core 0": 49.0}}}, {"Disks": 0.3, "Sensors": 1})
+
+    branches = []
+    started = time.monotonic()
+    tree = collect_temperatures(lambda name, value, is_last: branches.append((name, is_last)))
+    elapsed = time.monotonic() - started
+    release.set()
+    assert tree == {"SAS": FAILED, "Disks": TIMED_OUT, "Sensors": {"CPU": {"Core 0": 49.0}}}
+    # Each source is handed its own timeout, the collection waits for nothing longer than the slowest deadline
+    assert timeouts == [0.3] and 0.3 <= elapsed < 1
+    # Branches arrive as their sources answer, the hung one last
+    assert branches[-1] == ("Disks", True) and [last for _, last in branches[:-1]] == [False, False]
+
+def test_sources_run_at_the_same_time(sources):
+    def slow(timeout=None):
+        time.sleep(0.3)
+        return {}
+    sources({"SAS": slow, "Disks": slow, "Sensors": slow}, {})
+    started = time.monotonic()
+    assert collect_temperatures() == {"SAS": {}, "Disks": {}, "Sensors": {}}
+    assert time.monotonic() - started < 0.8
+
+def test_sensor_temperatures_from_sensors_output():
+    set_runner(CommandRunner(FixtureBackend({"sensors": SENSORS})))
+    assert get_sensor_temperatures(timeout=1) == {"CPU": {"Package id 0": 52.0, "Core 0": 49.0}, "GPU": {"Core": 41.0}}
+    set_runner(CommandRunner(FixtureBackend({"sensors": {"returncode": 1, "stderr": "No sensors found!"}})))
+    assert get_sensor_temperatures(timeout=1) == {"CPU": {}, "GPU": {}}
+
+def test_sleeping_disks_are_not_woken_up():
+    from diskmanagement.disks import poll_smart_temperature
+    set_runner(CommandRunner(FixtureBackend({
+        "smartctl --json -n standby,3 -A /dev/sda": '{"temperature": {"current": 36}}',
+        "smartctl --json -n standby,3 -A /dev/sdb": {"returncode": 3, "stdout": '{"smartctl": {"exit_status": 3}}'},
+        "smartctl --json -n standby,3 -A /dev/sdc": {"returncode": 2, "stdout": "{}"},
+    })))
+    assert poll_smart_temperature("/dev/sda", 1)[0] == 36
+    assert poll_smart_temperature("/dev/sdb", 1)[0] == "standby"
+    assert poll_smart_temperature("/dev/sdc", 1)[0] is None
+
+def test_flatten_tree():
+    assert flatten_tree({"SAS": {"Controller 0": 61}, "Disks": TIMED_OUT}) == {("SAS", "Controller 0"): 61, ("Disks",): TIMED_OUT}
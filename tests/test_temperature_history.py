@@ -0,0 +1,90 @@
+import os
+import pytest
+
+pytest.importorskip("tabulate")
+
+from deepnexus.temperature_history import (HistoryFile, history_path, open_history, query_history, record_temperature_tree,
+                                           list_history_labels, find_history_labels, parse_range, sparkline)
+
+CAPACITY = {"raw": 4, "minute": 3, "hour": 2}
+START = 1_699_999_200  # the start of an hour
+
+def test_raw_ring_wraps_and_keeps_the_newest(tmp_path):
+    history = HistoryFile(str(tmp_path / "sda.ring"), "disks/sda", CAPACITY)
+    for second in range(6):
+        assert history.append(START + second, 30.0 + second)
+    assert not history.append(START + 5, 99.0)
+    assert [r[0] - START for r in history.read("raw", since=0, until=START + 10)] == [2, 3, 4, 5]
+    assert history.oldest("raw") == START + 2
+    # Only the requested slice
+    assert [r[1] for r in history.read("raw", since=START + 3, until=START + 4)] == [33.0, 34.0]
+
+def test_samples_are_downsampled_per_minute_and_hour(tmp_path):
+    history = HistoryFile(str(tmp_path / "sda.ring"), "disks/sda", CAPACITY)
+    for minute, values in enumerate([(30, 34), (40, 40), (36, 38)]):
+        for offset, value in zip((0, 30), values):
+            history.append(START + minute * 60 + offset, float(value))
+    minutes = history.read("minute", since=0, until=START + 3600)
+    # The last minute is still being filled and comes from its pending bucket
+    assert minutes == [(START, 32.0, 30.0, 34.0), (START + 60, 40.0, 40.0, 40.0), (START + 120, 37.0, 36.0, 38.0)]
+    assert history.rings["minute"][2] == 2
+    assert history.read("hour", since=0, until=START + 3600) == [(START, 218 / 6, 30.0, 40.0)]
+
+def test_file_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sda.ring")
+    writer = HistoryFile(path, "disks/sda", CAPACITY)
+    writer.append(START, 30.0)
+    reader = HistoryFile(path)
+    assert reader.label == "disks/sda" and reader.rings["raw"][0] == 4
+    writer.append(START + 1, 31.0)
+    assert [r[1] for r in reader.read("raw", until=START + 1)] == [30.0, 31.0]
+    with pytest.raises(FileNotFoundError):
+        HistoryFile(str(tmp_path / "missing.ring"))
+    (tmp_path / "junk.ring").write_bytes(b"\0" * 4096)
+    with pytest.raises(ValueError):
+        HistoryFile(str(tmp_path / "junk.ring"))
+
+def test_query_uses_the_finest_tier_that_reaches_back(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    now = START + 10
+    monkeypatch.setattr("deepnexus.temperature_history.time.time", lambda: now)
+    tree = {"Disks": {"sda": 35, "sdb": "standby"}, "CPU": {"Package id 0": 50.0}}
+    assert record_temperature_tree(tree, START, directory) == 2
+    assert list_history_labels(directory) == ["CPU/Package id 0", "Disks/sda"]
+    assert find_history_labels("sda", directory) == ["Disks/sda"]
+    tier, records = query_history("Disks/sda", 3600, directory)
+    assert tier == "raw" and records == [(START, 35.0)]
+    assert open_history("Disks/sda", directory=directory) is open_history("Disks/sda", directory=directory)
+
+def test_parse_range_and_sparkline():
+    assert parse_range("90") == 90 and parse_range("30m") == 1800 and parse_range("2w") == 1209600
+    assert parse_range("1y") is None and parse_range("") is None
+    assert sparkline([1, 2, 3]) == "▁▄█" and sparkline([5, 5]) == "▁▁" and sparkline([]) == ""
+    assert len(sparkline(list(range(120)), width=60)) == 60
+
+def test_labels_that_sanitize_alike_get_their_own_file(tmp_path):
+    directory = str(tmp_path)
+    assert history_path("sda:temp", directory) != history_path("sda_temp", directory)
+    open_history("sda:temp", create=True, directory=directory).append(START, 30.0)
+    open_history("sda_temp", create=True, directory=directory).append(START, 40.0)
+    assert sorted(list_history_labels(directory)) == ["sda:temp", "sda_temp"]
+    assert HistoryFile(history_path("sda:temp", directory)).read("raw", until=START) == [(START, 30.0)]
+
+def test_creating_never_truncates_an_existing_file(tmp_path):
+    path = str(tmp_path / "sda.ring")
+    first = HistoryFile(path, "disks/sda", CAPACITY)
+    first.append(START, 30.0)
+    # A second process opening the sensor at the same time keeps the readings of the first
+    second = HistoryFile(path, "disks/sda", CAPACITY)
+    assert second.read("raw", until=START) == [(START, 30.0)]
+    assert [name for name in tmp_path.iterdir() if name.name.startswith(".")] == []
+
+def test_files_named_before_the_hash_are_kept(tmp_path):
+    directory = str(tmp_path)
+    HistoryFile(str(tmp_path / "Disks_sda.ring"), "Disks/sda", CAPACITY).append(START, 30.0)
+    HistoryFile(str(tmp_path / "Disks_sdb.ring"), "Disks sdb", CAPACITY).append(START, 50.0)
+    assert open_history("Disks/sda", directory=directory).read("raw", until=START) == [(START, 30.0)]
+    # Only moved for the label it was written for
+    assert open_history("Disks/sdb", create=True, directory=directory).read("raw", until=START) == []
+    assert not os.path.exists(tmp_path / "Disks_sda.ring") and os.path.exists(history_path("Disks/sda", directory))
+    assert os.path.exists(tmp_path / "Disks_sdb.ring")